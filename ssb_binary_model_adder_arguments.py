@@ -3,6 +3,9 @@
 # Copyright (C) 2025 Thomas Rader
 
 import argparse
+from ssb_binary_model_cache import add_cache_arguments
+from ssb_binary_model_log import add_log_arguments
+from ssb_binary_model_profile import add_profile_arguments
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-file","--file",required=True,type=str,help="File we're expanding (pointers here need to be connected).")
@@ -17,9 +20,34 @@ parser.add_argument("-no_convert","--no_convert",action="store_true",help="Preve
 parser.add_argument("-palette_costume","--palette_costume","-costume","--costume",default="",help="Changes FD1 (palette) command with DE000000 0EXXXXXX to make palette based on costume palette. Enter entire DE command, ex DE0000000E000000.")
 parser.add_argument("-original_character_offset","--original_character_offset",default="-1",type=str,help="Hexadecimal location of where the original character file started when adding the parts to the RAM (as a string, ex: '0x802EDE10') (set this if you use vertices/palettes/textures/animations from the original character file).")
 parser.add_argument("-original_character_file_size","--original_character_file_size",default="-1",type=str,help="File size of original character file. This is used in tandem with original_character_offset to find data locations that are and aren't in the original character file (no need to set this it will set itself).")
+parser.add_argument("-sequential","--sequential",action="store_true",help="Adds the files in folder_to_add one at a time instead of linking them all in one pass (the output is the same).")
+parser.add_argument("-processes","--processes",default=0,type=int,help="Worker processes to convert the files in folder_to_add in at the same time (defaults to the number of CPUs, only used for big folders, 1 converts them one at a time).")
+parser.add_argument("-watch","--watch",action="store_true",help="Keeps running after adding folder_to_add, adding it again (only from the first file that changed) whenever a file in it or file changes.")
+parser.add_argument("-watch_interval","--watch_interval",default=0.25,type=float,help="Seconds between checking for changes with -watch.")
+parser.add_argument("-debounce","--debounce",default=0.5,type=float,help="Seconds nothing can change for before adding the folder again with -watch.")
+parser.add_argument("-mmap","--mmap",action="store_true",help="Maps file instead of reading it, and writes the output straight to its file (for big files, the output is the same).")
 parser.add_argument("-debug","--debug",action="store_true",help="Prints debugging messages to output.")
-parser.add_argument("-python","--python","-python_version","--python_version",default="python3",type=str,help="Python version or location to run python commands with.")
+parser.add_argument("-python","--python","-python_version","--python_version",default=None,type=str,help=argparse.SUPPRESS) # Deprecated, kept so older commands still parse
 parser.add_argument("-overwrite","--overwrite","-force","--force",action="store_true",help="Forces overwrite, making output go to -file.")
 parser.add_argument("-o","--o","-output","--output",default="output.bin",type=str,help="Output file.")
+parser.add_argument("-plan","--plan",default="",type=str,help="Writes a patch plan (JSON of the bytes inserted and written over) to this file instead of writing the output, nothing else is written. A name ending in .ssbp writes a compact binary patch instead. Apply it later with ssb_binary_model_plan.py apply.")
+add_cache_arguments(parser)
+add_log_arguments(parser)
+add_profile_arguments(parser)
 
-args = parser.parse_args()
\ No newline at end of file
+# Parses the adder's command line arguments
+def parse_args(argv=None, quiet=False):
+    """
+    Parses the adder's command line arguments.
+
+    Args:
+        argv (list): Arguments to parse, defaults to sys.argv.
+        quiet (boolean): Doesn't say deprecated arguments are ignored, for reading arguments without running them.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    args = parser.parse_args(argv)
+    if args.python is not None and not quiet:
+        print("-python is deprecated and ignored, everything runs in the same process now.")
+    return args
@@ -4,186 +4,732 @@
 # Copyright (C) 2025 Thomas Rader
 
 
-import shutil
 import os
 import sys
-import subprocess
-# from ssb_binary_model_adder import read_hex_from_offset
-from ssb_binary_model_adder_arguments import args
+import io
+import bisect
+import hashlib
+import struct
+import contextlib
+import concurrent.futures
+from ssb_binary_model_adder import append_to_model, check_arguments, plan_path_of
+from ssb_binary_model_adder_arguments import parse_args
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_cache import cache_from_args, file_hash
+from ssb_binary_model_manifest import BuildManifest, build_arguments, load_previous_build, manifest_path, points_past, remove_manifest
+from ssb_binary_model_costumes import build_costumes, parse_costumes
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_log import SUMMARY, get_level, log_settings, log_from_args, record_change, recording, summary, tracing
+from ssb_binary_model_opcodes import command_kind, is_end_command, RDP_SYNC, VERTICE
+from ssb_binary_model_plan import save_plan
+from ssb_binary_model_profile import count, profile_from_args, stage
+from ssb_binary_model_relocatable import RelocatablePart, convert_cached, load_part
+from ssb_binary_model_relocation import RelocationTable, plan_relocation, pointer_struct
+from ssb_binary_model_watch import watch_folder
 
-# Reads hexadecimal data from a file with hex offset given
-def read_hex_from_offset(file_path, offset, num_bytes):
+half_struct = struct.Struct(">H")       # upper half of a pointer
+parallel_min_size = 1 << 16             # Parts only get converted in worker processes past this many bytes
+worker_pools = {}                       # Worker processes by how many there are, kept for later builds (-watch, the server) since starting them takes longer than converting 64 KB
+worker_pool_users = 0                   # How many worker_pools_kept() blocks are running, the workers are shut down once none are
+
+# Finds first E7 command offset
+def find_op_index(model,first_op_command=None):
+    if first_op_command is None:
+        first_op_command = model.get_index().first_command(RDP_SYNC)
+    if first_op_command == -1:
+        print("Couldn't find indexes, exiting.")
+        return "0x00"
+    return hex(first_op_command)
+
+# Prints where a file from the folder is going
+def print_part_location(filename,file_to_add_model,part_hex_location,output_path,debug=False,first_op_command=None):
+    # Getting first op command for printing help
+    op_index = find_op_index(file_to_add_model,first_op_command)
+    op_index = hex(int(op_index,16)+int(part_hex_location,16))
+    op_index_segmented = hex(int(int(op_index,16) / 4))
+
+    # Debug printing
+    if debug:
+        print(f"{part_hex_location}: Adding {filename} to {output_path}; E7 at {op_index} ({op_index_segmented})")
+    else:
+        summary(f"--{part_hex_location}: Adding {filename}; E7 at {op_index} ({op_index_segmented})")
+
+# Finds the last pointer of a model made out of segments of other models
+def find_last_pointer_in_segments(segments):
+    """
+    Finds the last pointer (the 01 command before the last DF command) of a model made out of segments,
+    giving the same pointer DisplayListIndex.last_pointer() gives for the whole model. Every segment has to
+    start on a multiple of 8 in the whole model.
+
+    Args:
+        segments (list): (index, start, end, key) of every segment in model order, start and end are locations in index.
+
+    Returns:
+        tuple: (key, location in index) of the last pointer; returns None if nothing found.
+    """
+    # Last DF command
+    position = len(segments) - 1
+    while position >= 0:
+        index, start, end, key = segments[position]
+        end_commands = index.full_end_commands
+        end_position = bisect.bisect_left(end_commands, end)
+        if end_position > 0 and end_commands[end_position - 1] >= start:
+            last_end = end_commands[end_position - 1]
+            break
+        position = position - 1
+    else:
+        return None
+
+    # Last 01 command before it, looking through earlier segments if there isn't one in the same segment
+    while position >= 0:
+        index, start, end, key = segments[position]
+        vertices = index.commands[VERTICE]
+        vertice_position = bisect.bisect_left(vertices, last_end)
+        if vertice_position > 0 and vertices[vertice_position - 1] >= start:
+            return key, vertices[vertice_position - 1] + 4 # adding 4 because the location is at the 01 command
+        position = position - 1
+        if position >= 0:
+            last_end = segments[position][2]
+    return None
+
+# Checks that a converted part's pointers stay inside it
+def part_chain_stays_inside(data,location,end_location,part_location):
     """
-    Reads data from binary file.
+    Follows the pointer chain of a converted part from its first pointer to its last one, making sure every
+    pointer points inside the part so files added after it never have to change them.
 
     Args:
-        file_path (string): Source file.
-        offset (string): Where in the file to read the data from.
-        num_bytes (int): How many bytes to read.
+        data (bytearray): Converted part.
+        location (int): First pointer in the part.
+        end_location (int): Last pointer in the part (the one that gets connected to the next file).
+        part_location (int): Where the part is in the output.
 
     Returns:
-        string: Hexadecimal data read from binary file.
+        boolean: True if the whole chain stays inside the part.
+    """
+    section_end = int((part_location + len(data)) / 4)
+    for _ in range(len(data) // 4 + 1):
+        if location < 0 or location + 4 > len(data):
+            return False
+        upper_offset, lower_offset = pointer_struct.unpack_from(data, location)
+        if upper_offset == 0 or lower_offset >= section_end:
+            return False
+        if location == end_location or upper_offset == 65535:
+            return True
+        if upper_offset >= section_end:
+            return False
+        location = upper_offset * 4 - part_location
+    return False
+
+# Converts a part in a worker process
+def convert_part(file_path,data,hex_location,palette_costume="",original_character_offset="-1",original_character_file_size="-1",debug=False,log_level=SUMMARY,cache=None):
     """
+    Converts one part the way link_folder() does, for running in a worker process.
+
+    Args:
+        file_path (string): File the part was loaded from.
+        data (bytes): Part (RAM model).
+        hex_location (string): Where the part goes in the output.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (string): File size of the original character file.
+        debug (boolean): Prints debugging messages (returned instead of printed).
+        log_level (int): Log level of the process the part is converted for.
+        cache (ModelCache): Links the part's cached relocatable part instead of converting it (see convert_cached()), None to always convert.
+
+    Returns:
+        tuple: (converted data (None if the part doesn't convert), conversion indexes, True if only pointers changed, palette costume sites, printed output).
+    """
+    printed = io.StringIO()
     try:
-        with open(file_path, "rb") as f:
-            offset_decimal = int(offset, 16)
-            f.seek(offset_decimal)
-            data = f.read(num_bytes)
-            #print(f"Data read at {offset}: {data.hex()}")
-            return data.hex()
-    except FileNotFoundError:
-        print(f"Error: File not found at {file_path}")
+        with contextlib.redirect_stdout(printed), log_settings(log_level):
+            converted_model = convert_cached(ModelBuffer(file_path,data),hex_location,file_path+"_temp",palette_costume,original_character_offset,original_character_file_size,debug,cache)
+    except Exception:
+        return None, None, False, None, printed.getvalue()
+    return bytes(converted_model.data), converted_model.conversion_indexes, converted_model.command_index is not None, converted_model.costume_sites, printed.getvalue()
+
+# Gets worker processes, starting them the first time
+def worker_pool(processes):
+    pool = worker_pools.get(processes)
+    if pool is None:
+        pool = concurrent.futures.ProcessPoolExecutor(max_workers=processes)
+        worker_pools[processes] = pool
+    return pool
+
+# Keeps worker processes while running something
+@contextlib.contextmanager
+def worker_pools_kept():
+    """
+    Keeps the worker processes started by convert_parts() for everything run inside (every build of -watch,
+    every job of the server), shutting them down once the outermost block is done.
+
+    Returns:
+        context manager: Gives nothing.
+    """
+    global worker_pool_users
+    worker_pool_users = worker_pool_users + 1
+    try:
+        yield
+    finally:
+        worker_pool_users = worker_pool_users - 1
+        if worker_pool_users == 0:
+            for pool in worker_pools.values():
+                pool.shutdown()
+            worker_pools.clear()
+
+# Converts every RAM part at the same time
+def convert_parts(part_models,part_locations,palette_costume="",original_character_offset="-1",original_character_file_size="-1",debug=False,processes=0,cache=None):
+    """
+    Converts every part that isn't relocatable across worker processes, since where every part goes is
+    known before any of them is linked. Only done with more than one process and parts big enough to be
+    worth starting the processes for (see parallel_min_size), and not when changes are recorded to a
+    log file (worker processes can't write to it). The processes are shut down after unless this is run
+    inside worker_pools_kept().
+
+    Args:
+        part_models (list): Models to add, in the order they're added.
+        part_locations (list): Where every part goes in the output.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (string): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+        processes (int): Worker processes, 0 for the number of CPUs.
+        cache (ModelCache): Links the cached relocatable part of every part instead of converting it (see convert_cached()), None to always convert.
+
+    Returns:
+        list: convert_part() result of every part (None for relocatable parts and parts a worker died on); returns None if the parts should be converted one at a time.
+    """
+    ram_parts = [part_number for part_number, part_model in enumerate(part_models) if not isinstance(part_model, RelocatablePart)]
+    if processes == 0:
+        processes = os.cpu_count() or 1
+    if processes < 2 or len(ram_parts) < 2:
+        return None
+    ram_size = sum(len(part_models[part_number]) for part_number in ram_parts)
+    if recording() or ram_size < parallel_min_size:
+        # Saying why when worker processes were asked for, converting one at a time is a lot slower for big folders
+        count("parts converted one at a time", len(ram_parts))
+        if debug:
+            reason = "changes are recorded to a log file" if recording() else f"the parts are {ram_size} bytes, less than {parallel_min_size}"
+            print(f"Converting {len(ram_parts)} parts one at a time instead of in {processes} worker processes, {reason}")
+        return None
+
+    results = [None] * len(part_models)
+    with worker_pools_kept():
+        pool = worker_pool(processes)
+        try:
+            futures = {pool.submit(convert_part,part_models[part_number].file_path,bytes(part_models[part_number].data),hex(part_locations[part_number]),
+                                   palette_costume,original_character_offset,original_character_file_size,debug,get_level(),cache): part_number for part_number in ram_parts}
+            for future in concurrent.futures.as_completed(futures):
+                results[futures[future]] = future.result()
+        except concurrent.futures.BrokenExecutor:
+            # A worker process died, so the parts get added one at a time instead and the workers are started again next time
+            del worker_pools[processes]
+            pool.shutdown(wait=False)
+            return [None] * len(part_models)
+    return results
+
+# Adds every part to a model in one pass
+def link_folder(base_model,part_models,hex_location="-1",first_pointer="-1",palette_costume="",original_character_offset="-1",original_character_file_size="-1",debug=False,output_path=None,connections=None,op_indexes=None,processes=1,cache=None):
+    """
+    Adds every part to base_model in one go instead of one at a time. Every part's location is worked out
+    from the part sizes first, then the base pointer chain is moved once by the total size being added,
+    every part is converted once and the parts are connected the same way adding them one at a time
+    connects them. The output is only built when it's sure to be the same as adding the parts one at a
+    time (every size is a multiple of 8, every part converts, moving pointers doesn't change any commands,
+    etc), otherwise None is returned and the parts need to be added one at a time.
+
+    Args:
+        base_model (ModelBuffer): Model we're expanding (left unchanged).
+        part_models (list): Models to add (RAM models, they get converted), in the order they're added.
+        hex_location (string): Where we're adding the first part, "-1" for the end of base_model.
+        first_pointer (string): First pointer in base_model, "-1" to find it.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (string): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+        output_path (string): File path the output model is flushed to, defaults to base_model's path.
+        connections (list): Gets the (location in the output, upper half before) of the pointer connected to every part.
+        op_indexes (list): Gets the first E7 command in every part (-1 if there isn't one).
+        processes (int): Worker processes to convert the parts in (see convert_parts()), 0 for the number of CPUs.
+        cache (ModelCache): Links the cached relocatable part of every part instead of converting it (see convert_cached()), None to always convert.
+
+    Returns:
+        ModelBuffer: Output model; returns None if the parts have to be added one at a time.
+    """
+    # Setting part locations
+    base_size = len(base_model)
+    try:
+        insert_location = base_size if hex_location == "-1" else int(hex_location, 16)
+        chain_location = base_model.get_index().original_character_first_pointer() if first_pointer == "-1" else int(first_pointer, 16)
     except ValueError:
-        print(f"Error: Invalid hex location '{offset}'")
-    return None
+        return None
+    if base_size % 8 != 0 or insert_location % 8 != 0 or insert_location <= 0 or insert_location > base_size:
+        return None
+    part_locations = []
+    part_location = insert_location
+    for part_model in part_models:
+        if len(part_model) == 0 or len(part_model) % 8 != 0:
+            return None
+        part_locations.append(part_location)
+        part_location = part_location + len(part_model)
 
-# Finds first E7 command offset
-def find_op_index(file_path):
-    # Setting variables
-    reading_loc = "0x00"
-    file_size = int(os.path.getsize(file_path))
-    reading_loc_hex = hex(int(reading_loc, 16))
-    data = read_hex_from_offset(file_path, reading_loc_hex, 8)
-
-    while 1:
-        # Setting decimal value for location
-        reading_loc_dec = int(reading_loc_hex,16)
-
-        # Finding E7 command
-        if str(data[:8]).upper() == "E7000000":
-            return reading_loc_hex
-
-        # No more to read, exiting
-        if reading_loc_dec >= file_size:
-            print("Couldn't find indexes, exiting.")
-            break
+    # Moving base pointers that point past where the parts go by the total size of the parts
+    if chain_location < 0 or chain_location >= insert_location:
+        return None
+    with stage("base relocation"):
+        try:
+            changes = plan_relocation(base_model.data, chain_location, RelocationTable([(insert_location, part_location - insert_location)]))
+        except ModelError:
+            return None
+        base_data = bytearray(base_model.data)
+        if tracing():
+            for location, upper_offset, lower_offset, new_upper_offset, new_lower_offset in changes:
+                record_change("pointer", base_model.file_path if output_path is None else output_path, location, f"{upper_offset:04x}{lower_offset:04x}", f"{new_upper_offset:04x}{new_lower_offset:04x}")
+        for location, _, _, new_upper_offset, new_lower_offset in changes:
+            # Moving a pointer can't change what command is there, otherwise the base index would be wrong
+            command_location = location - (location % 8)
+            command = (command_kind(base_data, command_location), is_end_command(base_data, command_location))
+            pointer_struct.pack_into(base_data, location, new_upper_offset, new_lower_offset)
+            if (command_kind(base_data, command_location), is_end_command(base_data, command_location)) != command:
+                return None
+    if debug:
+        print(f"Moved pointers past {hex(insert_location)} in {os.path.basename(base_model.file_path)} by {hex(part_location - insert_location)}")
 
-        # Reading next 8 bytes
-        reading_loc = hex(int(reading_loc, 16) + 8)
-        reading_loc_hex = hex(int(reading_loc,16))
-        data = read_hex_from_offset(file_path, reading_loc_hex, 8)
-    return "0x00"
-    
-try:
-    # Get the current working directory
-    current_directory = os.getcwd()
-
-    # Copy the file
-    source_path = os.path.join(current_directory,args.file)
-    destination_path = os.path.join(current_directory,args.o)
-
-    # Setting temp output if we're overwriting
-    if args.file == args.o and args.overwrite == True:
-        output_path = args.o+"temp"
-        destination_path = os.path.join(current_directory, output_path)
-
-    if args.file == args.o:
-        print(f"Error: The file '{args.file}' is the same as the output '{args.o}'.")
-        exit(1)
-
-    # Deleting output file 
-    if os.path.exists(destination_path):
-        os.remove(destination_path)
-        
-    # Copy the file
-    shutil.copy(source_path, destination_path)
-    if args.debug:
-        print(f"File '{os.path.basename(args.file)}' copied and renamed to '{os.path.basename(args.o)}' successfully.")
-
-    # Construct full paths for source and destination
-    folder_to_add_path = os.path.join(current_directory, args.folder_to_add)
-    folder_directory = os.fsencode(folder_to_add_path)
-    last_file_sizes = 0
+    # Converting every part at the same time when it's worth it, they're still connected in order
+    with stage("conversion"):
+        converted_parts = convert_parts(part_models,part_locations,palette_costume,original_character_offset,original_character_file_size,debug,processes,cache)
 
-    # Debug printing
-    print(f"~Adding to {args.o}~")
-
-    # Going through folder
-    if os.path.isdir(folder_to_add_path):
-        for file in os.listdir(folder_directory):
-            # Setting file location
-            filename = os.fsdecode(file)
-            file_to_add_path = os.path.join(folder_to_add_path,filename)
-            file_path = os.path.join(current_directory,args.o)
-
-            # Checking offset
-            if args.offset == "-1":
-                file_size = int(os.path.getsize(file_path))
-                hex_location = hex(file_size)
+    # Converting and connecting parts, buffers[0] is the base and buffers[n] is part n - 1
+    buffers = [base_data]
+    indexes = [base_model.get_index()]
+    costume_sites = None if base_model.costume_sites is None else [site if site < insert_location else site + part_location - insert_location for site in base_model.costume_sites]
+    connected_pointers = set()
+    for part_number, part_model in enumerate(part_models):
+        part_location = part_locations[part_number]
+        part_index = part_model.get_index()
+        first_pointer_fta = part_index.first_pointer
+        end_pointer_loc_fta = part_index.last_pointer()
+        if first_pointer_fta == -1 or end_pointer_loc_fta == -1:
+            return None
+
+        # Last pointer of the output so far
+        segments = [(indexes[0], 0, insert_location, 0)]
+        for buffer_number in range(1, len(buffers)):
+            segments.append((indexes[buffer_number], 0, len(buffers[buffer_number]), buffer_number))
+        segments.append((indexes[0], insert_location, base_size, 0))
+        end_pointer = find_last_pointer_in_segments(segments)
+        if end_pointer is None:
+            return None
+        buffer_number, end_pointer_loc = end_pointer
+        end_pointer_upper = half_struct.unpack_from(buffers[buffer_number], end_pointer_loc)[0]
+        if end_pointer_upper != 65535 and end_pointer not in connected_pointers:
+            return None
+
+        # Converting part
+        with stage("conversion"):
+            try:
+                if isinstance(part_model, RelocatablePart):
+                    converted_model = part_model.link(hex(part_location),part_model.file_path+"_temp",palette_costume,original_character_offset,original_character_file_size)
+                elif converted_parts is not None:
+                    if converted_parts[part_number] is None:
+                        return None
+                    converted_data, conversion_indexes, only_pointers_changed, costume_sites, printed = converted_parts[part_number]
+                    print(printed, end="")
+                    if converted_data is None:
+                        return None
+                    converted_model = ModelBuffer(part_model.file_path+"_temp",converted_data)
+                    converted_model.conversion_indexes = conversion_indexes
+                    converted_model.costume_sites = costume_sites
+                    if only_pointers_changed:
+                        converted_model.command_index = part_index
+                else:
+                    converted_model = convert_cached(part_model,hex(part_location),part_model.file_path+"_temp",palette_costume,original_character_offset,original_character_file_size,debug,cache)
+            except Exception:
+                return None
+        converted_data = converted_model.data
+        if len(converted_data) != len(part_model):
+            return None
+
+        # Last pointer in the part takes over from the last pointer so far, which now points to the part
+        half_struct.pack_into(converted_data, end_pointer_loc_fta, end_pointer_upper)
+        pointer_connect = int((first_pointer_fta + part_location) / 4)
+        if pointer_connect >= 65536:
+            return None
+        half_struct.pack_into(buffers[buffer_number], end_pointer_loc, pointer_connect)
+        connected_pointers.add(end_pointer)
+        if connections is not None:
+            if buffer_number == 0:
+                output_location = end_pointer_loc if end_pointer_loc < insert_location else end_pointer_loc + part_locations[-1] + len(part_models[-1]) - insert_location
             else:
-                hex_location = hex(int(args.offset,16) + last_file_sizes)
-                file_size = int(os.path.getsize(file_to_add_path))
-                last_file_sizes = last_file_sizes + file_size
-
-            # Getting first op command for printing help
-            op_index = find_op_index(file_to_add_path) 
-            op_index = hex(int(op_index,16)+int(hex_location,16))
-            op_index_segmented = hex(int(int(op_index,16) / 4))
-
-            # Debug printing
-            if args.debug:
-                print(f"{hex_location}: Adding {filename} to {args.o}; E7 at {op_index} ({op_index_segmented})")
+                output_location = part_locations[buffer_number - 1] + end_pointer_loc
+            connections.append((output_location, end_pointer_upper))
+        if op_indexes is not None:
+            op_indexes.append(part_index.first_command(RDP_SYNC))
+        if debug:
+            print(f"{hex(end_pointer_loc)}: connecting to {hex(first_pointer_fta + part_location)} in {'base' if buffer_number == 0 else 'part ' + str(buffer_number - 1)}")
+
+        if not part_chain_stays_inside(converted_data,first_pointer_fta,end_pointer_loc_fta,part_location):
+            return None
+        buffers.append(converted_data)
+        if costume_sites is not None and converted_model.costume_sites is not None:
+            costume_sites = costume_sites + [part_location + site for site in converted_model.costume_sites]
+        else:
+            costume_sites = None
+
+        # Converting only changes pointers, so the part's own index still has the right commands
+        if converted_model.command_index is not None:
+            indexes.append(converted_model.command_index)
+        else:
+            indexes.append(converted_model.get_index())
+
+    # Building output
+    if output_path is None:
+        output_path = base_model.file_path
+    with stage("tail append"):
+        output_model = ModelBuffer(output_path, b"".join([base_data[:insert_location]] + buffers[1:] + [base_data[insert_location:]]))
+    output_model.costume_sites = None if costume_sites is None else sorted(costume_sites)
+    return output_model
+
+# Adds the parts that changed since the last build
+def relink_folder(previous_build,base_model,part_models,part_names,part_hashes,arguments,first_pointer="-1",palette_costume="",original_character_offset="-1",original_character_file_size="-1",debug=False,output_path=None,connections=None,op_indexes=None,processes=1,cache=None):
+    """
+    Gives the same output as link_folder() for parts added to the end of base_model, by keeping the last
+    build up to the first part that changed and only linking the parts from there on. The last build is
+    only kept if it was made from the same base file with the same arguments and none of the base pointers
+    point past its end (so the size of the parts doesn't change the base).
+
+    Args:
+        previous_build (tuple): (manifest, data) of the last build from load_previous_build().
+        base_model (ModelBuffer): Model we're expanding (left unchanged).
+        part_models (list): Models to add (RAM models, they get converted), in the order they're added.
+        part_names (list): File name of every part.
+        part_hashes (list): SHA-256 of every part file.
+        arguments (dict): Arguments of this build from build_arguments().
+        first_pointer (string): First pointer in base_model, "-1" to find it.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (string): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+        output_path (string): File path the output model is flushed to, defaults to base_model's path.
+        connections (list): Gets the (location in the output, upper half before) of the pointer connected to every part.
+        op_indexes (list): Gets the first E7 command in every part (-1 if there isn't one).
+        processes (int): Worker processes to convert the parts in (see convert_parts()), 0 for the number of CPUs.
+        cache (ModelCache): Links the cached relocatable part of every part instead of converting it (see convert_cached()), None to always convert.
+
+    Returns:
+        ModelBuffer: Output model; returns None if the last build can't be used.
+    """
+    manifest, previous_data = previous_build
+    if manifest.base_size != len(base_model) or manifest.arguments != arguments or manifest.base_hash != hashlib.sha256(base_model.data).hexdigest():
+        return None
+
+    # Parts that are the same as last time
+    unchanged = 0
+    for part, part_name, part_hash in zip(manifest.parts, part_names, part_hashes):
+        if part["name"] != part_name or part["hash"] != part_hash:
+            break
+        unchanged = unchanged + 1
+    if unchanged == 0:
+        return None
+
+    # Keeping the last build up to the first part that changed, with the pointer connected to it put back
+    try:
+        if unchanged < len(manifest.parts):
+            keep_size = manifest.parts[unchanged]["offset"]
+            connection_location, connection_upper = manifest.parts[unchanged]["connection"]
+            if connection_location + 2 > keep_size:
+                return None
+            prefix = bytearray(previous_data[:keep_size])
+            half_struct.pack_into(prefix, connection_location, connection_upper)
+        else:
+            prefix = bytearray(previous_data)
+        kept_connections = [tuple(part["connection"]) for part in manifest.parts[:unchanged]]
+        kept_op_indexes = [int(part["e7"]) for part in manifest.parts[:unchanged]]
+    except (KeyError, TypeError, ValueError, struct.error):
+        return None
+    if debug:
+        print(f"Keeping the first {unchanged} of {len(part_models)} parts from the last build ({hex(len(prefix))} bytes)")
+    if output_path is None:
+        output_path = base_model.file_path
+    prefix_model = ModelBuffer(output_path, prefix)
+    prefix_model.costume_sites = None  # The last build's palette commands aren't recorded in the manifest
+    if unchanged == len(part_models):
+        linked_model = prefix_model
+    else:
+        # Linking the rest of the parts to the end of what's kept, like they're linked to the end of the base
+        try:
+            chain_location = prefix_model.get_index().original_character_first_pointer() if first_pointer == "-1" else int(first_pointer, 16)
+        except ValueError:
+            return None
+        if points_past(prefix_model, chain_location, len(prefix)):
+            return None
+        new_connections = []
+        new_op_indexes = []
+        linked_model = link_folder(prefix_model,part_models[unchanged:],"-1",first_pointer,palette_costume,original_character_offset,original_character_file_size,debug,output_path,new_connections,new_op_indexes,processes,cache)
+        if linked_model is None:
+            return None
+        kept_connections = kept_connections + new_connections
+        kept_op_indexes = kept_op_indexes + new_op_indexes
+    if connections is not None:
+        connections.extend(kept_connections)
+    if op_indexes is not None:
+        op_indexes.extend(kept_op_indexes)
+    return linked_model
+
+# Adds every file in a folder to a model file, one after the other
+def append_folder(file_path,folder_to_add_path,output_path="output.bin",hex_location="-1",add="",subtract="",first_pointer="-1",first_pointer_fta="-1",convert=True,palette_costume="",original_character_offset="-1",original_character_file_size="-1",debug=False,overwrite=False,single_pass=True,processes=0,cache=None,models=None,plan_path=""):
+    """
+    Adds every file in folder_to_add_path to file_path (in os.listdir order) while adding offset to all pointers affected.
+    The files are linked in one pass when possible (see link_folder), otherwise they're added one at a time with
+    the model kept in memory between files. The output is only written once at the end.
+
+    Args:
+        file_path (string): File we're expanding (pointers here need to be connected).
+        folder_to_add_path (string): Folder of files to add.
+        output_path (string): Output file.
+        hex_location (string): Where we're adding the first file, "-1" to add every file to the end.
+        add (string): Amount to add to pointers.
+        subtract (string): Amount to subtract from pointers.
+        first_pointer (string): First pointer in file_path, "-1" to find it.
+        first_pointer_fta (string): First pointer in each file we're adding, "-1" to find it, "-2" to append them without changing pointers.
+        convert (boolean): Converts the files we're adding from RAM models to ROM models.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (string): File size of the original character file, "-1" to use the size of file_path.
+        debug (boolean): Prints debugging messages.
+        overwrite (boolean): Writes the output over file_path.
+        single_pass (boolean): Links every file in one pass when it gives the same output as adding them one at a time.
+        processes (int): Worker processes to convert the files in when they're linked in one pass, 0 for the number of CPUs.
+        cache (ModelCache): Links the cached relocatable part of every file in folder_to_add_path instead of converting it (see convert_cached()), None to always convert.
+        models (ModelStore): Models already in memory to load files from, None to read them from disk.
+        plan_path (string): Writes a patch plan here instead of the output (see ssb_binary_model_plan.py), "" to write the output.
+
+    Returns:
+        ModelBuffer: Output model.
+    """
+    # Checking arguments
+    check_arguments(folder_to_add_path,add,subtract,palette_costume)
+
+    build_manifest = None
+    try:
+        # Get the current working directory
+        current_directory = os.getcwd()
+
+        # Construct full paths for source and destination
+        source_path = os.path.join(current_directory,file_path)
+        destination_path = os.path.join(current_directory,output_path)
+
+        # Setting temp output if we're overwriting
+        if file_path == output_path and overwrite == True:
+            destination_path = os.path.join(current_directory, output_path+"temp")
+
+        if file_path == output_path and overwrite == False:
+            print(f"Error: The file '{file_path}' is the same as the output '{output_path}'.")
+            raise ModelError(f"The file '{file_path}' is the same as the output '{output_path}'.")
+
+        # Loading the last build, so only the files that changed since then get added
+        previous_build = None
+        if single_pass and convert and first_pointer_fta == "-1" and not overwrite:
+            previous_build = load_previous_build(destination_path)
+
+        # Deleting output file
+        if os.path.exists(destination_path) and plan_path == "":
+            os.remove(destination_path)
+
+        # Loading the file, the output is only written once every file is added
+        with stage("load"):
+            output_model = ModelBuffer(source_path) if models is None else models.load(source_path)
+        base_model = output_model
+        output_model.file_path = destination_path
+        if debug:
+            print(f"File '{os.path.basename(file_path)}' loaded as '{os.path.basename(output_path)}' successfully.")
+
+        # Checking if original_character_file_size is set
+        if original_character_offset != "-1" and original_character_file_size == "-1":
+            original_character_file_size = str(len(output_model))
+
+        # Construct full paths for source and destination
+        folder_to_add_path = os.path.join(current_directory, folder_to_add_path)
+        folder_directory = os.fsencode(folder_to_add_path)
+        last_file_sizes = 0
+
+        # Debug printing
+        summary(f"~Adding to {output_path}~")
+
+        # Going through folder
+        if os.path.isdir(folder_to_add_path):
+            # Loading every file
+            filenames = [os.fsdecode(file) for file in os.listdir(folder_directory)]
+            with stage("load"):
+                file_to_add_models = [load_part(os.path.join(folder_to_add_path,filename)) if models is None else models.load(os.path.join(folder_to_add_path,filename)) for filename in filenames]
+
+            # Adding every file in one pass when that gives the same output as adding them one at a time
+            linked_model = None
+            if single_pass and convert and first_pointer_fta == "-1":
+                link_output = io.StringIO()
+                with contextlib.redirect_stdout(link_output):
+                    # Builds can only be reused when the files go to the end of the file and nothing in it points past there
+                    try:
+                        chain_location = output_model.get_index().original_character_first_pointer() if first_pointer == "-1" else int(first_pointer,16)
+                        incremental = not overwrite and (hex_location == "-1" or int(hex_location,16) == len(output_model)) and not points_past(output_model,chain_location,len(output_model))
+                    except ValueError:
+                        incremental = False
+                    connections = []
+                    op_indexes = []
+                    if incremental:
+                        part_hashes = [file_hash(os.path.join(folder_to_add_path,filename)) for filename in filenames]
+                        arguments = build_arguments(first_pointer,palette_costume,original_character_offset,original_character_file_size)
+                        if previous_build is not None:
+                            with stage("relink"):
+                                linked_model = relink_folder(previous_build,output_model,file_to_add_models,filenames,part_hashes,arguments,first_pointer,palette_costume,original_character_offset,original_character_file_size,debug,destination_path,connections,op_indexes,processes,cache)
+                    if linked_model is None:
+                        connections = []
+                        op_indexes = []
+                        linked_model = link_folder(output_model,file_to_add_models,hex_location,first_pointer,palette_costume,original_character_offset,original_character_file_size,debug,destination_path,connections,op_indexes,processes,cache)
+
+                    # Recording where every file went for the next build
+                    if linked_model is not None and incremental and len(connections) == len(file_to_add_models):
+                        parts = []
+                        part_location = len(output_model)
+                        for filename, file_to_add_model, part_hash, connection, op_index in zip(filenames, file_to_add_models, part_hashes, connections, op_indexes):
+                            parts.append({"name": filename, "hash": part_hash, "size": len(file_to_add_model), "offset": part_location, "connection": list(connection), "e7": op_index})
+                            part_location = part_location + len(file_to_add_model)
+                        build_manifest = BuildManifest(hashlib.sha256(output_model.data).hexdigest(),len(output_model),arguments,None,parts)
+                if linked_model is None and debug:
+                    print("Couldn't add every file in one pass, adding them one at a time.")
+
+            if linked_model is not None:
+                part_location = len(output_model) if hex_location == "-1" else int(hex_location,16)
+                for part_number, (filename, file_to_add_model) in enumerate(zip(filenames, file_to_add_models)):
+                    print_part_location(filename,file_to_add_model,hex(part_location),output_path,debug,op_indexes[part_number] if part_number < len(op_indexes) else None)
+                    part_location = part_location + len(file_to_add_model)
+
+                # Printing output
+                if debug:
+                    print(f"~Output from {output_path}:~\n\n{link_output.getvalue()}")
+                output_model = linked_model
             else:
-                print(f"--{hex_location}: Adding {filename}; E7 at {op_index} ({op_index_segmented})")
-
-            # Adding file here
-            current_python_file_directory = os.path.dirname(os.path.realpath(__file__))
-            python_file_path = os.path.join(current_python_file_directory, "ssb_binary_model_adder.py")
-            arguments = ["-file", args.o, "-file_to_add", file_to_add_path, "-add", args.add, "-subtract", args.subtract, "-offset", hex_location, "-first_pointer", args.first_pointer, "-first_pointer_file_to_add", args.first_pointer_file_to_add, "-palette_costume", args.palette_costume, "-original_character_offset", args.original_character_offset, "-original_character_file_size", args.original_character_file_size, "-python", args.python, "-output", args.o]
-            if args.debug:
-                arguments.append("-debug")
-            if args.no_convert:
-                arguments.append("-no_convert")
-            # if args.palette_costume:
-            #     arguments.append("-palette_costume")
-            # if args.overwrite:
-                # arguments.append("-overwrite")
-            # Forcing overwrite
-            arguments.append("-overwrite")
-
-            # command = [python_version, python_convert_path]
-            command = [args.python, python_file_path] + arguments
-            # Converting file_to_add
-            result = subprocess.run(command, capture_output=True, text=True)
-
-            # Printing output
-            if args.debug:
-                print(f"~Output from {args.o}:~\n\n{result.stdout}")
-                if (result.stderr):
-                    print(f"~Errors from {args.o}:~\n\n{result.stderr}")
-                
-        # Deleting temporary file we used to modify pointers with
-        if os.path.exists(args.o+"temp"):
-            os.remove(args.o+"temp")
-            if args.debug:
-                print(f"Removing {args.o}temp")
+                for filename, file_to_add_model in zip(filenames, file_to_add_models):
+                    # Checking offset
+                    if hex_location == "-1":
+                        file_size = len(output_model)
+                        part_hex_location = hex(file_size)
+                    else:
+                        part_hex_location = hex(int(hex_location,16) + last_file_sizes)
+                        file_size = len(file_to_add_model)
+                        last_file_sizes = last_file_sizes + file_size
+                    print_part_location(filename,file_to_add_model,part_hex_location,output_path,debug)
+
+                    # Adding file here, a file that can't be added is left out of the output
+                    part_output = io.StringIO()
+                    with contextlib.redirect_stdout(part_output):
+                        try:
+                            output_model = append_to_model(output_model,file_to_add_model,part_hex_location,add,subtract,first_pointer,first_pointer_fta,convert,palette_costume,original_character_offset,original_character_file_size,debug,destination_path,cache)
+                        except ModelError:
+                            pass
+                        except Exception as e:
+                            error_message(e)
+
+                    # Printing output
+                    if debug:
+                        print(f"~Output from {output_path}:~\n\n{part_output.getvalue()}")
+        else:
+            print(f"The destination given '{folder_to_add_path}' is not a folder, exiting.")
+            raise ModelError(f"The destination given '{folder_to_add_path}' is not a folder.")
+    except ModelError:
+        raise
+    except Exception as e:
+        exc_type, exc_obj, exc_tb = sys.exc_info()
+        fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
+        print(f"In file {fname} on line {exc_tb.tb_lineno}: An error occurred: {e}")
+        raise ModelError(e)
+
+    # Writing the plan instead of the output
+    if plan_path != "":
+        with stage("write"):
+            save_plan(base_model,output_model,len(base_model) if hex_location == "-1" else int(hex_location,16),os.path.join(current_directory, plan_path),source_path)
+        return output_model
+
+    # Writing output, copying whatever didn't change straight from the base file
+    with stage("write"):
+        output_model.flush(source_path=source_path)
+
+        # Recording the build, the next one only adds the files that changed since
+        if build_manifest is not None:
+            build_manifest.output_hash = hashlib.sha256(output_model.data).hexdigest()
+            build_manifest.save(manifest_path(destination_path))
+        else:
+            remove_manifest(manifest_path(destination_path))
+
+    # Overwriting base file
+    if overwrite:
+        # Renaming temp to base, the base file is never left half written
+        with stage("overwrite"):
+            os.replace(destination_path, source_path)
+        summary(f"Finished modifying {os.path.basename(source_path)}.")
     else:
-        print(f"The destination given '{folder_to_add_path}' is not a folder, exiting.")
-        exit(1)
-except FileNotFoundError as e:
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-    print(f"In file {fname} on line {exc_tb.tb_lineno}: An error occurred: {e}")
-    exit(1)
-except Exception as e:
-    exc_type, exc_obj, exc_tb = sys.exc_info()
-    fname = os.path.split(exc_tb.tb_frame.f_code.co_filename)[1]
-    print(f"In file {fname} on line {exc_tb.tb_lineno}: An error occurred: {e}")
-    exit(1)
-
-    
-# Overwriting base file
-if args.overwrite:
-    # Deleting base file
-    if os.path.exists(source_path):
-        os.remove(source_path)
-
-    # Copying temp to base
-    shutil.copy(destination_path, source_path)
-
-    # Deleting temp file
-    if os.path.exists(destination_path):
-        os.remove(destination_path)
-    print(f"Finished modifying {os.path.basename(source_path)}.")
-else:
-    print(f"Finished modifying {os.path.basename(destination_path)}.")
\ No newline at end of file
+        summary(f"Finished modifying {os.path.basename(destination_path)}.")
+
+    return output_model
+
+# Adds a folder with command line arguments
+def run_folder(args,cache=None,models=None):
+    """
+    Adds args.folder_to_add to args.file once for every costume in -costume, then keeps adding it again
+    whenever it changes if -watch is set.
+
+    Args:
+        args (Namespace): Parsed adder arguments.
+        cache (ModelCache): Cache of converted parts, None to always convert.
+        models (ModelStore): Models already in memory to load files from, None to read them from disk.
+
+    Returns:
+        None
+    """
+    arguments = {"hex_location": args.offset, "add": args.add, "subtract": args.subtract, "first_pointer": args.first_pointer, "first_pointer_fta": args.first_pointer_file_to_add,
+                 "convert": not args.no_convert, "palette_costume": args.palette_costume, "original_character_offset": args.original_character_offset,
+                 "original_character_file_size": args.original_character_file_size, "debug": args.debug, "overwrite": args.overwrite, "single_pass": not args.sequential, "processes": args.processes, "cache": cache, "models": models}
+    costumes = parse_costumes(args.palette_costume)
+    if len(costumes) > 1 and (args.watch or args.overwrite):
+        error_message("Error, -watch and -overwrite can't be used with more than one costume, exiting.")
+        raise ModelError("-watch and -overwrite can't be used with more than one costume.")
+    if args.watch and args.plan != "":
+        error_message("Error, -watch can't be used with -plan, exiting.")
+        raise ModelError("-watch can't be used with -plan.")
+
+    # Every build below uses the same worker processes, they're shut down once they're all done
+    with worker_pools_kept():
+        if args.plan != "":
+            # Every costume gets its own plan, nothing is written to patch the others from
+            del arguments["palette_costume"]
+            for costume in costumes:
+                append_folder(args.file,args.folder_to_add,args.o,palette_costume=costume,plan_path=plan_path_of(args.plan,costumes,costume),**arguments)
+        elif args.watch:
+            watch_folder(args.file,args.folder_to_add,args.o,args.watch_interval,args.debounce,**arguments)
+        else:
+            del arguments["palette_costume"]
+            build_costumes(lambda output_path, palette_costume: append_folder(args.file,args.folder_to_add,output_path,palette_costume=palette_costume,**arguments),costumes,args.o)
+
+# Runs the folder adder from the command line
+def main(argv=None,models=None):
+    """
+    Runs the folder adder with command line arguments.
+
+    Args:
+        argv (list): Arguments to parse, defaults to sys.argv.
+        models (ModelStore): Models already in memory to load files from, None to read them from disk.
+
+    Returns:
+        int: Exit code.
+    """
+    args = parse_args(argv)
+    cache = cache_from_args(args)
+    try:
+        with log_from_args(args), profile_from_args(args):
+            run_folder(args,cache,models)
+    except ModelError:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
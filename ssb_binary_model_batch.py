@@ -0,0 +1,290 @@
+# Runs a manifest of adder, folder and converter jobs, running jobs that don't depend on each other in parallel.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import argparse
+import concurrent.futures
+import json
+import os
+import time
+from ssb_binary_model_adder_arguments import parse_args as parse_adder_args
+from ssb_binary_model_converter import parse_args as parse_converter_args
+from ssb_binary_model_costumes import costume_output_paths, parse_costumes
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_manifest import manifest_path
+from ssb_binary_model_server import run_job
+
+class BatchJob:
+    """
+    One job of a batch manifest, with the files it reads and writes.
+
+    Args:
+        name (string): Name of the job (the output's full path if the manifest doesn't give one).
+        command (string): "adder", "folder" or "convert".
+        argv (list): Command line arguments of the job.
+        cwd (string): Folder the job runs in.
+        after (list): Names of jobs that have to finish first.
+    """
+    def __init__(self, name, command, argv, cwd, after):
+        self.name = name
+        self.command = command
+        self.argv = argv
+        self.cwd = cwd
+        self.after = after
+        self.reads, self.writes, self.output = job_files(command, argv, cwd)
+        self.depends = set()    # Indexes of jobs that have to finish first
+
+# Turns a job's arguments into command line arguments
+def job_argv(arguments):
+    """
+    Turns a dict of arguments into command line arguments, True adding the flag and False or None leaving it out.
+
+    Args:
+        arguments (dict): Arguments by name (without the "-"), ex: {"file": "1557_isaac", "cache": True}.
+
+    Returns:
+        list: Command line arguments.
+    """
+    argv = []
+    for name, value in arguments.items():
+        if value is True:
+            argv.append("-" + name)
+        elif value is not False and value is not None:
+            argv.extend(["-" + name, str(value)])
+    return argv
+
+# Files a job reads and writes
+def job_files(command, argv, cwd):
+    """
+    Gets the files (and folders) a job reads and the files it writes from its arguments, naming every
+    costume's output (or plan) the way the adder does.
+
+    Args:
+        command (string): "adder", "folder" or "convert".
+        argv (list): Command line arguments of the job.
+        cwd (string): Folder the job runs in.
+
+    Returns:
+        tuple: (set of paths read, set of paths written, first path written), as absolute paths.
+    """
+    if command == "convert":
+        args = parse_converter_args(argv)
+        output_paths = [args.file if args.overwrite else args.o]
+        reads = {args.file}
+        writes = set(output_paths)
+    else:
+        args = parse_adder_args(argv, quiet=True)
+        costumes = parse_costumes(args.palette_costume)
+        reads = {args.file}
+        reads.update(path for path in (args.file_to_add, args.folder_to_add) if path != "")
+        if args.plan != "":
+            # Plans are all that's written
+            output_paths = costume_output_paths(args.plan, costumes)
+            writes = set(output_paths)
+        else:
+            output_paths = costume_output_paths(args.file if args.overwrite else args.o, costumes)
+            writes = set(output_paths)
+            if command == "folder" or args.folder_to_add != "":
+                writes.update(manifest_path(output_path) for output_path in output_paths)
+    reads = {os.path.abspath(os.path.join(cwd, path)) for path in reads}
+    writes = {os.path.abspath(os.path.join(cwd, path)) for path in writes}
+    return reads, writes, os.path.abspath(os.path.join(cwd, output_paths[0]))
+
+# Checks if a job reads a file
+def reads_path(job, path):
+    return path in job.reads or os.path.dirname(path) in job.reads
+
+# Reads a batch manifest
+def read_batch(manifest_path):
+    """
+    Reads a batch manifest, a JSON list of jobs (or {"jobs": [...]}). Every job has a "command" ("adder",
+    "folder" or "convert", "adder" by default), either "args" (dict of arguments by name) or "argv" (list of
+    command line arguments), and optionally "name", "cwd" (relative to the manifest's folder, where the job
+    runs) and "after" (names of jobs that have to finish first).
+
+    A job also waits for every earlier job that writes a file it reads (or a file in a folder it adds), and
+    a file is locked by the earliest job writing or reading it until that job is done, so jobs writing the
+    same output (or writing what an earlier job reads) run in manifest order.
+
+    Args:
+        manifest_path (string): Manifest file.
+
+    Returns:
+        list: BatchJob of every job, in manifest order.
+    """
+    try:
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError) as e:
+        error_message(f"Error, couldn't read batch manifest {manifest_path}: {e}")
+        raise ModelError(f"Couldn't read batch manifest {manifest_path}.")
+    if isinstance(manifest, dict):
+        manifest = manifest.get("jobs", [])
+    manifest_directory = os.path.dirname(os.path.abspath(manifest_path))
+
+    jobs = []
+    for number, entry in enumerate(manifest):
+        command = entry.get("command", "adder")
+        if command not in ("adder", "folder", "convert"):
+            error_message(f"Error, job {number} has unknown command {command}, has to be one of adder, folder, convert.")
+            raise ModelError(f"Unknown command {command}.")
+        argv = [str(arg) for arg in entry["argv"]] if "argv" in entry else job_argv(entry.get("args", {}))
+        cwd = os.path.join(manifest_directory, entry.get("cwd", ""))
+        try:
+            job = BatchJob(entry.get("name", ""), command, argv, cwd, list(entry.get("after", [])))
+        except SystemExit:
+            # argparse printed what's wrong
+            error_message(f"Error, job {entry.get('name', number)} has bad arguments.")
+            raise ModelError(f"Job {entry.get('name', number)} has bad arguments.")
+        if job.name == "":
+            job.name = job.output
+        jobs.append(job)
+
+    # Names have to be unique for "after"
+    indexes = {}
+    for index, job in enumerate(jobs):
+        if job.name in indexes:
+            error_message(f"Error, more than one job is named {job.name}.")
+            raise ModelError(f"More than one job is named {job.name}.")
+        indexes[job.name] = index
+
+    for index, job in enumerate(jobs):
+        for name in job.after:
+            if name not in indexes:
+                error_message(f"Error, job {job.name} runs after {name}, which isn't in the manifest.")
+                raise ModelError(f"Unknown job {name}.")
+            job.depends.add(indexes[name])
+        for earlier_index in range(index):
+            earlier_job = jobs[earlier_index]
+            if any(reads_path(job, path) for path in earlier_job.writes) or job.writes & earlier_job.writes or any(reads_path(earlier_job, path) for path in job.writes):
+                job.depends.add(earlier_index)
+    check_cycles(jobs)
+    return jobs
+
+# Makes sure jobs don't wait on each other
+def check_cycles(jobs):
+    remaining = {index: set(job.depends) for index, job in enumerate(jobs)}
+    while remaining:
+        ready = [index for index, depends in remaining.items() if not depends & remaining.keys()]
+        if not ready:
+            names = ", ".join(jobs[index].name for index in sorted(remaining))
+            error_message(f"Error, jobs {names} wait on each other.")
+            raise ModelError("Jobs wait on each other.")
+        for index in ready:
+            del remaining[index]
+
+# Runs one job in a worker process
+def run_batch_job(command, argv, cwd):
+    """
+    Runs one job like the command line would (see run_job()), timing it.
+
+    Args:
+        command (string): "adder", "folder" or "convert".
+        argv (list): Command line arguments of the job.
+        cwd (string): Folder the job runs in.
+
+    Returns:
+        dict: "exit" (exit code), "output" (everything printed) and "seconds".
+    """
+    start = time.perf_counter()
+    reply = run_job({"command": command, "argv": argv, "cwd": cwd}, None)
+    reply["seconds"] = time.perf_counter() - start
+    return reply
+
+# Runs every job of a manifest
+def run_batch(manifest_path, processes=None, verbose=False):
+    """
+    Runs every job in a batch manifest (see read_batch()) across processes worker processes, starting
+    every job once the jobs it depends on are done. Jobs depending on a job that failed are skipped.
+    Prints every job's timing and the throughput of the whole batch at the end.
+
+    Args:
+        manifest_path (string): Manifest file.
+        processes (int): Worker processes, defaults to the number of CPUs.
+        verbose (boolean): Prints what every job printed, not only the jobs that failed.
+
+    Returns:
+        dict: Result of every job by name ("exit" (None if skipped), "output", "seconds").
+    """
+    jobs = read_batch(manifest_path)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    processes = max(1, min(processes, len(jobs) or 1))
+    print(f"~Running {len(jobs)} jobs from {os.path.basename(manifest_path)} on {processes} processes~")
+
+    results = {}
+    finished = set()
+    failed = set()
+    start = time.perf_counter()
+    with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as executor:
+        running = {}
+        waiting = list(range(len(jobs)))
+        while waiting or running:
+            # Starting every job that isn't waiting on another, skipping the ones waiting on a failed job
+            for index in list(waiting):
+                job = jobs[index]
+                if job.depends & failed:
+                    waiting.remove(index)
+                    failed.add(index)
+                    results[job.name] = {"exit": None, "output": "", "seconds": 0.0}
+                    print(f"--{job.name}: skipped, waits on a job that failed")
+                elif job.depends <= finished:
+                    waiting.remove(index)
+                    running[executor.submit(run_batch_job, job.command, job.argv, job.cwd)] = index
+            if not running:
+                continue
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                index = running.pop(future)
+                job = jobs[index]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    # The worker process died
+                    result = {"exit": 1, "output": f"{e}\n", "seconds": 0.0}
+                results[job.name] = result
+                if result["exit"] == 0:
+                    finished.add(index)
+                    print(f"--{job.name}: done in {result['seconds'] * 1000:.1f} ms")
+                else:
+                    failed.add(index)
+                    print(f"--{job.name}: failed (exit {result['exit']}) in {result['seconds'] * 1000:.1f} ms")
+                if verbose or result["exit"] != 0:
+                    print(result["output"], end="")
+    elapsed = time.perf_counter() - start
+
+    # Report
+    written = 0
+    for index in finished:
+        for path in jobs[index].writes:
+            if os.path.exists(path):
+                written = written + os.path.getsize(path)
+    job_seconds = sum(result["seconds"] for result in results.values())
+    skipped = sum(1 for result in results.values() if result["exit"] is None)
+    name_width = max([len(job.name) for job in jobs] + [3])
+    print(f"\n{'Job':<{name_width}}  {'Exit':>4}  {'ms':>9}")
+    for job in jobs:
+        result = results[job.name]
+        print(f"{job.name:<{name_width}}  {'-' if result['exit'] is None else result['exit']:>4}  {result['seconds'] * 1000:>9.1f}")
+    print(f"~{len(finished)} of {len(jobs)} jobs done ({len(failed) - skipped} failed, {skipped} skipped) in {elapsed:.2f} s: "
+          f"{len(finished) / elapsed if elapsed > 0 else 0:.1f} jobs/s, {written / (1 << 20) / elapsed if elapsed > 0 else 0:.2f} MB/s written, "
+          f"{job_seconds / elapsed if elapsed > 0 else 0:.2f}x as fast as running them one at a time~")
+    return results
+
+# Runs a batch from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-manifest","--manifest","-jobs_file","--jobs_file",required=True,type=str,help="JSON manifest of jobs to run (see read_batch() in ssb_binary_model_batch.py).")
+    parser.add_argument("-processes","--processes","-j","--j",default=0,type=int,help="Worker processes (defaults to the number of CPUs).")
+    parser.add_argument("-verbose","--verbose",action="store_true",help="Prints what every job printed, not only the jobs that failed.")
+    args = parser.parse_args(argv)
+    try:
+        results = run_batch(args.manifest, args.processes or None, args.verbose)
+    except ModelError:
+        return 1
+    return 0 if all(result["exit"] == 0 for result in results.values()) else 1
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,303 @@
+# Times every stage of adding models (scanning, moving pointers, converting, adding and linking folders) on made up models.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import argparse
+import contextlib
+import datetime
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import struct
+import tempfile
+import time
+from ssb_binary_model_adder import append_to_model
+from ssb_binary_model_adder_folder import link_folder
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_converter import convert_model
+from ssb_binary_model_errors import ModelError
+from ssb_binary_model_index import DisplayListIndex
+from ssb_binary_model_relocation import RelocationTable, apply_relocation, end_pointer, numpy, plan_relocation
+
+benchmark_version = 1
+ram_offset = 0x80400000         # Where made up RAM models start
+word_struct = struct.Struct(">I")
+pointer_struct = struct.Struct(">HH")
+default_sizes = "16,64,192"     # KB
+default_parts = "1,10,100"
+chain_pointers = 30000          # Pointers in the long chain moved with and without NumPy
+
+# Packs 32 bit words
+def words(*values):
+    return b"".join(word_struct.pack(value & 0xFFFFFFFF) for value in values)
+
+# Makes a RAM model like Model2F3DEX-SSB gives
+def ram_model(seed=0, num_blocks=3, num_vertices=8):
+    """
+    Makes a RAM model: a palette, a texture and vertices followed by a display list (E7, FA, FD1 palette,
+    E8, F5, FD5 texture, then an 01 vertex, 06 triangle and 05 triangle command for every block, a DE jump
+    after the first block and DF at the end), every pointer being a RAM address from ram_offset.
+
+    Args:
+        seed (int): Seed for the palette, texture and vertex data.
+        num_blocks (int): How many vertex blocks there are.
+        num_vertices (int): Vertices per block.
+
+    Returns:
+        bytes: Model data.
+    """
+    rng = random.Random(seed)
+    palette = bytes(rng.randrange(1, 256) for _ in range(0x20))
+    texture = rng.randbytes(0x80)
+    vertices = rng.randbytes(num_vertices * 16 * num_blocks)
+    vertex_offset = len(palette) + len(texture)
+    display_list = bytearray()
+    display_list += words(0xE7000000, 0)
+    display_list += words(0xFA000000, 0xFFFFFFFF)
+    display_list += words(0xFD100000, ram_offset)
+    display_list += words(0xE8000000, 0)
+    display_list += words(0xF5100000, 0x07000000)
+    display_list += words(0xFD500000, ram_offset + len(palette))
+    for block in range(num_blocks):
+        display_list += words(0x01000000 | (num_vertices << 12) | (num_vertices * 2), ram_offset + vertex_offset + block * num_vertices * 16)
+        display_list += words(0x06000204, 0x00060810)
+        display_list += words(0x05000204, 0)
+        if block == 0:
+            display_list += words(0xDE010000, ram_offset + vertex_offset)
+    display_list += words(0xDF000000, 0)
+    data = palette + texture + vertices + bytes(display_list)
+    return data + bytes(-len(data) % 8)
+
+# Makes a ROM model with a pointer chain
+def rom_model(seed=0, num_blocks=4, num_vertices=8, num_lists=2):
+    """
+    Makes a ROM model: a chain head at 0x0, a palette, a texture and vertices followed by num_lists display
+    lists (E7, FA, FD1 palette, E8, FD5 texture, an 01 vertex and 06 triangle command for every block, DF).
+    Every pointer is a 16 bit word offset to the next pointer and one to its data, the last next being FFFF.
+
+    Args:
+        seed (int): Seed for the palette, texture and vertex data.
+        num_blocks (int): Vertex blocks in every display list.
+        num_vertices (int): Vertices per block.
+        num_lists (int): How many display lists there are.
+
+    Returns:
+        bytes: Model data.
+    """
+    rng = random.Random(seed)
+    data = bytearray(8)
+    palette_offset = len(data)
+    data += bytes(rng.randrange(1, 256) for _ in range(0x20))
+    texture_offset = len(data)
+    data += rng.randbytes(0x80)
+    vertex_offset = len(data)
+    data += rng.randbytes(num_vertices * 16 * num_blocks * num_lists)
+    pointers = []   # (location, data location)
+    for display_list in range(num_lists):
+        data += words(0xE7000000, 0)
+        data += words(0xFA000000, 0xFFFFFFFF)
+        data += words(0xFD100000, 0)
+        pointers.append((len(data) - 4, palette_offset))
+        data += words(0xE8000000, 0)
+        data += words(0xFD500000, 0)
+        pointers.append((len(data) - 4, texture_offset))
+        for block in range(num_blocks):
+            data += words(0x01000000 | (num_vertices << 12) | (num_vertices * 2), 0)
+            pointers.append((len(data) - 4, vertex_offset + (display_list * num_blocks + block) * num_vertices * 16))
+            data += words(0x06000204, 0x00060810)
+        data += words(0xDF000000, 0)
+    pointer_struct.pack_into(data, 0, pointers[0][0] // 4, palette_offset // 4)
+    for number, (location, data_location) in enumerate(pointers):
+        next_location = pointers[number + 1][0] // 4 if number + 1 < len(pointers) else 0xFFFF
+        pointer_struct.pack_into(data, location, next_location, data_location // 4)
+    return bytes(data)
+
+# Makes a model of about a given size
+def model_of_size(kind, size, seed=0):
+    """
+    Makes a RAM or ROM model of about size bytes (a ROM model's pointers only reach 256 KB).
+
+    Args:
+        kind (string): "ram" or "rom".
+        size (int): Size in bytes.
+        seed (int): Seed for the data.
+
+    Returns:
+        bytes: Model data.
+    """
+    if kind == "ram":
+        return ram_model(seed, max(1, (size - 0xA0) // (8 * 16 + 24)))
+    return rom_model(seed, max(1, (size - 0xA8) // (2 * (8 * 16 + 16))))
+
+# Makes a model with one long pointer chain
+def synthetic_chain(num_pointers):
+    """
+    Builds a model with a pointer every 8 bytes, each one pointing to the next and to the 4 bytes after it.
+
+    Args:
+        num_pointers (int): How many pointers are in the chain.
+
+    Returns:
+        bytearray: Binary model data, the chain starts at 0x0.
+    """
+    data = bytearray(num_pointers * 8)
+    for i in range(num_pointers):
+        upper_offset = end_pointer if i == num_pointers - 1 else (i + 1) * 2
+        pointer_struct.pack_into(data, i * 8, upper_offset, i * 2 + 1)
+    return data
+
+# Times a function
+def time_stage(run, repeats, setup=None):
+    """
+    Runs a stage repeats times with anything it prints thrown away.
+
+    Args:
+        run (function): Stage, given what setup returned (or nothing).
+        repeats (int): How many times it's timed.
+        setup (function): Makes the stage's input every time (isn't timed).
+
+    Returns:
+        list: Seconds every run took.
+    """
+    timings = []
+    for _ in range(repeats):
+        arguments = () if setup is None else (setup(),)
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            run(*arguments)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+# Times every stage
+def run_benchmarks(sizes=(16 << 10, 64 << 10, 192 << 10), part_counts=(1, 10, 100), repeats=5):
+    """
+    Times opcode scanning, moving the base pointer chain, RAM to ROM conversion, adding one part and
+    linking folders of part_counts parts, on made up models of every size, and moving one long chain with
+    plain python and with NumPy (when it's installed).
+
+    Args:
+        sizes (tuple): Model sizes in bytes.
+        part_counts (tuple): How many parts the folders have.
+        repeats (int): How many times every stage is timed.
+
+    Returns:
+        list: Result of every stage, a dict with stage, size, parts, best_ms, median_ms and runs.
+    """
+    results = []
+    def record(stage, size, parts, timings):
+        result = {"stage": stage, "size": size, "parts": parts, "best_ms": round(min(timings) * 1000, 4), "median_ms": round(statistics.median(timings) * 1000, 4), "runs": len(timings)}
+        results.append(result)
+        print(f"{stage:<11} {size:>8} bytes {parts:>4} parts: {result['best_ms']:>9.3f} ms best, {result['median_ms']:>9.3f} ms median")
+
+    for size in sizes:
+        base_data = model_of_size("rom", size)
+        part_data = model_of_size("ram", size)
+
+        # Scanning every command
+        record("scan", len(base_data), 0, time_stage(lambda: DisplayListIndex(base_data), repeats))
+
+        # Moving every base pointer past the middle
+        table = RelocationTable([(len(base_data) // 2 // 8 * 8, 0x100)])
+        def relocate(model):
+            apply_relocation(model, plan_relocation(model.data, 0, table))
+        record("relocate", len(base_data), 0, time_stage(relocate, repeats, lambda: ModelBuffer("base.bin", base_data)))
+
+        # Converting a RAM part
+        record("convert", len(part_data), 1, time_stage(lambda model: convert_model(model, hex(0x1000), "part.bin_temp"), repeats, lambda: ModelBuffer("part.bin", part_data)))
+
+        # Adding a part to a base a quarter of the size
+        small_base = model_of_size("rom", size // 4)
+        def append(models):
+            append_to_model(models[0], models[1], output_path="output.bin")
+        record("append", len(small_base) + len(part_data), 1, time_stage(append, repeats, lambda: (ModelBuffer("base.bin", small_base), ModelBuffer("part.bin", part_data))))
+
+    # Moving one long chain with plain python and with NumPy
+    chain_data = synthetic_chain(chain_pointers)
+    chain_table = RelocationTable([(len(chain_data) // 2, 0x10)])
+    for use_numpy in ([False] if numpy is None else [False, True]):
+        def relocate_chain(model):
+            apply_relocation(model, plan_relocation(model.data, 0, chain_table, use_numpy=use_numpy))
+        record("chain_numpy" if use_numpy else "chain", len(chain_data), 0, time_stage(relocate_chain, repeats, lambda: ModelBuffer("chain.bin", chain_data)))
+
+    # Linking folders, every part is small enough for 100 to fit in 256 KB
+    base_data = model_of_size("rom", 16 << 10)
+    for part_count in part_counts:
+        parts = [model_of_size("ram", 1 << 11, seed) for seed in range(part_count)]
+        def link(models):
+            if link_folder(models[0], models[1], output_path="output.bin", processes=1) is None:
+                raise ModelError("Made up parts couldn't be linked in one pass.")
+        setup = lambda: (ModelBuffer("base.bin", base_data), [ModelBuffer(f"p{number:03}.bin", part) for number, part in enumerate(parts)])
+        record("link", len(base_data) + sum(len(part) for part in parts), part_count, time_stage(link, repeats, setup))
+    return results
+
+# Compares results with an earlier run
+def compare_results(results, previous_results):
+    """
+    Prints how much faster or slower every stage is than in an earlier run.
+
+    Args:
+        results (list): Results of this run.
+        previous_results (list): Results of the earlier run.
+
+    Returns:
+        None
+    """
+    previous = {(result["stage"], result["size"], result["parts"]): result for result in previous_results}
+    for result in results:
+        earlier = previous.get((result["stage"], result["size"], result["parts"]))
+        if earlier is None or result["best_ms"] == 0:
+            continue
+        ratio = earlier["best_ms"] / result["best_ms"]
+        print(f"{result['stage']:<11} {result['size']:>8} bytes {result['parts']:>4} parts: {earlier['best_ms']:>9.3f} ms -> {result['best_ms']:>9.3f} ms ({ratio:.2f}x {'faster' if ratio >= 1 else 'slower'})")
+
+# Runs the benchmarks from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-o","--o","-output","--output",default="benchmark.json",type=str,help="JSON file the results are written to.")
+    parser.add_argument("-sizes","--sizes",default=default_sizes,type=str,help="Model sizes in KB, split by commas (up to 256).")
+    parser.add_argument("-parts","--parts",default=default_parts,type=str,help="How many parts the linked folders have, split by commas (up to 100).")
+    parser.add_argument("-repeats","--repeats",default=5,type=int,help="How many times every stage is timed.")
+    parser.add_argument("-compare","--compare",default="",type=str,help="Results of an earlier run to compare with.")
+    args = parser.parse_args(argv)
+    try:
+        sizes = tuple(int(size) << 10 for size in args.sizes.split(","))
+        part_counts = tuple(int(count) for count in args.parts.split(","))
+    except ValueError:
+        print("-sizes and -parts have to be numbers split by commas.")
+        return 2
+    if any(size <= 0 or size > 256 << 10 for size in sizes) or any(count <= 0 or count > 100 for count in part_counts) or args.repeats <= 0:
+        print("Sizes have to be 1 to 256 KB, folders 1 to 100 parts and repeats at least 1.")
+        return 2
+
+    # Anything the stages write goes in a temp folder
+    output_path = os.path.abspath(args.o)
+    previous_directory = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            os.chdir(directory)
+            results = run_benchmarks(sizes, part_counts, args.repeats)
+    except ModelError:
+        return 1
+    finally:
+        os.chdir(previous_directory)
+    report = {"version": benchmark_version, "time": datetime.datetime.now().isoformat(timespec="seconds"), "python": platform.python_version(),
+              "machine": platform.machine(), "system": platform.system(), "cpus": os.cpu_count(), "numpy": numpy is not None, "repeats": args.repeats, "results": results}
+    with open(output_path, "w") as f:
+        json.dump(report, f, indent=4)
+    print(f"Results written to {args.o}")
+
+    if args.compare != "":
+        try:
+            with open(args.compare) as f:
+                compare_results(results, json.load(f)["results"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Couldn't read {args.compare}: {e}")
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,448 @@
+# In-memory model buffer so binary model files are only read from and written to disk once.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import binascii
+import bisect
+import mmap
+import os
+from ssb_binary_model_index import DisplayListIndex
+from ssb_binary_model_profile import count
+
+splice_block = 4096         # Size of the blocks compared against the source file
+splice_minimum = 16384      # Unchanged ranges shorter than this are written from memory instead
+dirty_merge_gap = 512       # Written ranges closer than this are written together (writing a few unchanged bytes is cheaper than another write)
+rewrite_ratio = 0.25        # The whole file is written from memory once writing the dirty ranges costs this much of writing it all
+
+# Copies a range of one file to the end of another, inside the kernel when the system can
+def copy_range(source_fd, destination_fd, offset, length):
+    """
+    Copies part of one file to where another file is at, using os.copy_file_range() or os.sendfile()
+    so the data doesn't go through python (reads and writes it when neither works).
+
+    Args:
+        source_fd (int): File descriptor to copy from.
+        destination_fd (int): File descriptor to copy to.
+        offset (int): Where in the source file to start copying.
+        length (int): How many bytes to copy.
+
+    Returns:
+        None
+    """
+    while length > 0:
+        copied = 0
+        if hasattr(os, "copy_file_range"):
+            try:
+                copied = os.copy_file_range(source_fd, destination_fd, length, offset)
+            except OSError:
+                copied = 0
+        if copied == 0 and hasattr(os, "sendfile"):
+            try:
+                copied = os.sendfile(destination_fd, source_fd, offset, length)
+            except OSError:
+                copied = 0
+        if copied == 0:
+            chunk = os.pread(source_fd, min(length, 1 << 20), offset)
+            if not chunk:
+                raise OSError(f"Source file ended {length} bytes early.")
+            write_all(destination_fd, chunk)
+            copied = len(chunk)
+        offset = offset + copied
+        length = length - copied
+        count("bytes copied", copied)
+
+# Writes all of data to a file descriptor
+def write_all(fd, data):
+    """
+    Writes data to a file descriptor, carrying on after short writes.
+
+    Args:
+        fd (int): File descriptor to write to.
+        data (bytes): Data to write.
+
+    Returns:
+        None
+    """
+    count("bytes written", len(data))
+    with memoryview(data) as view:
+        while len(view) > 0:
+            view = view[os.write(fd, view):]
+            count("writes")
+
+# Finds the parts of data that are still the same as the source file
+def unchanged_ranges(data, source):
+    """
+    Compares data against the file it was made from, block by block. Blocks before an insertion
+    are compared at the same location and blocks after it at the location moved by however much
+    data grew (or shrank), so a model with one part added keeps both its head and tail.
+
+    Args:
+        data (bytearray): New model data.
+        source (mmap): Data of the source file.
+
+    Returns:
+        list: (location, source_location, length) of every range long enough to copy from the source file.
+    """
+    ranges = []
+    growth = len(data) - len(source)
+    with memoryview(data) as data_view, memoryview(source) as source_view:
+        for start in range(0, len(data), splice_block):
+            end = min(start + splice_block, len(data))
+            block = data_view[start:end]
+            if end <= len(source) and block == source_view[start:end]:
+                source_start = start
+            elif start - growth >= 0 and end - growth <= len(source) and block == source_view[start - growth:end - growth]:
+                source_start = start - growth
+            else:
+                continue
+            # Joining blocks that follow on from each other in both files
+            if ranges and ranges[-1][0] + ranges[-1][2] == start and ranges[-1][1] + ranges[-1][2] == source_start:
+                ranges[-1][2] = ranges[-1][2] + end - start
+            else:
+                ranges.append([start, source_start, end - start])
+    return [tuple(unchanged) for unchanged in ranges if unchanged[2] >= splice_minimum]
+
+class DirtyRanges:
+    """
+    Sorted ranges of a buffer that were written to since it matched its file, merging ranges that touch
+    or are closer than merge_gap. Also counts the patches recorded, how many of them were merged into an
+    existing range and how many writes flushing took.
+
+    Args:
+        merge_gap (int): Ranges closer than this are merged.
+    """
+    def __init__(self, merge_gap=dirty_merge_gap):
+        self.merge_gap = merge_gap
+        self.starts = []
+        self.ends = []
+        self.patches = 0
+        self.merged = 0
+        self.syscalls = 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __iter__(self):
+        return zip(self.starts, self.ends)
+
+    # Records a write
+    def add(self, start, end):
+        self.patches = self.patches + 1
+        if end <= start:
+            return
+        first = bisect.bisect_left(self.ends, start - self.merge_gap)
+        last = bisect.bisect_right(self.starts, end + self.merge_gap)
+        if first < last:
+            self.merged = self.merged + 1
+            start = min(start, self.starts[first])
+            end = max(end, self.ends[last - 1])
+        self.starts[first:last] = [start]
+        self.ends[first:last] = [end]
+
+    # How many bytes the ranges cover
+    def size(self):
+        return sum(self.ends) - sum(self.starts)
+
+    # Forgets every range (the counters are kept)
+    def clear(self):
+        self.starts = []
+        self.ends = []
+
+    # Copies the ranges (the counters start over)
+    def copy(self):
+        dirty = DirtyRanges(self.merge_gap)
+        dirty.starts = list(self.starts)
+        dirty.ends = list(self.ends)
+        return dirty
+
+# Identifies a file by its path, modification time and size
+def file_state(file_path):
+    stat = os.stat(file_path)
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
+
+class ModelBuffer:
+    """
+    Holds a binary model file in a bytearray. Every read and write is served from memory
+    and the data is only written back to disk when flush() is called.
+
+    A mapped buffer holds a memory map of the file instead, so only the pages that get looked at
+    are read. A mapped input is read only and a mapped output is written straight to its file.
+
+    Writes to a buffer read from a file are recorded in dirty (a DirtyRanges), so flushing it with that
+    file as the source only copies the file and writes the ranges that changed.
+
+    Args:
+        file_path (string): File the buffer is loaded from and flushed to.
+        data (bytes): Data to start with instead of reading file_path (used to copy another buffer).
+        mapped (boolean): Maps file_path instead of reading it.
+        writable (boolean): Maps file_path for reading and writing (only used if mapped).
+    """
+    def __init__(self, file_path, data=None, mapped=False, writable=False):
+        self.file_path = file_path
+        self.mapped = False
+        self.index = None
+        self.conversion_indexes = None  # (first_pointer, palette_index, texture_index, vertice_index, opcode_index) if made by convert_model()
+        self.command_index = None       # Index of the model this was converted from, still right for its commands when only pointers changed
+        self.relocations = None         # (location, kind) of everything convert_model() wrote that moves with where the model goes, if made by it
+        self.costume_sites = []         # Palette commands the palette costume was written over, None if they aren't known
+        self.dirty = DirtyRanges()
+        self.clean_source = None        # (path, mtime in ns, size) of the file the data matches outside the dirty ranges
+        if data is None and mapped:
+            with open(file_path, "r+b" if writable else "rb") as f:
+                count("file opens")
+                try:
+                    self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ)
+                    self.mapped = True
+                    count("bytes mapped", len(self.data))
+                    return
+                except ValueError:
+                    # Empty files can't be mapped
+                    data = f.read()
+        if data is None:
+            with open(file_path, "rb") as f:
+                data = f.read()
+                stat = os.fstat(f.fileno())
+            count("file opens")
+            count("bytes read", len(data))
+            self.clean_source = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+        self.data = bytearray(data)
+
+    def __len__(self):
+        return len(self.data)
+
+    # Reads hexadecimal data from the buffer with hex offset given
+    def read_hex(self, offset, num_bytes):
+        """
+        Reads data from the buffer.
+
+        Args:
+            offset (string): Where in the buffer to read the data from.
+            num_bytes (int): How many bytes to read.
+
+        Returns:
+            string: Hexadecimal data read from the buffer.
+        """
+        offset_decimal = int(offset, 16)
+        return self.data[offset_decimal:offset_decimal + num_bytes].hex()
+
+    # Writes hexadecimal data to the buffer with hex offset given
+    def write_hex(self, offset, hex_string):
+        """
+        Writes over data in the buffer, padding with zeroes if writing past the end (like seeking past the end of a file).
+
+        Args:
+            offset (string): Where to write the data to.
+            hex_string (string): Hexadecimal data we are writing.
+
+        Returns:
+            None
+        """
+        offset_decimal = int(offset, 16)
+        binary_data = binascii.unhexlify(hex_string)
+        if self.mapped:
+            if offset_decimal + len(binary_data) > len(self.data):
+                self.data.resize(offset_decimal + len(binary_data))
+        elif offset_decimal > len(self.data):
+            self.data.extend(bytes(offset_decimal - len(self.data)))
+        start = min(offset_decimal, len(self.data))
+        self.data[offset_decimal:offset_decimal + len(binary_data)] = binary_data
+        self.dirty.add(start, offset_decimal + len(binary_data))
+        self.index = None
+        self.command_index = None
+
+    # Marks part of the buffer as written to
+    def mark_dirty(self, start, end):
+        """
+        Records a write made straight to data, so flush() writes it.
+
+        Args:
+            start (int): Where the write starts.
+            end (int): Where the write ends.
+
+        Returns:
+            None
+        """
+        self.dirty.add(start, end)
+
+    # Inserts binary data into the buffer with hex offset given
+    def append_hex(self, offset, binary_data):
+        """
+        Inserts data into the buffer, moving everything after offset forward.
+
+        Args:
+            offset (string): Where to insert the data.
+            binary_data (bytes): Data we are inserting.
+
+        Returns:
+            None
+        """
+        offset_decimal = int(offset, 16)
+        if self.mapped:
+            # Growing the file and moving the tail up inside the map
+            old_size = len(self.data)
+            self.data.resize(max(old_size, offset_decimal) + len(binary_data))
+            if offset_decimal < old_size:
+                self.data.move(offset_decimal + len(binary_data), offset_decimal, old_size - offset_decimal)
+            self.data[offset_decimal:offset_decimal + len(binary_data)] = binary_data
+        else:
+            old_size = len(self.data)
+            if offset_decimal > len(self.data):
+                self.data.extend(bytes(offset_decimal - len(self.data)))
+            self.data[offset_decimal:offset_decimal] = binary_data
+            if offset_decimal >= old_size:
+                self.dirty.add(old_size, len(self.data))
+            else:
+                # Everything after offset moved, so it no longer matches the file
+                self.dirty.patches = self.dirty.patches + 1
+                self.clean_source = None
+        if self.costume_sites:
+            self.costume_sites = [site + len(binary_data) if site >= offset_decimal else site for site in self.costume_sites]
+        self.index = None
+        self.command_index = None
+
+    # Makes a new buffer with the same data
+    def copy(self, file_path):
+        """
+        Copies the buffer. A copy of a mapped buffer is written to file_path and mapped for
+        reading and writing, so changes made to it go straight to the output file.
+
+        Args:
+            file_path (string): File the copy is flushed to.
+
+        Returns:
+            ModelBuffer: Copy of the buffer.
+        """
+        if self.mapped and file_path is not None and os.path.abspath(file_path) != os.path.abspath(self.file_path):
+            self.flush(file_path, self.file_path)
+            model_copy = ModelBuffer(file_path, mapped=True, writable=True)
+            model_copy.costume_sites = self.costume_sites
+            return model_copy
+        model_copy = ModelBuffer(file_path, self.data)
+        model_copy.dirty = self.dirty.copy()
+        model_copy.clean_source = self.clean_source
+        model_copy.costume_sites = self.costume_sites
+        return model_copy
+
+    # Returns the display list index of the buffer, building it the first time
+    def get_index(self):
+        """
+        Gets the display list index of the buffer. It's built once and rebuilt only after the buffer is written to.
+
+        Returns:
+            DisplayListIndex: Index of the display list commands in the buffer.
+        """
+        if self.index is None:
+            self.index = DisplayListIndex(self.data)
+        return self.index
+
+    # Writes the whole buffer to disk
+    def flush(self, file_path=None, source_path=None):
+        """
+        Writes the buffer to disk in one sequential pass. When source_path is given, ranges that are
+        still the same as that file are copied from it inside the kernel and only the rest is written
+        from memory. If the buffer was read from source_path and only written over (or added to at the
+        end) since, the file is copied whole and only the dirty ranges are written on top of it, unless
+        so much changed that writing the whole buffer is cheaper (see rewrite_ratio).
+
+        Args:
+            file_path (string): File to write to, defaults to the file the buffer was loaded from (only synced if the buffer is mapped).
+            source_path (string): File the buffer was made from (can't be file_path).
+
+        Returns:
+            None
+        """
+        if file_path is None:
+            file_path = self.file_path
+
+        # A mapped buffer already is its file
+        if self.mapped and os.path.abspath(file_path) == os.path.abspath(self.file_path):
+            self.data.flush()
+            return
+
+        # Copying the source and writing what changed on top
+        if source_path is not None and not self.mapped and self.flush_dirty(file_path, source_path):
+            return
+        ranges = []
+        source_fd = None
+        if source_path is not None and os.path.abspath(source_path) != os.path.abspath(file_path) and len(self.data) >= splice_minimum:
+            try:
+                source_fd = os.open(source_path, os.O_RDONLY)
+                count("file opens")
+                with mmap.mmap(source_fd, 0, access=mmap.ACCESS_READ) as source:
+                    ranges = unchanged_ranges(self.data, source)
+            except (OSError, ValueError):
+                ranges = []
+        try:
+            fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+            count("file opens")
+            try:
+                # Head, inserted data and tail are written in order, so the file is only written once
+                location = 0
+                with memoryview(self.data) as view:
+                    for start, source_start, length in ranges:
+                        write_all(fd, view[location:start])
+                        copy_range(source_fd, fd, source_start, length)
+                        location = start + length
+                    write_all(fd, view[location:])
+                self.dirty.syscalls = self.dirty.syscalls + 2 * len(ranges) + 1
+            finally:
+                os.close(fd)
+        finally:
+            if source_fd is not None:
+                os.close(source_fd)
+        if not self.mapped:
+            self.mark_clean(file_path)
+
+    # Writes only the dirty ranges on top of a copy of the source file
+    def flush_dirty(self, file_path, source_path):
+        """
+        Flushes the buffer by copying source_path and writing the dirty ranges over it, if the buffer still
+        matches source_path outside of them and few enough bytes changed.
+
+        Args:
+            file_path (string): File to write to.
+            source_path (string): File the buffer was read from (can't be file_path).
+
+        Returns:
+            boolean: True if the buffer was written, False if it has to be written some other way.
+        """
+        if self.clean_source is None or len(self.data) < splice_minimum or not hasattr(os, "pwrite") or os.path.abspath(source_path) == os.path.abspath(file_path):
+            return False
+        try:
+            if file_state(source_path) != self.clean_source:
+                return False
+        except OSError:
+            return False
+        source_size = self.clean_source[2]
+        # Every write costs about as much as writing another splice_block bytes
+        if self.dirty.size() + len(self.dirty) * splice_block > len(self.data) * rewrite_ratio:
+            return False
+
+        source_fd = os.open(source_path, os.O_RDONLY)
+        try:
+            fd = os.open(file_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o666)
+            count("file opens", 2)
+            try:
+                copy_range(source_fd, fd, 0, min(source_size, len(self.data)))
+                with memoryview(self.data) as view:
+                    for start, end in self.dirty:
+                        count("bytes written", end - start)
+                        while start < end:
+                            start = start + os.pwrite(fd, view[start:end], start)
+                            count("writes")
+                self.dirty.syscalls = self.dirty.syscalls + 1 + len(self.dirty)
+            finally:
+                os.close(fd)
+        finally:
+            os.close(source_fd)
+        self.mark_clean(file_path)
+        return True
+
+    # Records that the buffer matches a file
+    def mark_clean(self, file_path):
+        self.dirty.clear()
+        try:
+            self.clean_source = file_state(file_path)
+        except OSError:
+            self.clean_source = None
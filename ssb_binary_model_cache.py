@@ -0,0 +1,315 @@
+# On disk cache of converted parts, so a part is only converted once however many times it's added.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import struct
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+cache_magic = b"SSBC"
+entry_struct = struct.Struct(">4sI")    # magic, data size
+default_cache_size = 256                # MB
+hash_block = 1 << 20
+
+# Default cache folder
+def default_cache_dir():
+    """
+    Gets the folder the cache is kept in when none is given.
+
+    Returns:
+        string: ~/.cache/ssb_binary_model (or $XDG_CACHE_HOME/ssb_binary_model).
+    """
+    return os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache"), "ssb_binary_model")
+
+# Hashes a file without reading it into memory all at once
+def file_hash(file_path):
+    """
+    Gets the SHA-256 of a file.
+
+    Args:
+        file_path (string): File to hash.
+
+    Returns:
+        string: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(hash_block), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+# Hashes the scripts, so changing them never gives a part converted by older code
+def code_hash():
+    """
+    Gets the SHA-256 of every ssb_binary_model_*.py script.
+
+    Returns:
+        string: Hex digest.
+    """
+    digest = hashlib.sha256()
+    for script_path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "ssb_binary_model_*.py"))):
+        digest.update(os.path.basename(script_path).encode())
+        digest.update(file_hash(script_path).encode())
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """
+    Converted parts keyed by the SHA-256 of the part, its first pointer and the arguments it's converted
+    with (and the scripts themselves), see cached_relocatable() in ssb_binary_model_relocatable.py. Parts
+    are kept converted at offset 0 along with every pointer that moves, so they're linked wherever they're
+    added and whatever they're added to. The least recently used entries are deleted once the cache is
+    bigger than max_size.
+
+    Args:
+        cache_dir (string): Folder entries are kept in, defaults to default_cache_dir().
+        max_size (int): Biggest the cache can get in MB.
+        debug (boolean): Prints whether every part was a hit or a miss.
+    """
+    def __init__(self, cache_dir=None, max_size=default_cache_size, debug=False):
+        self.cache_dir = cache_dir or default_cache_dir()
+        self.max_size = int(max_size * 1024 * 1024)
+        self.debug = debug
+        self.stats_path = os.path.join(self.cache_dir, "stats.json")
+        self.lock_path = os.path.join(self.cache_dir, "stats.lock")
+        self.code_hash = None
+        self.known_size = None  # Size of the cache when it was last scanned plus what's been put since, None until it's scanned
+
+    # Key for a part
+    def key(self, data, first_pointer, arguments):
+        """
+        Gets the key of a part.
+
+        Args:
+            data (bytes): Part (RAM model).
+            first_pointer (int): First pointer in the part.
+            arguments (dict): Every argument the part is converted with.
+
+        Returns:
+            string: Hex digest.
+        """
+        if self.code_hash is None:
+            self.code_hash = code_hash()
+        digest = hashlib.sha256()
+        digest.update(f"{self.code_hash}\n{first_pointer}\n".encode())
+        digest.update(json.dumps(arguments, sort_keys=True, default=str).encode() + b"\n")
+        digest.update(data)
+        return digest.hexdigest()
+
+    # Reads an entry
+    def get(self, key):
+        """
+        Gets an entry, marking it as just used.
+
+        Args:
+            key (string): Key from key().
+
+        Returns:
+            bytes: Data, None if it isn't cached.
+        """
+        entry_path = os.path.join(self.cache_dir, key + ".entry")
+        try:
+            with open(entry_path, "rb") as f:
+                contents = f.read()
+        except OSError:
+            return None
+        if len(contents) < entry_struct.size:
+            return None
+        magic, data_size = entry_struct.unpack_from(contents, 0)
+        if magic != cache_magic or len(contents) != entry_struct.size + data_size:
+            # Broken entry, it's made again
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            return None
+        os.utime(entry_path)
+        return contents[entry_struct.size:]
+
+    # Writes an entry
+    def put(self, key, data):
+        """
+        Adds an entry, deleting the least recently used ones if the cache gets too big.
+
+        Args:
+            key (string): Key from key().
+            data (bytes): Data.
+
+        Returns:
+            int: How many entries were deleted.
+        """
+        size = entry_struct.size + len(data)
+        if size > self.max_size:
+            return 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        entry_path = os.path.join(self.cache_dir, key + ".entry")
+        temp_path = f"{entry_path}.{os.getpid()}.temp"
+        with open(temp_path, "wb") as f:
+            f.write(entry_struct.pack(cache_magic, len(data)))
+            f.write(data)
+        os.replace(temp_path, entry_path)
+
+        # The folder is only scanned again once the entries put since the last scan could make it too big
+        if self.known_size is None or self.known_size + size > self.max_size:
+            return self.evict(self.max_size)
+        self.known_size = self.known_size + size
+        return 0
+
+    # Deletes the least recently used entries
+    def evict(self, max_size):
+        """
+        Deletes the least recently used entries until the cache is at most max_size bytes.
+
+        Args:
+            max_size (int): Size to get the cache down to, in bytes.
+
+        Returns:
+            int: How many entries were deleted.
+        """
+        entries = []
+        for entry in os.scandir(self.cache_dir):
+            if entry.name.endswith(".entry"):
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        entries.sort()
+        total_size = sum(size for _, size, _ in entries)
+        evicted = 0
+        for _, size, entry_path in entries:
+            if total_size <= max_size:
+                break
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
+            total_size = total_size - size
+            evicted = evicted + 1
+        self.known_size = total_size
+        return evicted
+
+    # Hits, misses and evictions so far
+    def stats(self):
+        """
+        Gets the cache's statistics.
+
+        Returns:
+            dict: hits, misses, evictions, entries and size (bytes).
+        """
+        stats = self.read_counts()
+        entry_sizes = []
+        if os.path.isdir(self.cache_dir):
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.endswith(".entry"):
+                    try:
+                        entry_sizes.append(entry.stat().st_size)
+                    except FileNotFoundError:
+                        pass
+        stats["entries"] = len(entry_sizes)
+        stats["size"] = sum(entry_sizes)
+        return stats
+
+    # Hits, misses and evictions in stats.json
+    def read_counts(self):
+        try:
+            with open(self.stats_path) as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        if not isinstance(stats, dict):
+            stats = {}
+        return {name: stats.get(name, 0) for name in ("hits", "misses", "evictions")}
+
+    # Adds to the statistics
+    def count(self, hits=0, misses=0, evictions=0):
+        """
+        Adds to the hits, misses and evictions in stats.json. It's locked while it's read and written again,
+        so processes sharing the cache (worker processes, batch jobs, the server) don't lose each other's counts.
+
+        Args:
+            hits (int): Hits to add.
+            misses (int): Misses to add.
+            evictions (int): Evictions to add.
+
+        Returns:
+            dict: hits, misses and evictions after adding.
+        """
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with open(self.lock_path, "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            stats = self.read_counts()
+            stats["hits"] = stats["hits"] + hits
+            stats["misses"] = stats["misses"] + misses
+            stats["evictions"] = stats["evictions"] + evictions
+            temp_path = f"{self.stats_path}.{os.getpid()}.temp"
+            with open(temp_path, "w") as f:
+                json.dump(stats, f)
+            os.replace(temp_path, self.stats_path)
+        return stats
+
+    # Deletes every entry
+    def clear(self):
+        """
+        Deletes every entry and the statistics.
+
+        Returns:
+            int: How many entries were deleted.
+        """
+        if not os.path.isdir(self.cache_dir):
+            return 0
+        evicted = self.evict(-1)
+        if os.path.exists(self.stats_path):
+            os.remove(self.stats_path)
+        return evicted
+
+# Makes the cache the command line arguments ask for
+def cache_from_args(args):
+    """
+    Makes the cache for a script's command line arguments.
+
+    Args:
+        args (Namespace): Arguments with cache, no_cache, cache_dir, cache_size and debug.
+
+    Returns:
+        ModelCache: Cache, None unless -cache is set.
+    """
+    if not args.cache or args.no_cache:
+        return None
+    return ModelCache(args.cache_dir or None, args.cache_size, args.debug)
+
+# Adds the cache arguments to a parser
+def add_cache_arguments(parser):
+    parser.add_argument("-cache","--cache",action="store_true",help="Keeps every converted part in a cache, so adding it again (to any base, anywhere) only patches its pointers instead of converting it.")
+    # Not using the cache is the default now, -no_cache is still accepted so old commands keep working
+    parser.add_argument("-no_cache","--no_cache","--no-cache",action="store_true",help=argparse.SUPPRESS)
+    parser.add_argument("-cache_dir","--cache_dir",default="",type=str,help="Folder the cache of converted parts is kept in (defaults to ~/.cache/ssb_binary_model).")
+    parser.add_argument("-cache_size","--cache_size",default=default_cache_size,type=float,help="Biggest the cache of converted parts can get in MB, the least recently used parts are deleted past it.")
+
+# Shows or clears the cache from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-cache_dir","--cache_dir",default="",type=str,help="Folder the cache of converted parts is kept in (defaults to ~/.cache/ssb_binary_model).")
+    parser.add_argument("-clear","--clear",action="store_true",help="Deletes every cached part.")
+    args = parser.parse_args(argv)
+    cache = ModelCache(args.cache_dir or None)
+    if args.clear:
+        print(f"Deleted {cache.clear()} cached parts from {cache.cache_dir}.")
+        return 0
+    stats = cache.stats()
+    total = stats["hits"] + stats["misses"]
+    print(f"{cache.cache_dir}: {stats['entries']} parts ({stats['size'] / (1024 * 1024):.2f} MB)")
+    print(f"{stats['hits']} hits, {stats['misses']} misses ({(stats['hits'] / total * 100) if total else 0:.1f}% hit rate), {stats['evictions']} evictions")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
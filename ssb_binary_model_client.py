@@ -0,0 +1,94 @@
+# Sends adder and converter jobs to ssb_binary_model_server.py, so they run without starting python again.
+# Takes the same arguments as ssb_binary_model_adder.py (or ssb_binary_model_converter.py after "convert").
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import json
+import os
+import socket
+import sys
+
+# Sends a request to the server
+def send_request(request, socket_path):
+    """
+    Sends one request to the server and waits for the reply.
+
+    Args:
+        request (dict): Request (see run_job()).
+        socket_path (string): Socket the server listens on.
+
+    Returns:
+        dict: Reply with "exit" and "output" (exit 1 if the reply was empty or cut off); returns None if no server is running.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        try:
+            client_socket.connect(socket_path)
+        except (ConnectionRefusedError, FileNotFoundError):
+            return None
+        client_socket.sendall(json.dumps(request).encode() + b"\n")
+        reply = b""
+        while not reply.endswith(b"\n"):
+            data = client_socket.recv(1 << 16)
+            if not data:
+                break
+            reply = reply + data
+
+    # A server that stopped or crashed mid job closes without a whole reply
+    try:
+        reply = json.loads(reply) if reply.endswith(b"\n") else None
+    except ValueError:
+        reply = None
+    if not isinstance(reply, dict) or "exit" not in reply:
+        return {"exit": 1, "output": f"Error, the server on {socket_path} closed without a whole reply.\n"}
+    return reply
+
+# Runs a job on the server, or in this process if there's no server
+def main(argv=None):
+    """
+    Runs a job with command line arguments. "serve" starts the server, "stop" stops it, "stats" shows what
+    it has in memory, "convert" runs the converter and anything else runs the adder. -socket picks the
+    server's socket. Jobs run in this process if no server is running.
+
+    Args:
+        argv (list): Arguments, defaults to sys.argv.
+
+    Returns:
+        int: Exit code.
+    """
+    # Local import so sending a job only needs the socket path
+    from ssb_binary_model_server import default_socket_path
+    argv = list(sys.argv[1:] if argv is None else argv)
+    socket_path = None
+    if len(argv) >= 2 and argv[0] in ("-socket", "--socket"):
+        socket_path = argv[1]
+        argv = argv[2:]
+    if socket_path is None:
+        socket_path = default_socket_path()
+
+    command = "adder"
+    if argv and argv[0] in ("serve", "stop", "stats", "convert"):
+        command = argv.pop(0)
+    if command == "serve":
+        from ssb_binary_model_server import main as server_main
+        return server_main(["-socket", socket_path] + argv)
+
+    # -watch keeps running, so it's never sent to the server
+    if "-watch" not in argv and "--watch" not in argv:
+        reply = send_request({"command": command, "argv": argv, "cwd": os.getcwd()}, socket_path)
+        if reply is not None:
+            sys.stdout.write(str(reply.get("output", "")))
+            return reply["exit"]
+    if command in ("stop", "stats"):
+        print(f"No server running on {socket_path}.")
+        return 1
+
+    # No server, running here
+    if command == "convert":
+        from ssb_binary_model_converter import main as converter_main
+        return converter_main(argv)
+    from ssb_binary_model_adder import main as adder_main
+    return adder_main(argv)
+
+if __name__ == "__main__":
+    exit(main())
@@ -1,420 +1,578 @@
-# Converts a RAM model file to one suited for ROM usage.
-
-# Copyright (C) 2025 Thomas Rader
-
-
-import shutil
-import os
-import argparse
-import binascii
-import re
-from inspect import currentframe, getframeinfo
-
-parser = argparse.ArgumentParser()
-parser.add_argument("-file", "--file",required=True,type=str,help="File we're converting.")
-parser.add_argument("-offset","--offset","-location", "--location",required=True,type=str,help="Hexadecimal location of where we're adding the file in the binary (as a string, ex: '0x14').")
-parser.add_argument("-first_pointer","--first_pointer","-internal_file_table_offset","--internal_file_table_offset",default="0x00",type=str,help="First pointer in the file we're expanding (usually following the first 01 command) (as a string, ex: '0x14').")
-parser.add_argument("-pi","--pi","-palette_index", "--palette_index",default="0x00",type=str,help="Location where palette starts in file (as a string, ex: '0x14').")
-parser.add_argument("-ti","--ti","-texture_index", "--texture_index",default="0x00",type=str,help="Location where textures start in file (as a string, ex: '0x14').")
-parser.add_argument("-vi","--vi","-vertice_index", "--vertice_index",default="0x00",type=str,help="Location where vertices start in file (as a string, ex: '0x14').")
-parser.add_argument("-oi","--oi","-opcode_index", "--opcode_index",default="0x00",type=str,help="Location where opcodes start in file (as a string, ex: '0x14').")
-parser.add_argument("-palette_costume","--palette_costume","-costume","--costume",default="",help="Changes FD1 (palette) command with DE000000 0EXXXXXX to make palette based on costume palette. Enter entire DE command, ex DE0000000E000000.")
-parser.add_argument("-original_character_offset","--original_character_offset",default="-1",type=str,help="Hexadecimal location of where the original character file started when adding the parts to the RAM (as a string, ex: '0x802EDE10') (this can help add parts that use original character data).")
-parser.add_argument("-original_character_file_size","--original_character_file_size",default=-1,type=int,help="File size of original character file. This is used in tandem with original_character_offset to find data locations that are and aren't in the original character file.")
-parser.add_argument("-debug","--debug",action="store_true",help="Prints debugging messages to output.")
-parser.add_argument("-overwrite","--overwrite","-force","--force",action="store_true",help="Forces overwrite, making output go to -file.")
-parser.add_argument("-o","--o","-output","--output",default="output.bin",type=str,help="Output file.")
-
-args = parser.parse_args()
-
-file_path = args.file
-hex_location = args.offset
-first_pointer = args.first_pointer
-palette_index = args.pi
-texture_index = args.ti
-vertice_index = args.vi
-opcode_index = args.oi
-palette_costume = args.palette_costume
-original_character_offset = args.original_character_offset
-original_character_file_size = args.original_character_file_size
-debug = args.debug
-overwrite = args.overwrite
-output_path = args.o
-num_bytes = 4
-pointers_overwritten = 0
-hex_content = ""
-current_location = "0x00"
-
-# Regex expressions
-texture_regex = re.compile(r'FD[2-9,A-F][0-8]0000')
-palette_regex = re.compile(r'FD[1][0-8]0000')
-primitive_regex = re.compile(r'FA000000')
-primitive_sync_regex = re.compile(r'E8000000')
-rdp_sync_regex = re.compile(r'E7000000')
-jump_regex = re.compile(r'DE0[0,1]000080[0-7][0-9,A-F]{5}')
-costume_regex = re.compile(r'DE0000000E[0-9]{6}')
-vertice_regex = re.compile(r'01[0-9,A-F]{6}80[0-7][0-9,A-F]{5}')
-
-def error_message(e,cf=currentframe()):
-    print(f'File "{os.path.basename(getframeinfo(cf).filename)}", line {cf.f_lineno}, An error occurred: \n{e}\n')
-
-# Duplicating file
-try:
-    # Get the current working directory
-    current_directory = os.getcwd()
-
-    # Construct full paths for source and destination
-    source_path = os.path.join(current_directory, file_path)
-    destination_path = os.path.join(current_directory, output_path)
-
-    # Setting temp output if we're overwriting
-    if file_path == output_path and overwrite == True:
-        output_path = output_path+"temp"
-        destination_path = os.path.join(current_directory, output_path)
-
-    if file_path == output_path:
-        error_message(f"Error: The file '{file_path}' is the same as the output '{output_path}'.")
-        exit(1)
-
-    # Deleting output file 
-    if os.path.exists(destination_path):
-        os.remove(destination_path)
-
-    # Copy the file
-    shutil.copy(source_path, destination_path)
-    if debug:
-        print(f"File '{os.path.basename(file_path)}' copied and renamed to '{os.path.basename(output_path)}' successfully.\n")
-except FileNotFoundError:
-    error_message(f"Error: The file '{file_path}' was not found.")
-    exit(1)
-except Exception as e:
-    error_message(f"An error occurred: {e}")
-    exit(1)
-
-# Checking palette_costume argument
-if palette_costume != "" and not (costume_regex.match(str(palette_costume).upper())):
-    error_message(f"Error, palette_costume doesn't match DE000000 0EXXXXXX, exiting.")
-    exit(1)
-
-# Reads hexadecimal data from a file with hex offset given
-def read_hex_from_offset(file_path, offset, num_bytes):
-    """
-    Reads data from binary file.
-
-    Args:
-        file_path (string): Source file.
-        offset (string): Where in the file to read the data from.
-        num_bytes (int): How many bytes to read.
-
-    Returns:
-        string: Hexadecimal data read from binary file.
-    """
-    try:
-        with open(file_path, "rb") as f:
-            offset_decimal = int(offset, 16)
-            f.seek(offset_decimal)
-            data = f.read(num_bytes)
-            #print(f"Data read at {offset}: {data.hex()}")
-            return data.hex()
-    except FileNotFoundError:
-        error_message(f"Error: File not found at {file_path}")
-    except ValueError:
-        error_message(f"Error: Invalid hex location '{offset}'")
-    return None
-
-# Writes hexadecimal data to a file with hex offset given
-def write_hex_from_offset(new_file_path, offset, hex_string):
-    """
-    Writes over data in binary file.
-
-    Args:
-        new_file_path (string): File to write to.
-        offset (string): Where to write the data to.
-        hex_string (string): Hexadecimal data we are writing.
-
-    Returns:
-        None
-    """
-    try:
-        with open(new_file_path, "rb+") as f:
-            offset_decimal = int(offset, 16)
-            f.seek(offset_decimal)
-            binary_data = binascii.unhexlify(hex_string)
-            f.write(binary_data)
-            #print(f"Data written at {offset}: {hex_string} as {binary_data}")
-    except FileNotFoundError:
-        error_message(f"Error: File not found at {new_file_path}")
-    except ValueError:
-        error_message(f"Error: Invalid hex location '{offset}'")
-    except binascii.Error as e:
-        error_message(f"Error converting hex string: {e}. Ensure the hex string has an even number of characters and contains only valid hex digits (0-9, A-F).")
-
-# Checking if data came from original character file, if so use that location
-def original_data(pointer):
-    """
-    Checks if value is from original character by seeing if it's between
-    the original_character_offset and the end of it with the
-    original_character_file_size.
-
-    Args:
-        pointer (string): Pointer we're comparing as a string, ex '0x802ede10'.
-
-    Returns:
-        boolean: True if the argument is in the original character data
-    """
-    if original_character_offset != "-1":
-        # Checking if current data value(location) is in the original character file
-        # if so, data_location = hex_content_new_file - original_character_offset
-        if int(pointer,16) >= int(original_character_file_size) and int(pointer,16) < int(original_character_file_size) + int(original_character_offset,16):
-            return True
-    return False
-
-def set_pointer_difference(hex_location,hex_content_new_file,opcode):
-    """
-    Returns the base offset to correctly update pointers based on hex_location (base file),
-    their current location(file we're adding), and their opcode.
-
-    Args:
-        hex_location (string):          Base offset we add to (usually size of the original character file).
-        hex_content_new_file (string):  Current location.
-        opcode (string):                Current opcode (FD1,FD5,01,etc).
-
-    Returns:
-        int: What to add to the new pointers; returns 0 if pointer is in original character.
-    """
-    # Return 0 if pointing to original character data
-    if original_character_offset != -1 and (int(hex_content_new_file,16) >= int(original_character_offset,16) and int(hex_content_new_file,16) < int(original_character_file_size) + int(original_character_offset,16)):
-        return 0
-    
-    # FD5 = texture
-    if (str(opcode[:3]).upper() == "FD5") or (str(opcode[:3]).upper() == "FD9"):
-        hex_location_padded = int(hex_location, 16) + int(texture_index, 16)
-    # FD1 = palette
-    elif str(opcode[:3]).upper() == "FD1":
-        hex_location_padded = int(hex_location, 16) + int(palette_index, 16)
-    # 01 = vertices
-    elif str(opcode[:2]).upper() == "01":
-        hex_location_padded = int(hex_location, 16) + int(vertice_index, 16)
-    else:
-        hex_location_padded = 0
-    force_difference = hex(int(hex_content_new_file,16)-hex_location_padded)
-
-    return force_difference
-
-# Used to convert a file that was made with Model2F3DEX2SSB with single pointer addresses meant for RAM, into 2 pointers
-def convert_single_pointer_file(file_path=file_path,destination_path=destination_path,hex_content_new_file=hex_content,current_location=current_location,num_bytes=num_bytes,pointers_overwritten=pointers_overwritten,end_pointer="FFFF"):
-    """
-    Converts pointers in a file for ROM usage by turning them into 2, based on offset and amount given.
-
-    Args:
-        file_path (string): Source file.
-        destination_path (string): Output that the changes go to.
-        hex_content_new_file (string): Current hexadecimal value we're at (pointer).
-        current_location (string): Where we are in file_path, aka where hex_content is.
-        hex_location_section (string): current_location / 4: if a pointer is more than this then we update it.
-        num_bytes (int): How many bytes we read when reading binary data.
-        pointers_overwritten (int): Keeps track of how many pointers we've overwritten.
-        end_pointer(int): Determines what the last pointer is to stop converting.
-
-    Returns:
-        None
-    """
-
-    # Setting variables
-    last_pointer = current_location
-    file_size = int(os.path.getsize(file_path))
-    opcode_pointer = hex(int(current_location, 16) - 4)
-    opcode = read_hex_from_offset(file_path, opcode_pointer, num_bytes)
-    op_command_seek = 1
-
-    # Debug printing
-    print(f"Updating pointers in {os.path.basename(file_path)} into output {os.path.basename(destination_path)}:")
-    if debug:
-        print(f"first opcode = {opcode} at {opcode_pointer}")
-
-    # Setting up to read through file
-    force_difference = 0
-    next_pointer_location = 0
-    looping = 1
-    current_command = hex(int(current_location, 16) - 4)
-    current_command = read_hex_from_offset(file_path,current_command,num_bytes)
-
-    # Now use force difference to find data location throughout the rest of the file
-    # and update the file pointers as you go
-    while looping:
-        # Determining op command and finding difference based on that,
-        # update everytime incase first pointer is in the original character
-        force_difference = set_pointer_difference(hex_location,hex_content_new_file,current_command)
-
-        # Checking if data came from original character file, if so use that location
-        if original_character_offset != "-1":
-            # Checking if current data value(location) is in the original character file
-            # if so, data_location = hex_content_new_file - original_character_offset
-            if int(hex_content_new_file,16) >= int(original_character_offset,16) and int(hex_content_new_file,16) < int(original_character_file_size) + int(original_character_offset,16):
-                data_location = '{:04x}'.format(int((int(hex_content_new_file,16) - int(original_character_offset,16))/4))
-            else:
-                data_location = '{:04x}'.format(int((int(hex_content_new_file,16) - int(force_difference,16))/4))
-                
-            if debug:
-                print(f"hex_content_new_file = {hex(int(hex_content_new_file,16))} original_character_offset = {original_character_offset} original_character_file_size = {hex(original_character_file_size)} data_location = {data_location} force_difference = {force_difference} hex_location = {hex_location}")
-        else:
-            data_location = '{:04x}'.format(int((int(hex_content_new_file,16) - int(force_difference,16))/4))
-
-        # Looking for next op command with a pointer to update the last accordingly
-        while op_command_seek:
-            current_location = hex(int(current_location, 16) + 4)
-            current_location_dec = int(current_location,16)
-            op_command_seek = read_hex_from_offset(file_path, current_location, 8)
-
-            # if op_command_seek = FD1, FD5, 01, or DE command
-            if texture_regex.match(str(op_command_seek[:8]).upper()) or palette_regex.match(str(op_command_seek[:8]).upper()) or vertice_regex.match(str(op_command_seek).upper()) or jump_regex.match(str(op_command_seek).upper()):
-                if str(op_command_seek[:3]).upper() == "FD1" and palette_costume != "":
-                    # Overwriting palette 
-                    new_byte_to_write = palette_costume
-                    old_byte = read_hex_from_offset(file_path,current_location,8)
-                    print(f"{last_pointer}: changing {old_byte} to {new_byte_to_write}\n")
-                    write_hex_from_offset(destination_path,current_location,new_byte_to_write)
-                    
-                    # Going 4 ahead to help skip command
-                    current_location = hex(int(current_location, 16) + 4)
-                    current_location_dec = int(current_location,16)
-                else:
-                    next_pointer_location = hex(int(current_location, 16) + 4)
-                    new_location = '{:04x}'.format(int((int(hex_location,16) + int(next_pointer_location,16))/4))
-                    break
-            if current_location_dec >= file_size:
-                looping = 0
-                new_location = end_pointer
-                break
-
-        # Overwriting last pointer
-        new_byte_to_write = new_location+data_location
-        old_byte = read_hex_from_offset(file_path,last_pointer,num_bytes)
-        print(f"{last_pointer}: changing {old_byte} to {new_byte_to_write}\n")
-        write_hex_from_offset(destination_path,last_pointer,new_byte_to_write)
-        pointers_overwritten = pointers_overwritten + 1
-
-        # Going to next pointer
-        if next_pointer_location != 0:
-            last_pointer = next_pointer_location
-            hex_content_new_file = read_hex_from_offset(file_path,next_pointer_location,num_bytes)
-        else:
-            break
-
-        # Getting command from current location
-        current_command = hex(int(current_location, 16))
-        current_command = read_hex_from_offset(file_path,current_command,num_bytes)
-
-    # Debug printing
-    print(f"Done writing to {os.path.basename(destination_path)}, total pointers overwritten = {pointers_overwritten}")
-
-# Making sure we have indexes for palette, vertices, textures, opcodes, etc
-if opcode_index == "0x00":
-    # Debug statement
-    if debug:
-        print(f"Attempting auto indexing for palette, vertice, texture, and opcodes...")
-
-    # Setting variables
-    reading_loc = "0x00"
-    base_offset = "0xFFFFFFFF"
-    looping = 1
-    file_size = int(os.path.getsize(file_path))
-    reading_loc_hex = hex(int(reading_loc, 16))
-    data = read_hex_from_offset(file_path, reading_loc_hex, 8)
-    commands_found = False    # used to look for 01 command
-
-    # Determining indexes
-    while 1:
-        # Setting decimal value for location
-        reading_loc_dec = int(reading_loc_hex,16)
-
-        # Checking for 01 command when certain regex have been seen
-        if (commands_found == True or opcode_index != "0x00"):
-            if (str(data[:2]).upper() == "01"):
-                # No texture found, set base_offset to where next 01 command points to
-                if first_pointer == "0x00":
-                    first_pointer = hex(int(reading_loc_hex, 16) + 4) # adding 4 because reading_loc_hex is at the 01 command
-                
-                # Make sure it's not in the original character data, we don't use that as
-                # an offset since that data isn't in this file, it's in previous data
-                if int(data[8:],16) < int(base_offset,16) and not original_data(data[8:]):
-                    base_offset = data[8:]
-                if vertice_index == "0x00" and not original_data(data[8:]):
-                    vertice_index = data[8:]
-
-        # FD5 = texture
-        if (texture_regex.match(str(data[:8]).upper())):
-            if debug:
-                print(f"texture data = {data}")
-            if first_pointer == "0x00":
-                first_pointer = hex(int(reading_loc_hex, 16) + 4) # adding 4 because reading_loc_hex is at the FD command
-            if texture_index == "0x00" and not original_data(data[8:]):
-                texture_index = data[8:]
-        # FD1 = palette
-        elif (palette_regex.match(str(data[:8]).upper())):
-            if debug:
-                print(f"palette data = {data}")
-            if first_pointer == "0x00":
-                first_pointer = hex(int(reading_loc_hex, 16) + 4) # adding 4 because reading_loc_hex is at the FD1 command
-            if int(data[8:],16) < int(base_offset,16) and not original_data(data[8:]):
-                base_offset = data[8:]
-        # Look for 01 commands if we see this regex; E7 = RDP sync
-        elif rdp_sync_regex.match(str(data[:8]).upper()):
-            if opcode_index == "0x00":
-                opcode_index = reading_loc_hex
-        # Look for 01 commands if we see these regex; FA = primitive coloring; E8 = tile
-        elif primitive_regex.match(str(data[:8]).upper()) or primitive_sync_regex.match(str(data[:8]).upper()):
-            commands_found = True
-        
-        # Once we reach the end, break out
-        if reading_loc_dec >= file_size:
-            break
-
-        # Reading next 8 bytes
-        reading_loc = hex(int(reading_loc, 16) + 8)
-        reading_loc_hex = hex(int(reading_loc,16))
-        data = read_hex_from_offset(file_path, reading_loc_hex, 8)
-
-    # Finished indexing, making sure we have a pointer
-    if first_pointer == "0x00":
-        error_message("Couldn't find a single pointer, exiting.")
-        exit(1)
-
-    # Making sure base_offset is set if other indexes are set
-    if base_offset == "0xFFFFFFFF" and (texture_index != "0x00" or vertice_index != "0x00"):
-        error_message("Couldn't find base_offset but texture_index or vertice_index is set, make sure palette is being found.")
-        exit(1)
-
-    # Set other indexes
-    if texture_index != "0x00":
-        texture_index = hex(int(texture_index, 16) - int(base_offset,16))
-    if vertice_index != "0x00":
-        vertice_index = hex(int(vertice_index, 16) - int(base_offset,16))
-
-    # Debug statements
-    if debug:
-        print(f"Index of palette, texture, vertice, & opcodes: ")
-        print(f"base_offset = {base_offset} first_pointer = {first_pointer}")
-        print(f"palette_index = {palette_index} texture_index = {texture_index} vertice_index = {vertice_index} opcode_index = {opcode_index}\n")
-    # exit(1)
-
-# Getting first pointer data
-hex_content = read_hex_from_offset(source_path, first_pointer, num_bytes)
-current_location = first_pointer
-pointers_overwritten = 0
-
-# Converting
-convert_single_pointer_file(source_path,destination_path,hex_content,current_location,num_bytes,pointers_overwritten)
-
-# Overwriting base file
-if overwrite:
-    # Deleting base file
-    if os.path.exists(source_path):
-        os.remove(source_path)
-
-    # Copying temp to base
-    shutil.copy(destination_path, source_path)
-    
-    # Deleting temp file
-    if os.path.exists(destination_path):
-        os.remove(destination_path)
\ No newline at end of file
+# Converts a RAM model file to one suited for ROM usage.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import os
+import argparse
+import binascii
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_cache import add_cache_arguments, cache_from_args
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_log import add_log_arguments, log_from_args, record_change, summary, tracing
+from ssb_binary_model_opcodes import costume_regex, next_pointer_commands, command_kind, NO_COMMAND, END, TEXTURE, PALETTE, VERTICE, RDP_SYNC, CHAIN, ORIGINAL, COSTUME
+from ssb_binary_model_profile import add_profile_arguments, count, profile_from_args, stage
+
+num_bytes = 4
+
+# Parses the converter's command line arguments
+def parse_args(argv=None):
+    """
+    Parses the converter's command line arguments.
+
+    Args:
+        argv (list): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-file", "--file",required=True,type=str,help="File we're converting.")
+    parser.add_argument("-offset","--offset","-location", "--location",required=True,type=str,help="Hexadecimal location of where we're adding the file in the binary (as a string, ex: '0x14').")
+    parser.add_argument("-first_pointer","--first_pointer","-internal_file_table_offset","--internal_file_table_offset",default="0x00",type=str,help="First pointer in the file we're expanding (usually following the first 01 command) (as a string, ex: '0x14').")
+    parser.add_argument("-pi","--pi","-palette_index", "--palette_index",default="0x00",type=str,help="Location where palette starts in file (as a string, ex: '0x14').")
+    parser.add_argument("-ti","--ti","-texture_index", "--texture_index",default="0x00",type=str,help="Location where textures start in file (as a string, ex: '0x14').")
+    parser.add_argument("-vi","--vi","-vertice_index", "--vertice_index",default="0x00",type=str,help="Location where vertices start in file (as a string, ex: '0x14').")
+    parser.add_argument("-oi","--oi","-opcode_index", "--opcode_index",default="0x00",type=str,help="Location where opcodes start in file (as a string, ex: '0x14').")
+    parser.add_argument("-palette_costume","--palette_costume","-costume","--costume",default="",help="Changes FD1 (palette) command with DE000000 0EXXXXXX to make palette based on costume palette. Enter entire DE command, ex DE0000000E000000.")
+    parser.add_argument("-original_character_offset","--original_character_offset",default="-1",type=str,help="Hexadecimal location of where the original character file started when adding the parts to the RAM (as a string, ex: '0x802EDE10') (this can help add parts that use original character data).")
+    parser.add_argument("-original_character_file_size","--original_character_file_size",default=-1,type=int,help="File size of original character file. This is used in tandem with original_character_offset to find data locations that are and aren't in the original character file.")
+    parser.add_argument("-mmap","--mmap",action="store_true",help="Maps file instead of reading it, and writes the output straight to its file (for big files, the output is the same).")
+    parser.add_argument("-debug","--debug",action="store_true",help="Prints debugging messages to output.")
+    parser.add_argument("-overwrite","--overwrite","-force","--force",action="store_true",help="Forces overwrite, making output go to -file.")
+    parser.add_argument("-o","--o","-output","--output",default="output.bin",type=str,help="Output file.")
+    add_cache_arguments(parser)
+    add_log_arguments(parser)
+    add_profile_arguments(parser)
+    return parser.parse_args(argv)
+
+# Reads hexadecimal data from a model buffer with hex offset given
+def read_hex_from_offset(model, offset, num_bytes):
+    """
+    Reads data from a model buffer.
+
+    Args:
+        model (ModelBuffer): Source model.
+        offset (string): Where in the model to read the data from.
+        num_bytes (int): How many bytes to read.
+
+    Returns:
+        string: Hexadecimal data read from the model.
+    """
+    try:
+        return model.read_hex(offset, num_bytes)
+    except ValueError:
+        error_message(f"Error: Invalid hex location '{offset}'")
+    return None
+
+# Writes hexadecimal data to a model buffer with hex offset given
+def write_hex_from_offset(model, offset, hex_string):
+    """
+    Writes over data in a model buffer.
+
+    Args:
+        model (ModelBuffer): Model to write to.
+        offset (string): Where to write the data to.
+        hex_string (string): Hexadecimal data we are writing.
+
+    Returns:
+        None
+    """
+    try:
+        model.write_hex(offset, hex_string)
+    except ValueError:
+        error_message(f"Error: Invalid hex location '{offset}'")
+    except binascii.Error as e:
+        error_message(f"Error converting hex string: {e}. Ensure the hex string has an even number of characters and contains only valid hex digits (0-9, A-F).")
+
+# Checking if data came from original character file, if so use that location
+def original_data(pointer, original_character_offset="-1", original_character_file_size=-1):
+    """
+    Checks if value is from original character by seeing if it's between
+    the original_character_offset and the end of it with the
+    original_character_file_size.
+
+    Args:
+        pointer (string): Pointer we're comparing as a string, ex '0x802ede10'.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+
+    Returns:
+        boolean: True if the argument is in the original character data
+    """
+    if original_character_offset != "-1":
+        # Checking if current data value(location) is in the original character file
+        # if so, data_location = hex_content_new_file - original_character_offset
+        if int(pointer,16) >= int(original_character_file_size) and int(pointer,16) < int(original_character_file_size) + int(original_character_offset,16):
+            return True
+    return False
+
+# Kind of data a pointer points to, only texture, palette and vertice pointers move along with hex_location
+def moving_data_kind(opcode):
+    """
+    Gets what kind of data the pointer of an opcode points to, if it moves along with where the model is added.
+
+    Args:
+        opcode (string): Current opcode (FD1,FD5,01,etc).
+
+    Returns:
+        int: TEXTURE, PALETTE or VERTICE; returns NO_COMMAND if the pointer doesn't move.
+    """
+    # FD5 = texture
+    if (str(opcode[:3]).upper() == "FD5") or (str(opcode[:3]).upper() == "FD9"):
+        return TEXTURE
+    # FD1 = palette
+    elif str(opcode[:3]).upper() == "FD1":
+        return PALETTE
+    # 01 = vertices
+    elif str(opcode[:2]).upper() == "01":
+        return VERTICE
+    return NO_COMMAND
+
+def set_pointer_difference(hex_location,hex_content_new_file,opcode,palette_index="0x00",texture_index="0x00",vertice_index="0x00",original_character_offset="-1",original_character_file_size=-1):
+    """
+    Returns the base offset to correctly update pointers based on hex_location (base file),
+    their current location(file we're adding), and their opcode.
+
+    Args:
+        hex_location (string):          Base offset we add to (usually size of the original character file).
+        hex_content_new_file (string):  Current location.
+        opcode (string):                Current opcode (FD1,FD5,01,etc).
+        palette_index (string):         Where the palette starts in the file.
+        texture_index (string):         Where the textures start in the file.
+        vertice_index (string):         Where the vertices start in the file.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+
+    Returns:
+        int: What to add to the new pointers; returns 0 if pointer is in original character.
+    """
+    # Return 0 if pointing to original character data
+    if original_character_offset != -1 and (int(hex_content_new_file,16) >= int(original_character_offset,16) and int(hex_content_new_file,16) < int(original_character_file_size) + int(original_character_offset,16)):
+        return 0
+
+    data_kind = moving_data_kind(opcode)
+    if data_kind == TEXTURE:
+        hex_location_padded = int(hex_location, 16) + int(texture_index, 16)
+    elif data_kind == PALETTE:
+        hex_location_padded = int(hex_location, 16) + int(palette_index, 16)
+    elif data_kind == VERTICE:
+        hex_location_padded = int(hex_location, 16) + int(vertice_index, 16)
+    else:
+        hex_location_padded = 0
+    force_difference = hex(int(hex_content_new_file,16)-hex_location_padded)
+
+    return force_difference
+
+# Used to convert a file that was made with Model2F3DEX2SSB with single pointer addresses meant for RAM, into 2 pointers
+def convert_single_pointer_file(model,destination_model,hex_content_new_file,current_location,hex_location,palette_index="0x00",texture_index="0x00",vertice_index="0x00",palette_costume="",original_character_offset="-1",original_character_file_size=-1,num_bytes=num_bytes,pointers_overwritten=0,end_pointer="FFFF",relocations=None,debug=False):
+    """
+    Converts pointers in a file for ROM usage by turning them into 2, based on offset and amount given.
+
+    Args:
+        model (ModelBuffer): Source model.
+        destination_model (ModelBuffer): Output model that the changes go to.
+        hex_content_new_file (string): Current hexadecimal value we're at (pointer).
+        current_location (string): Where we are in model, aka where hex_content is.
+        hex_location (string): Where the model is being added in the base file.
+        palette_index (string): Where the palette starts in the file.
+        texture_index (string): Where the textures start in the file.
+        vertice_index (string): Where the vertices start in the file.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+        num_bytes (int): How many bytes we read when reading binary data.
+        pointers_overwritten (int): Keeps track of how many pointers we've overwritten.
+        end_pointer(int): Determines what the last pointer is to stop converting.
+        relocations (list): Gets (location, kind) of every pointer half and palette command written that moves along with
+            hex_location (or is original character data), None for a pointer that isn't two 16 bit halves. None to not record them.
+        debug (boolean): Prints debugging messages.
+
+    Returns:
+        boolean: True if anything other than the pointer half of a command was written (the commands changed).
+    """
+
+    # Setting variables
+    last_pointer = current_location
+    file_size = len(model)
+    opcode_pointer = hex(int(current_location, 16) - 4)
+    opcode = read_hex_from_offset(model, opcode_pointer, num_bytes)
+    data = model.data
+
+    # Debug printing
+    summary(f"Updating pointers in {os.path.basename(model.file_path)} into output {os.path.basename(destination_model.file_path)}:")
+    if debug:
+        print(f"first opcode = {opcode} at {opcode_pointer}")
+
+    # Setting up to read through file, every pointer command is found once up front
+    force_difference = 0
+    commands_changed = False
+    first_word = int(current_location, 16) % 4
+    if first_word == 0:
+        # Already found when the model was indexed
+        next_locations, command_kinds = model.get_index().next_pointer_commands()
+    else:
+        next_locations, command_kinds = next_pointer_commands(data, first_word)
+    next_pointer_location = 0
+    looping = 1
+    current_command = hex(int(current_location, 16) - 4)
+    current_command = read_hex_from_offset(model,current_command,num_bytes)
+
+    # Now use force difference to find data location throughout the rest of the file
+    # and update the file pointers as you go
+    while looping:
+        # Determining op command and finding difference based on that,
+        # update everytime incase first pointer is in the original character
+        force_difference = set_pointer_difference(hex_location,hex_content_new_file,current_command,palette_index,texture_index,vertice_index,original_character_offset,original_character_file_size)
+
+        # Checking if data came from original character file, if so use that location
+        if original_character_offset != "-1":
+            # Checking if current data value(location) is in the original character file
+            # if so, data_location = hex_content_new_file - original_character_offset
+            if int(hex_content_new_file,16) >= int(original_character_offset,16) and int(hex_content_new_file,16) < int(original_character_file_size) + int(original_character_offset,16):
+                data_location = '{:04x}'.format(int((int(hex_content_new_file,16) - int(original_character_offset,16))/4))
+            else:
+                data_location = '{:04x}'.format(int((int(hex_content_new_file,16) - int(force_difference,16))/4))
+
+            if debug:
+                print(f"hex_content_new_file = {hex(int(hex_content_new_file,16))} original_character_offset = {original_character_offset} original_character_file_size = {hex(original_character_file_size)} data_location = {data_location} force_difference = {force_difference} hex_location = {hex_location}")
+        else:
+            data_location = '{:04x}'.format(int((int(hex_content_new_file,16) - int(force_difference,16))/4))
+
+        # Looking for next op command with a pointer to update the last accordingly
+        current_location_dec = int(current_location, 16)
+        while 1:
+            # Looking up the next FD1, FD5, 01, or DE command instead of checking every 4 bytes
+            word = (current_location_dec + 4 - first_word) // 4
+            command_location = next_locations[word] if word < len(next_locations) else -1
+            if command_location == -1:
+                # Stepping past the end of the file like reading every 4 bytes would
+                current_location_dec = current_location_dec + 4 + max(0, -(-(file_size - current_location_dec - 4) // 4) * 4)
+                looping = 0
+                new_location = end_pointer
+                break
+            current_location_dec = command_location
+            if command_kinds[(command_location - first_word) // 4] == PALETTE and palette_costume != "":
+                # Overwriting palette
+                new_byte_to_write = palette_costume
+                if tracing():
+                    old_byte = read_hex_from_offset(model,hex(current_location_dec),8)
+                    record_change("palette", destination_model.file_path, current_location_dec, old_byte, new_byte_to_write, f"{last_pointer}: changing {old_byte} to {new_byte_to_write}\n")
+                write_hex_from_offset(destination_model,hex(current_location_dec),new_byte_to_write)
+                commands_changed = True
+                if relocations is not None:
+                    relocations.append((current_location_dec, COSTUME))
+
+                # Going 4 ahead to help skip command
+                current_location_dec = current_location_dec + 4
+                if current_location_dec >= file_size:
+                    looping = 0
+                    new_location = end_pointer
+                    break
+            else:
+                next_pointer_location = hex(current_location_dec + 4)
+                new_location = '{:04x}'.format(int((int(hex_location,16) + int(next_pointer_location,16))/4))
+                break
+        current_location = hex(current_location_dec)
+
+        # Overwriting last pointer
+        new_byte_to_write = new_location+data_location
+        if tracing():
+            old_byte = read_hex_from_offset(model,last_pointer,num_bytes)
+            record_change("pointer", destination_model.file_path, int(last_pointer, 16), old_byte, new_byte_to_write, f"{last_pointer}: changing {old_byte} to {new_byte_to_write}\n")
+        write_hex_from_offset(destination_model,last_pointer,new_byte_to_write)
+        pointers_overwritten = pointers_overwritten + 1
+        last_pointer_dec = int(last_pointer, 16)
+
+        # Recording which halves move along with hex_location, set_pointer_difference() gives 0 for original character data
+        if relocations is not None:
+            if len(new_byte_to_write) != 8 or "-" in new_byte_to_write:
+                relocations.append(None)
+            else:
+                if new_location != end_pointer:
+                    relocations.append((last_pointer_dec, CHAIN))
+                if force_difference == 0:
+                    if original_character_offset != "-1":
+                        relocations.append((last_pointer_dec + 2, ORIGINAL))
+                elif moving_data_kind(current_command) != NO_COMMAND:
+                    relocations.append((last_pointer_dec + 2, moving_data_kind(current_command)))
+
+        # Only the second word of a command (not a DF command) leaves the commands alone
+        if last_pointer_dec % 8 != 4 or len(new_byte_to_write) != 8 or last_pointer_dec + 4 > file_size or command_kind(data, last_pointer_dec - 4) == END:
+            commands_changed = True
+
+        # Going to next pointer
+        if next_pointer_location != 0:
+            last_pointer = next_pointer_location
+            hex_content_new_file = read_hex_from_offset(model,next_pointer_location,num_bytes)
+        else:
+            break
+
+        # Getting command from current location
+        current_command = hex(int(current_location, 16))
+        current_command = read_hex_from_offset(model,current_command,num_bytes)
+
+    # Debug printing
+    summary(f"Done writing to {os.path.basename(destination_model.file_path)}, total pointers overwritten = {pointers_overwritten}")
+    count("pointer chain entries", pointers_overwritten)
+    return commands_changed
+
+# Making sure we have indexes for palette, vertices, textures, opcodes, etc
+def find_indexes(model,first_pointer="0x00",palette_index="0x00",texture_index="0x00",vertice_index="0x00",opcode_index="0x00",original_character_offset="-1",original_character_file_size=-1,debug=False):
+    """
+    Finds where the palette, textures, vertices and opcodes start in a RAM model file along with its first pointer.
+    Indexes that are already set (not "0x00") are kept.
+
+    Args:
+        model (ModelBuffer): Source model.
+        first_pointer (string): First pointer in the model.
+        palette_index (string): Where the palette starts in the file.
+        texture_index (string): Where the textures start in the file.
+        vertice_index (string): Where the vertices start in the file.
+        opcode_index (string): Where the opcodes start in the file.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+
+    Returns:
+        tuple: first_pointer, palette_index, texture_index, vertice_index and opcode_index as hexadecimal strings.
+    """
+    # Debug statement
+    if debug:
+        print(f"Attempting auto indexing for palette, vertice, texture, and opcodes...")
+
+    # Setting variables
+    base_offset = "0xFFFFFFFF"
+    data = model.data
+    index = model.get_index()
+
+    # Determining indexes
+    for reading_loc_dec, command in index.pointer_commands:
+        command_pointer = data[reading_loc_dec + 4:reading_loc_dec + 8].hex()
+
+        # 01 commands only count once FA, E8 or E7 commands have been seen
+        if command == VERTICE:
+            if index.first_sync_command != -1 and reading_loc_dec > index.first_sync_command:
+                # No texture found, set base_offset to where next 01 command points to
+                if first_pointer == "0x00":
+                    first_pointer = hex(reading_loc_dec + 4) # adding 4 because reading_loc_dec is at the 01 command
+
+                # Make sure it's not in the original character data, we don't use that as
+                # an offset since that data isn't in this file, it's in previous data
+                if int(command_pointer,16) < int(base_offset,16) and not original_data(command_pointer,original_character_offset,original_character_file_size):
+                    base_offset = command_pointer
+                if vertice_index == "0x00" and not original_data(command_pointer,original_character_offset,original_character_file_size):
+                    vertice_index = command_pointer
+        # FD5 = texture
+        elif command == TEXTURE:
+            if debug:
+                print(f"texture data = {data[reading_loc_dec:reading_loc_dec + 8].hex()}")
+            if first_pointer == "0x00":
+                first_pointer = hex(reading_loc_dec + 4) # adding 4 because reading_loc_dec is at the FD command
+            if texture_index == "0x00" and not original_data(command_pointer,original_character_offset,original_character_file_size):
+                texture_index = command_pointer
+        # FD1 = palette
+        elif command == PALETTE:
+            if debug:
+                print(f"palette data = {data[reading_loc_dec:reading_loc_dec + 8].hex()}")
+            if first_pointer == "0x00":
+                first_pointer = hex(reading_loc_dec + 4) # adding 4 because reading_loc_dec is at the FD1 command
+            if int(command_pointer,16) < int(base_offset,16) and not original_data(command_pointer,original_character_offset,original_character_file_size):
+                base_offset = command_pointer
+
+    # E7 = RDP sync, where the opcodes start
+    if index.first_command(RDP_SYNC) != -1:
+        opcode_index = hex(index.first_command(RDP_SYNC))
+
+    # Finished indexing, making sure we have a pointer
+    if first_pointer == "0x00":
+        error_message("Couldn't find a single pointer, exiting.")
+        raise ModelError("Couldn't find a single pointer.")
+
+    # Making sure base_offset is set if other indexes are set
+    if base_offset == "0xFFFFFFFF" and (texture_index != "0x00" or vertice_index != "0x00"):
+        error_message("Couldn't find base_offset but texture_index or vertice_index is set, make sure palette is being found.")
+        raise ModelError("Couldn't find base_offset.")
+
+    # Set other indexes
+    if texture_index != "0x00":
+        texture_index = hex(int(texture_index, 16) - int(base_offset,16))
+    if vertice_index != "0x00":
+        vertice_index = hex(int(vertice_index, 16) - int(base_offset,16))
+
+    # Debug statements
+    if debug:
+        print(f"Index of palette, texture, vertice, & opcodes: ")
+        print(f"base_offset = {base_offset} first_pointer = {first_pointer}")
+        print(f"palette_index = {palette_index} texture_index = {texture_index} vertice_index = {vertice_index} opcode_index = {opcode_index}\n")
+
+    return first_pointer, palette_index, texture_index, vertice_index, opcode_index
+
+# Converts a RAM model that's already in memory
+def convert_model(model,hex_location,output_path=None,first_pointer="0x00",palette_index="0x00",texture_index="0x00",vertice_index="0x00",opcode_index="0x00",palette_costume="",original_character_offset="-1",original_character_file_size=-1,debug=False):
+    """
+    Converts a RAM model to a ROM model in memory, nothing is written to disk.
+
+    Args:
+        model (ModelBuffer): Source model (left unchanged).
+        hex_location (string): Where the model is being added in the base file.
+        output_path (string): File path the converted model is flushed to, defaults to the source model's path.
+        first_pointer (string): First pointer in the model, "0x00" to find it.
+        palette_index (string): Where the palette starts in the file.
+        texture_index (string): Where the textures start in the file.
+        vertice_index (string): Where the vertices start in the file.
+        opcode_index (string): Where the opcodes start in the file, "0x00" to find every index.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+
+    Returns:
+        ModelBuffer: Converted model, with the indexes used in conversion_indexes and what moves with hex_location in relocations.
+    """
+    # Checking palette_costume argument
+    if palette_costume != "" and not (costume_regex.match(str(palette_costume).upper())):
+        error_message(f"Error, palette_costume doesn't match DE000000 0EXXXXXX, exiting.")
+        raise ModelError("palette_costume doesn't match DE000000 0EXXXXXX.")
+
+    # The output starts as a copy of the model
+    if output_path is None:
+        output_path = model.file_path
+    with stage("copy"):
+        output_model = model.copy(output_path)
+    original_character_file_size = int(original_character_file_size)
+
+    # Making sure we have indexes for palette, vertices, textures, opcodes, etc
+    if opcode_index == "0x00":
+        with stage("first pointer"):
+            first_pointer, palette_index, texture_index, vertice_index, opcode_index = find_indexes(model,first_pointer,palette_index,texture_index,vertice_index,opcode_index,original_character_offset,original_character_file_size,debug)
+
+    # Getting first pointer data
+    hex_content = read_hex_from_offset(model, first_pointer, num_bytes)
+    current_location = first_pointer
+
+    # Converting
+    with stage("conversion"):
+        relocations = []
+        commands_changed = convert_single_pointer_file(model,output_model,hex_content,current_location,hex_location,palette_index,texture_index,vertice_index,palette_costume,original_character_offset,original_character_file_size,num_bytes,relocations=relocations,debug=debug)
+
+    # Keeping the indexes so nothing has to look for them again
+    output_model.conversion_indexes = (first_pointer, palette_index, texture_index, vertice_index, opcode_index)
+    output_model.relocations = None if None in relocations else relocations
+    output_model.costume_sites = [relocation[0] for relocation in relocations if relocation is not None and relocation[1] == COSTUME]
+    if not commands_changed:
+        output_model.command_index = model.index
+
+    return output_model
+
+# Converts a RAM model file and writes it to output_path
+def convert_ram_to_rom(file_path,hex_location,output_path="output.bin",first_pointer="0x00",palette_index="0x00",texture_index="0x00",vertice_index="0x00",opcode_index="0x00",palette_costume="",original_character_offset="-1",original_character_file_size=-1,debug=False,overwrite=False,mapped=False,cache=None,models=None):
+    """
+    Converts a RAM model file to a ROM model file.
+
+    Args:
+        file_path (string): File we're converting.
+        hex_location (string): Where the model is being added in the base file.
+        output_path (string): Output file.
+        first_pointer (string): First pointer in the model, "0x00" to find it.
+        palette_index (string): Where the palette starts in the file.
+        texture_index (string): Where the textures start in the file.
+        vertice_index (string): Where the vertices start in the file.
+        opcode_index (string): Where the opcodes start in the file, "0x00" to find every index.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+        overwrite (boolean): Writes the output over file_path.
+        mapped (boolean): Maps file_path and the output instead of reading them into memory.
+        cache (ModelCache): Links file_path's cached relocatable part instead of converting it when the indexes are found (not given) and it isn't mapped (see convert_cached()), None to always convert.
+        models (ModelStore): Models already in memory to load file_path from (unless mapped), None to read it from disk.
+
+    Returns:
+        ModelBuffer: Converted model.
+    """
+    # Loading file into memory
+    try:
+        # Get the current working directory
+        current_directory = os.getcwd()
+
+        # Construct full paths for source and destination
+        source_path = os.path.join(current_directory, file_path)
+        destination_path = os.path.join(current_directory, output_path)
+
+        # Setting temp output if we're overwriting
+        if file_path == output_path and overwrite == True:
+            output_path = output_path+"temp"
+            destination_path = os.path.join(current_directory, output_path)
+
+        if file_path == output_path:
+            error_message(f"Error: The file '{file_path}' is the same as the output '{output_path}'.")
+            raise ModelError(f"The file '{file_path}' is the same as the output '{output_path}'.")
+
+        # Deleting output file
+        if os.path.exists(destination_path):
+            os.remove(destination_path)
+
+        # Loading the file, the output is only written once we're done
+        with stage("load"):
+            source_model = ModelBuffer(source_path, mapped=mapped) if models is None or mapped else models.load(source_path)
+        if debug:
+            print(f"File '{os.path.basename(file_path)}' loaded as '{os.path.basename(output_path)}' successfully.\n")
+    except ModelError:
+        raise
+    except FileNotFoundError:
+        error_message(f"Error: The file '{file_path}' was not found.")
+        raise ModelError(f"The file '{file_path}' was not found.")
+    except Exception as e:
+        error_message(f"An error occurred: {e}")
+        raise ModelError(e)
+
+    # Converting
+    try:
+        if cache is not None and not mapped and (first_pointer, palette_index, texture_index, vertice_index, opcode_index) == ("0x00",) * 5:
+            # Local import, the relocatable part maker converts parts with this module
+            from ssb_binary_model_relocatable import convert_cached
+            output_model = convert_cached(source_model,hex_location,destination_path,palette_costume,original_character_offset,original_character_file_size,debug,cache)
+        else:
+            output_model = convert_model(source_model,hex_location,destination_path,first_pointer,palette_index,texture_index,vertice_index,opcode_index,palette_costume,original_character_offset,original_character_file_size,debug)
+    except ModelError:
+        # A mapped output is already on disk, so it's deleted to leave no output like when reading into memory
+        if mapped and os.path.exists(destination_path):
+            os.remove(destination_path)
+        raise
+
+    # Writing output, copying whatever didn't change straight from the base file
+    with stage("write"):
+        output_model.flush(source_path=source_path)
+
+    # Overwriting base file
+    if overwrite:
+        # Renaming temp to base, the base file is never left half written
+        with stage("overwrite"):
+            os.replace(destination_path, source_path)
+
+    return output_model
+
+# Runs the converter from the command line
+def main(argv=None,models=None):
+    """
+    Runs the converter with command line arguments.
+
+    Args:
+        argv (list): Arguments to parse, defaults to sys.argv.
+        models (ModelStore): Models already in memory to load files from, None to read them from disk.
+
+    Returns:
+        int: Exit code.
+    """
+    args = parse_args(argv)
+    cache = cache_from_args(args)
+    try:
+        with log_from_args(args), profile_from_args(args):
+            convert_ram_to_rom(args.file,args.offset,args.o,args.first_pointer,args.pi,args.ti,args.vi,args.oi,args.palette_costume,args.original_character_offset,args.original_character_file_size,args.debug,args.overwrite,args.mmap,cache,models)
+    except ModelError:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
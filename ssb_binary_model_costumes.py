@@ -0,0 +1,103 @@
+# Makes every palette costume of a model from one build, patching the palette commands of the first output.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import os
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_log import summary
+from ssb_binary_model_manifest import manifest_path, remove_manifest
+from ssb_binary_model_opcodes import costume_regex
+
+costume_step = 0x20     # Size of a palette (16 colours), what a costume range counts up by unless given
+
+# Reads a list or range of costumes
+def parse_costumes(palette_costume):
+    """
+    Reads -costume, which can be one DE command, a list of them split by commas or a range of them
+    (FIRST-LAST, counting the palette offset up by costume_step, or by STEP with FIRST-LAST/STEP).
+
+    Args:
+        palette_costume (string): -costume, ex: 'DE0000000E000000,DE0000000E000040' or 'DE0000000E000000-DE0000000E000060/20'.
+
+    Returns:
+        list: Every DE command, [palette_costume] if it's only one (or "").
+    """
+    if "," not in str(palette_costume) and "-" not in str(palette_costume):
+        # One costume is checked like it always was
+        return [palette_costume]
+    costumes = []
+    for item in str(palette_costume).upper().replace(" ", "").split(","):
+        first, _, last = item.partition("-")
+        last, _, step = last.partition("/")
+        if last == "":
+            costumes.append(first)
+            continue
+        try:
+            first_offset = int(first[10:], 16)
+            last_offset = int(last[10:], 16)
+            step = int(step, 16) if step != "" else costume_step
+        except ValueError:
+            error_message(f"Error, costume range {item} isn't FIRST-LAST or FIRST-LAST/STEP, exiting.")
+            raise ModelError(f"Costume range {item} can't be read.")
+        if first[:10] != last[:10] or step <= 0 or last_offset < first_offset:
+            error_message(f"Error, costume range {item} has to go up from FIRST to LAST, exiting.")
+            raise ModelError(f"Costume range {item} can't be read.")
+        costumes.extend(f"{first[:10]}{offset:06X}" for offset in range(first_offset, last_offset + 1, step))
+    for costume in costumes:
+        if not costume_regex.match(costume) or len(costume) != 16:
+            error_message(f"Error, palette_costume {costume} doesn't match DE000000 0EXXXXXX, exiting.")
+            raise ModelError("palette_costume doesn't match DE000000 0EXXXXXX.")
+    if len(set(costumes)) != len(costumes):
+        error_message(f"Error, a costume is given more than once in {palette_costume}, exiting.")
+        raise ModelError("A costume is given more than once.")
+    return costumes
+
+# Output file of a costume
+def costume_output_path(output_path, costume):
+    root, extension = os.path.splitext(output_path)
+    return f"{root}_{costume[10:]}{extension}"
+
+# Output file of every costume, output_path itself if there's only one
+def costume_output_paths(output_path, costumes):
+    if len(costumes) == 1:
+        return [output_path]
+    return [costume_output_path(output_path, costume) for costume in costumes]
+
+# Builds every costume
+def build_costumes(build, costumes, output_path="output.bin"):
+    """
+    Builds the first costume and writes every other costume by patching the palette commands the first
+    build wrote the costume over (its costume_sites) in a copy of the first output. If those aren't known
+    (like when the build reused the last one), every costume is built on its own instead.
+
+    Args:
+        build (function): Builds one costume, taking (output_path, palette_costume) and returning the output ModelBuffer.
+        costumes (list): DE command of every costume.
+        output_path (string): Output file, with more than one costume every costume is written next to it with its palette offset added to the name.
+
+    Returns:
+        list: Output file of every costume.
+    """
+    output_paths = costume_output_paths(output_path, costumes)
+    if len(costumes) == 1:
+        build(output_path, costumes[0])
+        return output_paths
+    sites = build(output_paths[0], costumes[0]).costume_sites
+    if sites is None:
+        summary("~Palette commands of the first costume aren't known, building every costume~")
+        for costume_output, costume in zip(output_paths[1:], costumes[1:]):
+            build(costume_output, costume)
+        return output_paths
+
+    # Patching the rest, only the palette commands get written on top of a copy of the first output
+    first_model = ModelBuffer(output_paths[0])
+    for costume_output, costume in zip(output_paths[1:], costumes[1:]):
+        costume_model = first_model.copy(costume_output)
+        for location in sites:
+            costume_model.write_hex(hex(location), costume)
+        costume_model.flush(source_path=output_paths[0])
+        remove_manifest(manifest_path(costume_output))
+        summary(f"~Wrote {os.path.basename(costume_output)} by changing {len(sites)} palette commands to {costume}~")
+    return output_paths
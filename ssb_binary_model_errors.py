@@ -0,0 +1,30 @@
+# Error reporting shared by the model scripts.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import os
+from inspect import currentframe, getframeinfo
+
+class ModelError(Exception):
+    """
+    Raised when a model can't be appended or converted. The message has already
+    been printed with error_message() by the time this is raised, so callers only
+    need to decide whether to stop or carry on.
+    """
+
+# Prints an error along with the file and line it came from
+def error_message(e, cf=None):
+    """
+    Prints an error message.
+
+    Args:
+        e (Exception or string): Error to print.
+        cf (frame): Frame the error came from, defaults to the caller.
+
+    Returns:
+        None
+    """
+    if cf is None:
+        cf = currentframe().f_back
+    print(f'File "{os.path.basename(getframeinfo(cf).filename)}", line {cf.f_lineno}, An error occurred: \n{e}\n')
@@ -0,0 +1,263 @@
+# Index of the display list commands in a model file, built in a single pass.
+# Lets the first/last/base offset finders look things up instead of scanning the file again.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import bisect
+import struct
+from ssb_binary_model_opcodes import opcode_table, command_kind, NO_COMMAND, TEXTURE, PALETTE, VERTICE, PRIMITIVE, PRIMITIVE_SYNC, RDP_SYNC, JUMP, END
+from ssb_binary_model_profile import count
+
+class DisplayListIndex:
+    """
+    Records where every FD1/FD5/FD9, 01, DE, E7, E8, FA and DF command is in a model
+    (checked every 8 bytes from the start of the file), along with the pointer chain head
+    and tail and the base offset of a ROM model.
+
+    Args:
+        data (bytearray): Binary model data.
+    """
+    def __init__(self, data):
+        self.data = data
+        self.file_size = len(data)
+        self.commands = {TEXTURE: [], PALETTE: [], VERTICE: [], PRIMITIVE: [], PRIMITIVE_SYNC: [], RDP_SYNC: [], JUMP: [], END: []}
+        self.full_end_commands = []     # DF00000000000000
+        self.pointer_commands = []      # (location, kind) of FD1, FD5 and 01 commands in file order
+        self.first_sync_command = -1    # first FA, E8 or E7 command, 01 commands after it hold pointers
+        self.first_pointer = -1         # head of the pointer chain
+        self.base_offset = "0x00"       # lowest pointer data location in a ROM model
+        self.base_offset_error = None
+        self.pointer_words = []         # (location, kind) of every command with a RAM pointer on every 4 bytes (what the converter looks for)
+        self.unaligned_last_pointer = -1    # last pointer searched for on the steps back from the end of the file, when its size isn't a multiple of 8
+        self.original_first_pointer = -1    # first pointer of an original character file
+        self.build()
+
+    # Goes through the file once and records every command
+    def build(self):
+        data = self.data
+        full_size = self.file_size - (self.file_size % 8)
+
+        # Setting up base offset search (FA means look for the next 01 command)
+        base_offset_dec = 65535 # FFFF
+        base_offset_done = False
+        primitive_seen = False
+
+        # 01 or DE command in a second word, only a pointer command if the next first word is a RAM pointer
+        pending_word = -1
+        pending_kind = NO_COMMAND
+
+        # Commands starting 4 bytes in, where the last pointer is looked for when the file size is 4 past a multiple of 8
+        track_unaligned = self.file_size % 8 == 4
+        unaligned_end = -1          # DF command in a second word, a full end command if the next first word is 0
+        unaligned_vertice = -1      # last 01 command in a second word
+
+        location = 0
+        count("opcodes decoded", full_size // 4)
+        with memoryview(data) as data_view:
+            commands_view = data_view[:full_size]
+            for first_word, second_word in struct.iter_unpack(">II", commands_view):
+                command = opcode_table[first_word >> 24](first_word)
+
+                # Pointer commands on every 4 bytes, done here so the converter doesn't have to decode the file again
+                if pending_word != -1:
+                    if (first_word & 0xFF800000) == 0x80000000:
+                        self.pointer_words.append((pending_word, pending_kind))
+                    pending_word = -1
+                if command == TEXTURE or command == PALETTE or ((command == VERTICE or command == JUMP) and (second_word & 0xFF800000) == 0x80000000):
+                    self.pointer_words.append((location, command))
+                second_command = opcode_table[second_word >> 24](second_word)
+                if track_unaligned:
+                    if unaligned_end != -1 and first_word == 0:
+                        self.unaligned_last_pointer = unaligned_vertice + 4 if unaligned_vertice != -1 else -1
+                    unaligned_end = location + 4 if second_word == 0xDF000000 else -1
+                    if second_command == VERTICE:
+                        unaligned_vertice = location + 4
+                if second_command == TEXTURE or second_command == PALETTE:
+                    self.pointer_words.append((location + 4, second_command))
+                elif second_command == VERTICE or second_command == JUMP:
+                    pending_word = location + 4
+                    pending_kind = second_command
+
+                if command != NO_COMMAND:
+                    self.add_command(location, command, second_word == 0)
+
+                    # Base offset, lowest lower half of FD pointers or of the 01 pointer after an FA command
+                    if not base_offset_done:
+                        if primitive_seen:
+                            if command == VERTICE:
+                                base_offset_dec = self.update_base_offset(location, base_offset_dec)
+                                primitive_seen = False
+                            elif command == END and base_offset_dec != 65535:
+                                base_offset_done = True
+                        elif command == TEXTURE or command == PALETTE:
+                            base_offset_dec = self.update_base_offset(location, base_offset_dec)
+                        elif command == PRIMITIVE:
+                            primitive_seen = True
+                        elif command == END and base_offset_dec != 65535:
+                            base_offset_done = True
+                location = location + 8
+            commands_view.release()
+
+        # Last word might finish off a pointer command or be one
+        if full_size + 4 <= self.file_size:
+            last_word = struct.unpack_from(">I", data, full_size)[0]
+            if pending_word != -1 and (last_word & 0xFF800000) == 0x80000000:
+                self.pointer_words.append((pending_word, pending_kind))
+            last_command = opcode_table[last_word >> 24](last_word)
+            if last_command == TEXTURE or last_command == PALETTE:
+                self.pointer_words.append((full_size, last_command))
+            if track_unaligned and unaligned_end != -1 and last_word == 0:
+                self.unaligned_last_pointer = unaligned_vertice + 4 if unaligned_vertice != -1 else -1
+        if self.file_size % 8 != 0 and not track_unaligned:
+            # Sizes that aren't a multiple of 4 don't line up with the words above, so their steps get a pass of their own
+            self.unaligned_last_pointer = self.find_unaligned_last_pointer()
+
+        # The original search compared the 2 bytes at 0x0 and then 8 byte reads with 2 zero bytes, so it never got past the read after 0x8
+        if data[0:2] != b"\x00\x00":
+            self.original_first_pointer = 0
+        elif data[8:16] != b"\x00\x00":
+            self.original_first_pointer = 8
+        else:
+            self.original_first_pointer = 16
+
+        # Last command might not be a full 8 bytes
+        if full_size < self.file_size:
+            command = command_kind(data, full_size)
+            if command != NO_COMMAND:
+                self.add_command(full_size, command, False)
+                if not base_offset_done:
+                    if primitive_seen:
+                        if command == VERTICE:
+                            self.update_base_offset(full_size, base_offset_dec)
+                    elif command == TEXTURE or command == PALETTE:
+                        self.update_base_offset(full_size, base_offset_dec)
+
+    # Records a command found at location
+    def add_command(self, location, command, empty_second_word):
+        self.commands[command].append(location)
+        if command == END and empty_second_word:
+            self.full_end_commands.append(location)
+        if command == TEXTURE or command == PALETTE or command == VERTICE:
+            self.pointer_commands.append((location, command))
+
+        # First pointer, first FD1/FD5 command or first 01 command after FA, E8 or E7
+        if self.first_pointer == -1:
+            if command == TEXTURE or command == PALETTE:
+                self.first_pointer = location + 4 # adding 4 because location is at the FD command
+            elif command == VERTICE and self.first_sync_command != -1:
+                self.first_pointer = location + 4 # adding 4 because location is at the 01 command
+        if self.first_sync_command == -1 and (command == PRIMITIVE or command == PRIMITIVE_SYNC or command == RDP_SYNC):
+            self.first_sync_command = location
+
+    # Keeps the lowest pointer data location for the base offset
+    def update_base_offset(self, location, base_offset_dec):
+        location_hex = self.data[location + 6:location + 8].hex() # lower half of the pointer
+        if location_hex == "":
+            if self.base_offset_error is None:
+                self.base_offset_error = f"invalid literal for int() with base 16: '{location_hex}'"
+            return base_offset_dec
+        location_offset = int(location_hex, 16)
+        if location_offset < base_offset_dec:
+            self.base_offset = location_hex
+            return location_offset
+        return base_offset_dec
+
+    # Returns where the next pointer command is from every 4 bytes
+    def next_pointer_commands(self):
+        """
+        Gets the same table next_pointer_commands(data, 0) gives from the pointer commands found while indexing,
+        so the converter can look up where the next pointer is without decoding the file again.
+
+        Returns:
+            tuple: (next_locations, kinds), next_locations[i] is the location of the first pointer command
+                at or after 4 * i (-1 if there isn't one) and kinds[i] is the kind of the command at that word.
+        """
+        num_words = self.file_size // 4
+        next_locations = [-1] * (num_words + 1)
+        kinds = [NO_COMMAND] * num_words
+        word = 0
+        for location, kind in self.pointer_words:
+            command_word = location // 4
+            next_locations[word:command_word + 1] = [location] * (command_word + 1 - word)
+            kinds[command_word] = kind
+            word = command_word + 1
+        return next_locations, kinds
+
+    # Returns where the first command of a kind is
+    def first_command(self, command):
+        """
+        Gets the location of the first command of a kind.
+
+        Args:
+            command (int): Command kind (TEXTURE, RDP_SYNC, etc).
+
+        Returns:
+            int: Location of the command; returns -1 if there isn't one.
+        """
+        locations = self.commands[command]
+        if locations:
+            return locations[0]
+        return -1
+
+    # Returns the base offset pointers use in a ROM model
+    def get_base_offset(self):
+        """
+        Gets the base offset pointers use in a ROM model.
+
+        Returns:
+            string: Base offset as a hexadecimal string.
+        """
+        if self.base_offset_error is not None:
+            raise ValueError(self.base_offset_error)
+        return self.base_offset
+
+    # Returns the last pointer in the file based on the last DF command
+    def last_pointer(self):
+        """
+        Gets the location of the last pointer, the 01 command before the last DF command.
+
+        Returns:
+            int: Location of the last pointer; returns -1 if nothing found.
+        """
+        # The search goes backwards from the end of the file, so it only lines up with the index if the file size does
+        if self.file_size % 8 != 0:
+            return self.unaligned_last_pointer
+        if not self.full_end_commands:
+            return -1
+        vertices = self.commands[VERTICE]
+        vertice_position = bisect.bisect_left(vertices, self.full_end_commands[-1])
+        if vertice_position == 0:
+            return -1
+        return vertices[vertice_position - 1] + 4 # adding 4 because the location is at the 01 command
+
+    # Finds the last pointer on the steps back from the end of the file when its size isn't a multiple of 4
+    def find_unaligned_last_pointer(self):
+        """
+        Finds the last 01 command before the last full DF command, on the 8 byte steps the file size is on.
+
+        Returns:
+            int: Location of the last pointer; returns -1 if nothing found.
+        """
+        phase = self.file_size % 8
+        last_pointer = -1
+        vertice = -1
+        with memoryview(self.data) as data_view:
+            steps_view = data_view[phase:phase + (self.file_size - phase) // 8 * 8]
+            for location, (first_word, second_word) in enumerate(struct.iter_unpack(">II", steps_view)):
+                if first_word == 0xDF000000 and second_word == 0:
+                    last_pointer = vertice + 4 if vertice != -1 else -1
+                elif first_word >> 24 == 0x01:
+                    vertice = phase + location * 8
+            steps_view.release()
+        return last_pointer
+
+    # Returns the first non zero data location (used for full pointer conversion on original character file)
+    def original_character_first_pointer(self):
+        """
+        Gets the first pointer of an original character file, found while indexing by looking for the first non zero data.
+
+        Returns:
+            int: Location of first pointer; returns -1 if nothing found.
+        """
+        return self.original_first_pointer
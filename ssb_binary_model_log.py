@@ -0,0 +1,99 @@
+# What the model scripts print, by level, and an optional JSON lines file of every pointer they change.
+# Loops over pointers check tracing() first, so nothing is formatted for them unless it's going somewhere.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import json
+import os
+
+QUIET = 0       # Only errors
+SUMMARY = 1     # What's being done to every file and how many pointers changed (the default)
+TRACE = 2       # Every pointer changed as well
+level_names = {"quiet": QUIET, "summary": SUMMARY, "trace": TRACE}
+
+level = SUMMARY
+sink = None     # JSON lines file every change is recorded to, None if there isn't one
+
+# Prints a message if the level is summary or more
+def summary(message=""):
+    if level >= SUMMARY:
+        print(message)
+
+# Prints a message if the level is trace
+def trace(message=""):
+    if level >= TRACE:
+        print(message)
+
+# Checks if changes are printed or recorded
+def tracing():
+    return level >= TRACE or sink is not None
+
+# Checks if changes are recorded to a sink
+def recording():
+    return sink is not None
+
+# Gets the level
+def get_level():
+    return level
+
+# Prints and records one change
+def record_change(event, file_path, location, old, new, message=None):
+    """
+    Prints a change at trace level and writes it to the JSON lines sink as
+    {"event": ..., "file": ..., "at": ..., "old": ..., "new": ...}. Only call this after checking tracing().
+
+    Args:
+        event (string): What changed, ex: "pointer", "palette" or "connect".
+        file_path (string): File the change goes to (only its name is recorded).
+        location (int): Where the change is.
+        old (string): Hexadecimal data before.
+        new (string): Hexadecimal data after.
+        message (string): What to print, defaults to "LOCATION: changing OLD to NEW".
+
+    Returns:
+        None
+    """
+    if level >= TRACE:
+        print(f"{hex(location)}: changing {old} to {new}\n" if message is None else message)
+    record(event, file_path, location, old, new)
+
+# Records one change in the sink only
+def record(event, file_path, location, old, new):
+    if sink is not None:
+        sink.write(json.dumps({"event": event, "file": os.path.basename(file_path), "at": location, "old": old, "new": new}, separators=(",", ":")) + "\n")
+
+# Sets the level and sink while running something
+@contextlib.contextmanager
+def log_settings(log_level=SUMMARY, log_path=""):
+    """
+    Sets the level (and opens the sink) for everything run inside, putting the old ones back after.
+
+    Args:
+        log_level (int or string): QUIET, SUMMARY or TRACE (or their name).
+        log_path (string): JSON lines file every change is appended to, "" for none.
+
+    Returns:
+        context manager: Gives the sink (or None).
+    """
+    global level, sink
+    previous_level, previous_sink = level, sink
+    level = level_names.get(log_level, SUMMARY) if isinstance(log_level, str) else log_level
+    log_file = open(log_path, "a") if log_path != "" else None
+    sink = log_file if log_file is not None else previous_sink
+    try:
+        yield sink
+    finally:
+        level, sink = previous_level, previous_sink
+        if log_file is not None:
+            log_file.close()
+
+# Adds the log arguments to a parser
+def add_log_arguments(parser):
+    parser.add_argument("-log_level","--log_level",default="summary",choices=list(level_names),help="quiet only prints errors, summary prints what's done to every file and trace also prints every pointer changed.")
+    parser.add_argument("-log_file","--log_file",default="",type=str,help="JSON lines file every pointer changed is appended to (one record per change).")
+
+# Runs something with the log arguments
+def log_from_args(args):
+    return log_settings(args.log_level, args.log_file)
@@ -0,0 +1,129 @@
+# Build manifests, recording what went into a folder build so the next build only relinks the parts that changed.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import hashlib
+import json
+import os
+from ssb_binary_model_cache import code_hash
+from ssb_binary_model_relocation import RelocationTable, plan_relocation
+from ssb_binary_model_errors import ModelError
+
+manifest_version = 1
+
+class BuildManifest:
+    """
+    What a folder build was made from and where every part went, written next to the output.
+
+    Args:
+        base_hash (string): SHA-256 of the base file.
+        base_size (int): Size of the base file.
+        arguments (dict): Arguments the build was made with (and the scripts' hash).
+        output_hash (string): SHA-256 of the output.
+        parts (list): Every part in the order it was added, as a dict with name, hash (SHA-256), size,
+            offset (where it is in the output) and connection ([location, upper half]), the pointer that was
+            changed to point to the part and what its upper half was before.
+    """
+    def __init__(self, base_hash, base_size, arguments, output_hash, parts):
+        self.base_hash = base_hash
+        self.base_size = base_size
+        self.arguments = arguments
+        self.output_hash = output_hash
+        self.parts = parts
+
+    # Writes the manifest
+    def save(self, file_path):
+        manifest = {"version": manifest_version, "base": {"hash": self.base_hash, "size": self.base_size}, "arguments": self.arguments, "output": {"hash": self.output_hash}, "parts": self.parts}
+        temp_path = file_path + ".temp"
+        with open(temp_path, "w") as f:
+            json.dump(manifest, f, indent=4)
+        os.replace(temp_path, file_path)
+
+# Where an output's manifest goes
+def manifest_path(output_path):
+    return output_path + ".manifest"
+
+# Reads a manifest
+def read_manifest(file_path):
+    """
+    Reads a build manifest.
+
+    Args:
+        file_path (string): Manifest file.
+
+    Returns:
+        BuildManifest: Manifest; returns None if there isn't one or it can't be used.
+    """
+    try:
+        with open(file_path) as f:
+            manifest = json.load(f)
+        if manifest["version"] != manifest_version:
+            return None
+        return BuildManifest(manifest["base"]["hash"], manifest["base"]["size"], manifest["arguments"], manifest["output"]["hash"], manifest["parts"])
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+# Deletes a manifest that no longer matches its output
+def remove_manifest(file_path):
+    if os.path.exists(file_path):
+        os.remove(file_path)
+
+# Loads the last build of an output
+def load_previous_build(output_path):
+    """
+    Loads an output and its manifest, if the output is still what the manifest says it is.
+
+    Args:
+        output_path (string): Output file.
+
+    Returns:
+        tuple: (manifest, data); returns None if there's no usable previous build.
+    """
+    manifest = read_manifest(manifest_path(output_path))
+    if manifest is None:
+        return None
+    try:
+        with open(output_path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if hashlib.sha256(data).hexdigest() != manifest.output_hash:
+        return None
+    return manifest, data
+
+# Arguments that have to match for a build to be reused
+def build_arguments(first_pointer, palette_costume, original_character_offset, original_character_file_size):
+    """
+    Gets the arguments a folder build is recorded with.
+
+    Args:
+        first_pointer (string): First pointer in the base file, "-1" to find it.
+        palette_costume (string): DE command that replaces FD1 (palette) commands.
+        original_character_offset (string): RAM offset the original character file started at.
+        original_character_file_size (string): File size of the original character file.
+
+    Returns:
+        dict: Arguments.
+    """
+    return {"first_pointer": first_pointer, "palette_costume": palette_costume, "original_character_offset": original_character_offset,
+            "original_character_file_size": str(original_character_file_size), "code": code_hash()}
+
+# Checks if any pointer points at or past a location
+def points_past(model, chain_location, location):
+    """
+    Checks if any pointer in a model's chain points at or past location, in which case adding something
+    there moves it (and a build can't be reused once the size of what's added changes).
+
+    Args:
+        model (ModelBuffer): Model to check.
+        chain_location (int): First pointer in the chain.
+        location (int): Location to check.
+
+    Returns:
+        boolean: True if a pointer points at or past location (or the chain can't be followed).
+    """
+    try:
+        return len(plan_relocation(model.data, chain_location, RelocationTable([(location, 8)]))) > 0
+    except ModelError:
+        return True
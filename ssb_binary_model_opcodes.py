@@ -0,0 +1,188 @@
+# Decodes f3dex display list commands straight from binary model data.
+# Used instead of turning every 8 byte command into a hex string and running regex on it.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import re
+import struct
+
+# Regex expressions (hexadecimal string form of the commands decoded below)
+texture_regex = re.compile(r'FD[2-9,A-F][0-8]0000')
+palette_regex = re.compile(r'FD[1][0-8]0000')
+primitive_regex = re.compile(r'FA000000')
+primitive_sync_regex = re.compile(r'E8000000')
+rdp_sync_regex = re.compile(r'E7000000')
+end_regex = re.compile(r'DF000000')
+jump_regex = re.compile(r'DE0[0,1]000080[0-7][0-9,A-F]{5}')
+costume_regex = re.compile(r'DE0000000E[0-9A-F]{6}')
+vertice_regex = re.compile(r'01[0-9,A-F]{6}80[0-7][0-9,A-F]{5}')
+
+# Command kinds
+NO_COMMAND = 0
+TEXTURE = 1         # FD5 = texture
+PALETTE = 2         # FD1 = palette
+VERTICE = 3         # 01 = vertices
+PRIMITIVE = 4       # FA = primitive coloring
+PRIMITIVE_SYNC = 5  # E8 = tile
+RDP_SYNC = 6        # E7 = RDP sync
+JUMP = 7            # DE = jump to display list
+END = 8             # DF = end
+
+# Relocation kinds, where convert_model() wrote something that moves (or doesn't) with where the model goes.
+# Lower halves of pointers that move use the kind of their command (TEXTURE, PALETTE or VERTICE)
+CHAIN = 9           # Upper half of a pointer, where the next pointer is
+ORIGINAL = 10       # Lower half of a pointer to original character data, it doesn't move
+COSTUME = 11        # FD1 (palette) command replaced by the palette costume DE command
+
+word_struct = struct.Struct(">I")
+command_struct = struct.Struct(">II")
+
+# FD commands, the second byte is format (upper 4 bits) and size (lower 4 bits)
+fd_kinds = [NO_COMMAND] * 256
+for fd_byte in range(256):
+    if fd_byte & 0x0F <= 8:
+        if fd_byte >> 4 == 1:
+            fd_kinds[fd_byte] = PALETTE
+        elif fd_byte >> 4 >= 2:
+            fd_kinds[fd_byte] = TEXTURE
+
+def decode_no_command(word):
+    return NO_COMMAND
+
+def decode_fd(word):
+    if word & 0xFFFF:
+        return NO_COMMAND
+    return fd_kinds[(word >> 16) & 0xFF]
+
+def decode_vertice(word):
+    return VERTICE
+
+def decode_jump(word):
+    if word == 0xDE000000 or word == 0xDE010000:
+        return JUMP
+    return NO_COMMAND
+
+def exact_decoder(command_word, kind):
+    def decode(word):
+        if word == command_word:
+            return kind
+        return NO_COMMAND
+    return decode
+
+# Opcode byte -> function returning the command kind from the first word of the command
+opcode_table = [decode_no_command] * 256
+opcode_table[0xFD] = decode_fd
+opcode_table[0x01] = decode_vertice
+opcode_table[0xFA] = exact_decoder(0xFA000000, PRIMITIVE)
+opcode_table[0xE8] = exact_decoder(0xE8000000, PRIMITIVE_SYNC)
+opcode_table[0xE7] = exact_decoder(0xE7000000, RDP_SYNC)
+opcode_table[0xDE] = decode_jump
+opcode_table[0xDF] = exact_decoder(0xDF000000, END)
+
+# Returns the kind of command at offset based on its first word
+def command_kind(data, offset):
+    """
+    Decodes the command at offset by its opcode byte. Matches what the regex expressions
+    give on the first 4 bytes of the command (VERTICE only checks the 01 opcode byte).
+
+    Args:
+        data (bytearray): Binary model data.
+        offset (int): Where the command starts.
+
+    Returns:
+        int: Command kind (TEXTURE, PALETTE, VERTICE, etc), NO_COMMAND if nothing matched.
+    """
+    if offset < 0:
+        return NO_COMMAND
+    if offset + 4 > len(data):
+        # Not a full word left, only the 01 opcode byte can match
+        if offset < len(data) and data[offset] == 0x01:
+            return VERTICE
+        return NO_COMMAND
+    word = word_struct.unpack_from(data, offset)[0]
+    return opcode_table[word >> 24](word)
+
+# Returns the kind of command at offset if it's one that holds a RAM pointer
+def pointer_command_kind(data, offset):
+    """
+    Decodes the command at offset if it's a command with a pointer the converter updates
+    (FD1, FD5, 01 or DE with a 0x80000000-0x807FFFFF address).
+
+    Args:
+        data (bytearray): Binary model data.
+        offset (int): Where the command starts.
+
+    Returns:
+        int: TEXTURE, PALETTE, VERTICE or JUMP; NO_COMMAND if it isn't a pointer command.
+    """
+    kind = command_kind(data, offset)
+    if kind == TEXTURE or kind == PALETTE:
+        return kind
+    if kind == VERTICE or kind == JUMP:
+        if offset + 8 <= len(data) and (word_struct.unpack_from(data, offset + 4)[0] & 0xFF800000) == 0x80000000:
+            return kind
+    return NO_COMMAND
+
+# Finds the next command holding a RAM pointer from every word in one pass
+def next_pointer_commands(data, start):
+    """
+    Builds a table of where the next pointer command (what pointer_command_kind() finds) is from
+    every word at start, start + 4, start + 8, etc. It's built backwards so every word is only
+    decoded once.
+
+    Args:
+        data (bytearray): Binary model data.
+        start (int): Any location on the 4 byte steps the table is for (only start % 4 is used).
+
+    Returns:
+        tuple: (next_locations, kinds), next_locations[i] is the location of the first pointer command
+            at or after (start % 4) + 4 * i (-1 if there isn't one) and kinds[i] is the kind of the command at that word.
+    """
+    first_word = start % 4
+    num_words = max(0, (len(data) - first_word) // 4)
+    with memoryview(data) as data_view:
+        words = [word for (word,) in word_struct.iter_unpack(data_view[first_word:first_word + num_words * 4])]
+    next_locations = [-1] * (num_words + 1)
+    kinds = [NO_COMMAND] * num_words
+    next_ram_pointer = False    # Second word of the command is a 0x80000000-0x807FFFFF address
+    for i in range(num_words - 1, -1, -1):
+        word = words[i]
+        kind = opcode_table[word >> 24](word)
+        if (kind == VERTICE or kind == JUMP) and not next_ram_pointer:
+            kind = NO_COMMAND
+        if kind == TEXTURE or kind == PALETTE or kind == VERTICE or kind == JUMP:
+            kinds[i] = kind
+            next_locations[i] = first_word + i * 4
+        else:
+            next_locations[i] = next_locations[i + 1]
+        next_ram_pointer = (word & 0xFF800000) == 0x80000000
+    return next_locations, kinds
+
+# Returns True if there's a full DF00000000000000 command at offset
+def is_end_command(data, offset):
+    """
+    Checks for a full 8 byte end (DF) command.
+
+    Args:
+        data (bytearray): Binary model data.
+        offset (int): Where the command starts.
+
+    Returns:
+        boolean: True if the command is DF00000000000000.
+    """
+    return offset >= 0 and offset + 8 <= len(data) and command_struct.unpack_from(data, offset) == (0xDF000000, 0)
+
+# Returns the second word of the command at offset
+def command_data(data, offset):
+    """
+    Reads the second word (pointer) of a command.
+
+    Args:
+        data (bytearray): Binary model data.
+        offset (int): Where the command starts.
+
+    Returns:
+        int: Second word of the command.
+    """
+    return word_struct.unpack_from(data, offset + 4)[0]
@@ -0,0 +1,496 @@
+# Patch plans, what adding to a model would change (bytes inserted and bytes written over) without writing the output.
+# Made with -plan on the adder, applied later with: python ssb_binary_model_plan.py apply -plan plan.json -file 1557_isaac -o output.bin
+# A plan ending in .ssbp is written as a compact binary patch instead, and any number of them are applied to one base in a single pass.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import argparse
+import hashlib
+import json
+import os
+import re
+from ssb_binary_model_buffer import ModelBuffer, write_all
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_log import summary
+from ssb_binary_model_manifest import manifest_path, remove_manifest
+
+plan_version = 1
+patch_merge_gap = 4                     # Changed bytes closer than this go in the same patch (a pointer is 4 bytes)
+changed_regex = re.compile(rb"[^\x00]+")
+patch_extension = ".ssbp"               # Plans ending in this are written as binary patches
+patch_magic = b"SSBP"
+patch_version = 1
+COPY = 0        # Copies the next bytes of the base
+WRITE = 1       # Writes bytes over the next bytes of the base
+INSERT = 2      # Writes bytes without using up any of the base
+
+class PatchPlan:
+    """
+    What adding to a base file changes: the output is the base with every insert made (in order, at their
+    location in the output) and every patch written over it. Patches are at their location in the output and
+    also hold the bytes they replace, so a plan is only applied to the base it was made from.
+
+    Args:
+        base_name (string): Name of the base file.
+        base_hash (string): SHA-256 of the base file.
+        base_size (int): Size of the base file.
+        output_hash (string): SHA-256 of the output.
+        output_size (int): Size of the output.
+        inserts (list): (location, data) of every range of bytes inserted.
+        patches (list): (location, old data, new data) of every range of bytes written over.
+    """
+    def __init__(self, base_name, base_hash, base_size, output_hash, output_size, inserts, patches):
+        self.base_name = base_name
+        self.base_hash = base_hash
+        self.base_size = base_size
+        self.output_hash = output_hash
+        self.output_size = output_size
+        self.inserts = inserts
+        self.patches = patches
+
+    # Writes the plan, as a binary patch if file_path ends in .ssbp
+    def save(self, file_path):
+        if file_path.endswith(patch_extension):
+            self.patch().save(file_path)
+            return
+        plan = {"version": plan_version, "base": {"name": self.base_name, "hash": self.base_hash, "size": self.base_size}, "output": {"hash": self.output_hash, "size": self.output_size},
+                "inserts": [{"at": location, "data": data.hex()} for location, data in self.inserts],
+                "patches": [[location, old.hex(), new.hex()] for location, old, new in self.patches]}
+        temp_path = file_path + ".temp"
+        with open(temp_path, "w") as f:
+            json.dump(plan, f, separators=(",", ":"))
+        os.replace(temp_path, file_path)
+
+    # Turns the plan into a binary patch
+    def patch(self):
+        """
+        Turns the inserts and patches into the steps that write the output from start to end (see Patch).
+        The bytes a patch replaces aren't kept, the base's hash is checked instead.
+
+        Returns:
+            Patch: Patch.
+        """
+        changes = sorted([(location, INSERT, data) for location, data in self.inserts] + [(location, WRITE, new) for location, _, new in self.patches], key=lambda change: change[0])
+        actions = []
+        output_location = 0
+        base_location = 0
+        for location, kind, data in changes:
+            if location < output_location:
+                error_message(f"Error, the plan of {self.base_name} changes {hex(location)} twice, it can't be made into a patch.")
+                raise ModelError("Plan changes overlap.")
+            if location > output_location:
+                actions.append((COPY, location - output_location, b""))
+                base_location = base_location + location - output_location
+            actions.append((kind, len(data), data))
+            output_location = location + len(data)
+            if kind == WRITE:
+                base_location = base_location + len(data)
+        if base_location > self.base_size or output_location + self.base_size - base_location != self.output_size:
+            error_message(f"Error, the plan of {self.base_name} doesn't add up to its output size.")
+            raise ModelError("Plan doesn't add up to its output size.")
+        return Patch(self.base_name, self.base_hash, self.base_size, self.output_hash, self.output_size, actions)
+
+class Patch:
+    """
+    Binary patch, the steps that write the output of a plan from start to end: COPY copies the next bytes of
+    the base, WRITE writes new bytes over them and INSERT writes new bytes without using up any of the base.
+    Whatever is left of the base is copied after the last step. Written as SSBP, the version, the base's size
+    and SHA-256, the output's size and SHA-256 and the base's name, then every step as a varint of its
+    length << 2 | its kind followed by its bytes (none for COPY). Sizes and lengths are LEB128 varints.
+
+    Args:
+        base_name (string): Name of the base file.
+        base_hash (string): SHA-256 of the base file.
+        base_size (int): Size of the base file.
+        output_hash (string): SHA-256 of the output.
+        output_size (int): Size of the output.
+        actions (list): (kind, length, data) of every step.
+    """
+    def __init__(self, base_name, base_hash, base_size, output_hash, output_size, actions):
+        self.base_name = base_name
+        self.base_hash = base_hash
+        self.base_size = base_size
+        self.output_hash = output_hash
+        self.output_size = output_size
+        self.actions = actions
+
+    # Writes the patch
+    def save(self, file_path):
+        name = self.base_name.encode()
+        patch = bytearray(patch_magic)
+        patch.append(patch_version)
+        patch += encode_varint(self.base_size) + bytes.fromhex(self.base_hash)
+        patch += encode_varint(self.output_size) + bytes.fromhex(self.output_hash)
+        patch += encode_varint(len(name)) + name
+        for kind, length, data in self.actions:
+            patch += encode_varint(length << 2 | kind)
+            patch += data
+        temp_path = file_path + ".temp"
+        with open(temp_path, "wb") as f:
+            f.write(patch)
+        os.replace(temp_path, file_path)
+
+    # Gives the pieces of the output in order
+    def chunks(self, base_view):
+        """
+        Gives every piece of the output, the base's pieces being slices of base_view so they aren't copied.
+
+        Args:
+            base_view (memoryview): Base file's data.
+
+        Returns:
+            list: Pieces of the output.
+        """
+        chunks = []
+        base_location = 0
+        for kind, length, data in self.actions:
+            if kind == COPY:
+                chunks.append(base_view[base_location:base_location + length])
+            else:
+                chunks.append(data)
+            if kind != INSERT:
+                base_location = base_location + length
+        if base_location < len(base_view):
+            chunks.append(base_view[base_location:])
+        return chunks
+
+# Encodes a LEB128 varint
+def encode_varint(value):
+    encoded = bytearray()
+    while value >= 0x80:
+        encoded.append(value & 0x7F | 0x80)
+        value = value >> 7
+    encoded.append(value)
+    return bytes(encoded)
+
+# Decodes a LEB128 varint
+def decode_varint(data, location):
+    """
+    Decodes a LEB128 varint.
+
+    Args:
+        data (bytes): Data.
+        location (int): Where the varint starts.
+
+    Returns:
+        tuple: (value, location after the varint).
+    """
+    value = 0
+    shift = 0
+    while True:
+        byte = data[location]
+        location = location + 1
+        value = value | (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, location
+        shift = shift + 7
+
+# Finds every range of bytes that differs
+def changed_ranges(data, other_data, location, other_location, length):
+    """
+    Compares length bytes of data from location with other_data from other_location, XORing them as
+    integers so the bytes are never looked at one at a time in python.
+
+    Args:
+        data (bytes): Data.
+        other_data (bytes): Data to compare with.
+        location (int): Where to start in data.
+        other_location (int): Where to start in other_data.
+        length (int): How many bytes to compare.
+
+    Returns:
+        list: (start, end) of every range that differs, relative to location and other_location.
+    """
+    if length <= 0:
+        return []
+    with memoryview(data) as view, memoryview(other_data) as other_view:
+        if view[location:location + length] == other_view[other_location:other_location + length]:
+            return []
+        difference = int.from_bytes(view[location:location + length], "big") ^ int.from_bytes(other_view[other_location:other_location + length], "big")
+    ranges = []
+    for match in changed_regex.finditer(difference.to_bytes(length, "big")):
+        if ranges and match.start() - ranges[-1][1] < patch_merge_gap:
+            ranges[-1][1] = match.end()
+        else:
+            ranges.append([match.start(), match.end()])
+    return [tuple(changed) for changed in ranges]
+
+# Works out the plan from a base and its output
+def make_plan(base_model, output_model, insert_location, base_path=None):
+    """
+    Makes the plan that turns base_model into output_model, where everything output_model has more than
+    base_model was inserted at insert_location.
+
+    Args:
+        base_model (ModelBuffer): Model that was added to.
+        output_model (ModelBuffer): Output.
+        insert_location (int): Where the data was inserted (the base's size if it went on the end).
+        base_path (string): File base_model was loaded from, defaults to its file_path.
+
+    Returns:
+        PatchPlan: Plan.
+    """
+    if base_path is None:
+        base_path = base_model.file_path
+    base_data = base_model.data
+    output_data = output_model.data
+    inserted_size = len(output_data) - len(base_data)
+    if inserted_size < 0:
+        error_message(f"Error, output is smaller than {os.path.basename(base_path)}, it can't be planned as inserts and patches.")
+        raise ModelError("Output is smaller than the base.")
+    insert_location = min(insert_location, len(base_data))
+    inserts = [(insert_location, bytes(output_data[insert_location:insert_location + inserted_size]))] if inserted_size > 0 else []
+
+    # Patches before and after the inserted data
+    patches = []
+    for start, end in changed_ranges(output_data, base_data, 0, 0, insert_location):
+        patches.append((start, bytes(base_data[start:end]), bytes(output_data[start:end])))
+    tail_location = insert_location + inserted_size
+    for start, end in changed_ranges(output_data, base_data, tail_location, insert_location, len(base_data) - insert_location):
+        patches.append((tail_location + start, bytes(base_data[insert_location + start:insert_location + end]), bytes(output_data[tail_location + start:tail_location + end])))
+    return PatchPlan(os.path.basename(base_path), hashlib.sha256(base_data).hexdigest(), len(base_data), hashlib.sha256(output_data).hexdigest(), len(output_data), inserts, patches)
+
+# Writes the plan of an output instead of the output
+def save_plan(base_model, output_model, insert_location, plan_path, base_path=None):
+    """
+    Makes the plan of an output (see make_plan()) and writes it to plan_path.
+
+    Args:
+        base_model (ModelBuffer): Model that was added to.
+        output_model (ModelBuffer): Output.
+        insert_location (int): Where the data was inserted.
+        plan_path (string): Plan file.
+        base_path (string): File base_model was loaded from, defaults to its file_path.
+
+    Returns:
+        PatchPlan: Plan.
+    """
+    plan = make_plan(base_model, output_model, insert_location, base_path)
+    plan.save(plan_path)
+    summary(f"Planned {os.path.basename(plan_path)}: {sum(len(data) for _, data in plan.inserts)} bytes inserted, {len(plan.patches)} patches, {plan.output_size} bytes out ({os.path.getsize(plan_path)} byte plan).")
+    return plan
+
+# Reads a plan
+def read_plan(file_path):
+    """
+    Reads a patch plan.
+
+    Args:
+        file_path (string): Plan file.
+
+    Returns:
+        PatchPlan: Plan.
+    """
+    try:
+        with open(file_path) as f:
+            plan = json.load(f)
+        if plan.get("version") != plan_version:
+            error_message(f"Error, {os.path.basename(file_path)} isn't a version {plan_version} patch plan.")
+            raise ModelError(f"{os.path.basename(file_path)} isn't a version {plan_version} patch plan.")
+        return PatchPlan(plan["base"]["name"], plan["base"]["hash"], plan["base"]["size"], plan["output"]["hash"], plan["output"]["size"],
+                         [(insert["at"], bytes.fromhex(insert["data"])) for insert in plan["inserts"]],
+                         [(location, bytes.fromhex(old), bytes.fromhex(new)) for location, old, new in plan["patches"]])
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        error_message(f"Error, couldn't read patch plan {file_path}: {e}")
+        raise ModelError(f"Couldn't read patch plan {file_path}.")
+
+# Reads a binary patch, or a plan as one
+def read_patch(file_path):
+    """
+    Reads a binary patch, reading file_path as a JSON plan (see read_plan()) if it isn't one.
+
+    Args:
+        file_path (string): Patch or plan file.
+
+    Returns:
+        Patch: Patch.
+    """
+    try:
+        with open(file_path, "rb") as f:
+            data = f.read()
+    except OSError as e:
+        error_message(f"Error, couldn't read patch {file_path}: {e}")
+        raise ModelError(f"Couldn't read patch {file_path}.")
+    if not data.startswith(patch_magic):
+        return read_plan(file_path).patch()
+    try:
+        if data[len(patch_magic)] != patch_version:
+            error_message(f"Error, {os.path.basename(file_path)} isn't a version {patch_version} patch.")
+            raise ModelError(f"{os.path.basename(file_path)} isn't a version {patch_version} patch.")
+        base_size, location = decode_varint(data, len(patch_magic) + 1)
+        base_hash = data[location:location + 32].hex()
+        output_size, location = decode_varint(data, location + 32)
+        output_hash = data[location:location + 32].hex()
+        name_length, location = decode_varint(data, location + 32)
+        base_name = data[location:location + name_length].decode()
+        location = location + name_length
+        actions = []
+        while location < len(data):
+            step, location = decode_varint(data, location)
+            kind, length = step & 3, step >> 2
+            if kind == COPY:
+                actions.append((COPY, length, b""))
+                continue
+            if kind not in (WRITE, INSERT) or location + length > len(data):
+                raise ValueError(f"bad step at {hex(location)}")
+            actions.append((kind, length, data[location:location + length]))
+            location = location + length
+    except (IndexError, ValueError, UnicodeDecodeError) as e:
+        error_message(f"Error, couldn't read patch {file_path}: {e}")
+        raise ModelError(f"Couldn't read patch {file_path}.")
+    return Patch(base_name, base_hash, base_size, output_hash, output_size, actions)
+
+# Applies a plan to its base in memory
+def apply_plan_data(plan, base_data):
+    """
+    Makes the output of a plan from its base, checking the base is the one the plan was made from.
+
+    Args:
+        plan (PatchPlan): Plan.
+        base_data (bytes): Base file's data.
+
+    Returns:
+        bytearray: Output data.
+    """
+    if len(base_data) != plan.base_size or hashlib.sha256(base_data).hexdigest() != plan.base_hash:
+        error_message(f"Error, the base isn't the {plan.base_name} the plan was made from (size or hash differs).")
+        raise ModelError("Base doesn't match the plan.")
+    data = bytearray(base_data)
+    for location, inserted in plan.inserts:
+        data[location:location] = inserted
+    for location, old, new in plan.patches:
+        if data[location:location + len(old)] != old:
+            error_message(f"Error, {hex(location)} isn't {old.hex()} like the plan expects.")
+            raise ModelError(f"{hex(location)} doesn't match the plan.")
+        data[location:location + len(new)] = new
+    if len(data) != plan.output_size or hashlib.sha256(data).hexdigest() != plan.output_hash:
+        error_message("Error, applying the plan doesn't give the output it was made for.")
+        raise ModelError("Plan doesn't give its output.")
+    return data
+
+# Applies a plan file to a base file
+def apply_plan(plan_path, file_path="", output_path="output.bin", overwrite=False):
+    """
+    Applies a patch plan to the base file it was made from, writing the output. Only the patched ranges are
+    written from memory when the output is mostly the base (see ModelBuffer.flush()).
+
+    Args:
+        plan_path (string): Plan file.
+        file_path (string): Base file, "" for the file named in the plan next to the plan.
+        output_path (string): Output file.
+        overwrite (boolean): Writes the output over file_path.
+
+    Returns:
+        ModelBuffer: Output model.
+    """
+    plan = read_plan(plan_path)
+    if file_path == "":
+        file_path = os.path.join(os.path.dirname(plan_path), plan.base_name)
+    if overwrite:
+        output_path = file_path
+    try:
+        base_model = ModelBuffer(file_path)
+    except OSError as e:
+        error_message(f"Error, couldn't read {file_path}: {e}")
+        raise ModelError(f"Couldn't read {file_path}.")
+    output_model = ModelBuffer(output_path + "temp" if overwrite else output_path, apply_plan_data(plan, base_model.data))
+    output_model.flush(source_path=file_path)
+    if overwrite:
+        # Renaming temp to base, the base file is never left half written
+        os.replace(output_model.file_path, file_path)
+        output_model.file_path = file_path
+    remove_manifest(manifest_path(output_path))
+    summary(f"Applied {os.path.basename(plan_path)} to {os.path.basename(file_path)}, finished modifying {os.path.basename(output_path)}.")
+    return output_model
+
+# Where the output of one of many patches goes
+def patch_output_path(patch_path, output_folder):
+    name = os.path.splitext(os.path.basename(patch_path))[0] + ".bin"
+    return os.path.join(output_folder if output_folder != "" else os.path.dirname(patch_path), name)
+
+# Applies many patches to one base
+def apply_patches(patch_paths, file_path="", output_path="output.bin", output_folder="", overwrite=False):
+    """
+    Applies patches (or plans) made from the same base in one pass: the base is read and its hash checked
+    once, then every output is written in one write from slices of it and the patch's bytes, with its hash
+    checked before it's renamed into place.
+
+    Args:
+        patch_paths (list): Patch or plan files.
+        file_path (string): Base file, "" for the file named in the first patch next to it.
+        output_path (string): Output file when there's one patch.
+        output_folder (string): Folder the outputs go in when there's more than one patch (named after
+            their patch, ex: red.ssbp gives red.bin), "" for next to every patch.
+        overwrite (boolean): Writes the output over file_path (only with one patch).
+
+    Returns:
+        list: Output files.
+    """
+    patches = [read_patch(patch_path) for patch_path in patch_paths]
+    if file_path == "":
+        file_path = os.path.join(os.path.dirname(patch_paths[0]), patches[0].base_name)
+    if overwrite and len(patches) > 1:
+        error_message("Error, only one patch can be applied over the base, exiting.")
+        raise ModelError("Only one patch can overwrite the base.")
+    try:
+        base_model = ModelBuffer(file_path)
+    except OSError as e:
+        error_message(f"Error, couldn't read {file_path}: {e}")
+        raise ModelError(f"Couldn't read {file_path}.")
+    base_hash = hashlib.sha256(base_model.data).hexdigest()
+
+    if len(patches) > 1 and output_folder != "":
+        os.makedirs(output_folder, exist_ok=True)
+    output_paths = []
+    with memoryview(base_model.data) as base_view:
+        for patch_path, patch in zip(patch_paths, patches):
+            if len(base_view) != patch.base_size or base_hash != patch.base_hash:
+                error_message(f"Error, {os.path.basename(file_path)} isn't the {patch.base_name} {os.path.basename(patch_path)} was made from (size or hash differs).")
+                raise ModelError("Base doesn't match the patch.")
+            if overwrite:
+                patch_output = file_path
+            elif len(patches) == 1:
+                patch_output = output_path
+            else:
+                patch_output = patch_output_path(patch_path, output_folder)
+            output_data = b"".join(patch.chunks(base_view))
+            if len(output_data) != patch.output_size or hashlib.sha256(output_data).hexdigest() != patch.output_hash:
+                error_message(f"Error, applying {os.path.basename(patch_path)} doesn't give the output it was made for.")
+                raise ModelError("Patch doesn't give its output.")
+
+            # Written next to the output then renamed, an output (or the base) is never left half written
+            temp_path = patch_output + "temp"
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o666)
+            try:
+                write_all(fd, output_data)
+            finally:
+                os.close(fd)
+            os.replace(temp_path, patch_output)
+            remove_manifest(manifest_path(patch_output))
+            output_paths.append(patch_output)
+            summary(f"Applied {os.path.basename(patch_path)} to {os.path.basename(file_path)}, finished modifying {os.path.basename(patch_output)}.")
+    return output_paths
+
+# Applies plans from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command",choices=["apply"],help="apply writes the output of plans or patches made with the adder's -plan.")
+    parser.add_argument("-plan","--plan","-patch","--patch",required=True,nargs="+",type=str,help="Patch plans or .ssbp patches to apply, all made from the same base.")
+    parser.add_argument("-file","--file",default="",type=str,help="Base file the plans were made from (defaults to the file named in the first plan, next to it).")
+    parser.add_argument("-overwrite","--overwrite","-force","--force",action="store_true",help="Forces overwrite, making output go to -file (only with one plan).")
+    parser.add_argument("-o","--o","-output","--output",default="output.bin",type=str,help="Output file when there's one plan.")
+    parser.add_argument("-output_folder","--output_folder",default="",type=str,help="Folder the outputs go in when there's more than one plan, named after their plan (defaults to next to every plan).")
+    args = parser.parse_args(argv)
+    try:
+        if len(args.plan) == 1 and not args.plan[0].endswith(patch_extension):
+            # One JSON plan also has the bytes it replaces checked
+            apply_plan(args.plan[0], args.file, args.o, args.overwrite)
+        else:
+            apply_patches(args.plan, args.file, args.o, args.output_folder, args.overwrite)
+    except ModelError:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,123 @@
+# Times the stages of adding and converting models and counts the file and pointer work done, for -profile.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import cProfile
+import time
+
+counter_names = ("file opens", "bytes read", "bytes mapped", "bytes written", "bytes copied", "writes", "pointer chain entries", "opcodes decoded")
+no_stage = contextlib.nullcontext()
+profile = None      # Profile being recorded, None unless -profile is set
+
+class Profile:
+    """
+    Wall time of every stage (added up when a stage runs more than once, like once per costume or part) and
+    counters of the file and pointer work done. Stages don't overlap: a stage started inside another one is
+    counted as part of the outer stage, so the stages add up to at most the total.
+    """
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.stages = {}        # name: [seconds, runs], in the order they first ran
+        self.counters = dict.fromkeys(counter_names, 0)
+        self.running = None     # Stage being timed
+
+    # Times a stage
+    @contextlib.contextmanager
+    def stage(self, name):
+        if self.running is not None:
+            yield
+            return
+        self.running = name
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            stage = self.stages.setdefault(name, [0.0, 0])
+            stage[0] = stage[0] + time.perf_counter() - start
+            stage[1] = stage[1] + 1
+            self.running = None
+
+    # Prints every stage and counter
+    def report(self):
+        """
+        Prints the time of every stage (with how much of the total it was) and every counter.
+
+        Returns:
+            None
+        """
+        total = time.perf_counter() - self.start
+        print(f"\n~Profile, {total * 1000:.1f} ms total~")
+        print(f"{'Stage':<16} {'Runs':>5} {'ms':>10} {'%':>6}")
+        staged = 0.0
+        for name, (seconds, runs) in self.stages.items():
+            staged = staged + seconds
+            print(f"{name:<16} {runs:>5} {seconds * 1000:>10.2f} {seconds / total * 100 if total > 0 else 0:>6.1f}")
+        print(f"{'other':<16} {'':>5} {(total - staged) * 1000:>10.2f} {(total - staged) / total * 100 if total > 0 else 0:>6.1f}")
+        for name, value in self.counters.items():
+            print(f"{name + ':':<22} {value}")
+
+# Times a stage if profiling
+def stage(name):
+    """
+    Times a stage of the profile being recorded, ex: with stage("write"): ...
+
+    Args:
+        name (string): Name of the stage.
+
+    Returns:
+        context manager: Times the stage, does nothing if no profile is being recorded.
+    """
+    if profile is None:
+        return no_stage
+    return profile.stage(name)
+
+# Adds to a counter if profiling
+def count(name, amount=1):
+    if profile is not None:
+        profile.counters[name] = profile.counters.get(name, 0) + amount
+
+# Records a profile while running something
+@contextlib.contextmanager
+def profiling(enabled=False, stats_path=""):
+    """
+    Records a profile of everything run inside, printing it at the end. Worker processes (see
+    convert_parts()) aren't counted, only the time spent waiting on them.
+
+    Args:
+        enabled (boolean): Records the profile, nothing is done if False and there's no stats_path.
+        stats_path (string): Also runs cProfile and writes its stats here (read them with python -m pstats), "" to not.
+
+    Returns:
+        context manager: Gives the Profile being recorded, or None.
+    """
+    global profile
+    if not enabled and stats_path == "":
+        yield None
+        return
+    previous_profile = profile
+    profile = Profile()
+    profiler = cProfile.Profile() if stats_path != "" else None
+    try:
+        if profiler is not None:
+            profiler.enable()
+        yield profile
+    finally:
+        if profiler is not None:
+            profiler.disable()
+        recorded_profile = profile
+        profile = previous_profile
+        recorded_profile.report()
+        if profiler is not None:
+            profiler.dump_stats(stats_path)
+            print(f"~cProfile stats written to {stats_path}~")
+
+# Adds the profile arguments to a parser
+def add_profile_arguments(parser):
+    parser.add_argument("-profile","--profile",action="store_true",help="Prints how long every stage took along with file opens, bytes read and written, pointer chain entries visited and opcodes decoded.")
+    parser.add_argument("-profile_output","--profile_output",default="",type=str,help="Also writes cProfile stats to this file (sets -profile), read them with python -m pstats.")
+
+# Runs something with the profile arguments
+def profile_from_args(args):
+    return profiling(args.profile, args.profile_output)
@@ -0,0 +1,403 @@
+# Relocatable parts (.ssbrel), a part converted once and stored with a table of every pointer in it.
+# Linking a relocatable part at any offset only patches the pointers in its table.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import argparse
+import contextlib
+import io
+import os
+import struct
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_converter import convert_model
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_log import recording, summary, tracing
+from ssb_binary_model_opcodes import costume_regex, CHAIN, ORIGINAL, COSTUME, RDP_SYNC
+from ssb_binary_model_profile import count
+
+relocatable_magic = b"SSBR"
+relocatable_version = 1
+costume_flag = 1
+no_value = 0xFFFFFFFF
+header_struct = struct.Struct(">4sBBHIIiiiII")  # magic, version, flags, reserved, size, relocations, first pointer, last pointer, first E7, original character offset, original character file size
+relocation_struct = struct.Struct(">I")         # location << 4 | kind
+half_struct = struct.Struct(">H")
+placeholder_costume = "DE0000000E000000"        # Written where the palette costume goes, replaced when linking
+
+class RelocatableIndex:
+    """
+    What the adder needs to know about the RAM part a relocatable part was made from to connect it
+    (first pointer, last pointer and first E7 command), stands in for its DisplayListIndex.
+
+    Args:
+        first_pointer (int): First pointer in the part, -1 if there isn't one.
+        last_pointer_location (int): Last pointer in the part, -1 if there isn't one.
+        opcode_index (int): First E7 command in the part, -1 if there isn't one.
+    """
+    def __init__(self, first_pointer, last_pointer_location, opcode_index):
+        self.first_pointer = first_pointer
+        self.last_pointer_location = last_pointer_location
+        self.opcode_index = opcode_index
+
+    def last_pointer(self):
+        return self.last_pointer_location
+
+    def first_command(self, command):
+        if command == RDP_SYNC:
+            return self.opcode_index
+        return -1
+
+class RelocatablePart(ModelBuffer):
+    """
+    A part converted at offset 0 along with every pointer that has to move when it's put somewhere else.
+
+    Args:
+        file_path (string): File the part was loaded from or is saved to.
+        data (bytes): Part converted at offset 0.
+        relocations (list): (location, kind) of every pointer half (or palette command for COSTUME) in data, in order.
+        index (RelocatableIndex): First pointer, last pointer and first E7 command of the RAM part.
+        costume (boolean): Palette commands were replaced, a palette costume has to be given when linking.
+        original_character_offset (string): RAM offset of the original character file the part was converted for, "-1" if not used.
+        original_character_file_size (int): File size of the original character file, -1 if not used.
+    """
+    def __init__(self, file_path, data, relocations, index, costume=False, original_character_offset="-1", original_character_file_size=-1):
+        super().__init__(file_path, data)
+        self.relocations = relocations
+        self.part_index = index
+        self.costume = costume
+        self.original_character_offset = original_character_offset
+        self.original_character_file_size = original_character_file_size
+
+    # The RAM part's pointers, the converted data can't be indexed the same way
+    def get_index(self):
+        return self.part_index
+
+    # Puts the part at a location
+    def link(self, hex_location, output_path=None, palette_costume="", original_character_offset="-1", original_character_file_size=-1):
+        """
+        Gives the same model convert_model() gives for the RAM part at hex_location, by only moving the pointers in the relocation table.
+
+        Args:
+            hex_location (string): Where the part is being added in the base file.
+            output_path (string): File path the linked model is flushed to, defaults to the part's path.
+            palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+            original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+            original_character_file_size (int): File size of the original character file.
+
+        Returns:
+            ModelBuffer: Linked model.
+        """
+        name = os.path.basename(self.file_path)
+        location = int(hex_location, 16)
+        if location < 0 or location % 4 != 0:
+            error_message(f"Error, {name} can only be linked at a multiple of 4, not {hex_location}.")
+            raise ModelError(f"{name} can only be linked at a multiple of 4.")
+
+        # Has to be linked the same way it was made
+        if (palette_costume != "") != self.costume:
+            error_message(f"Error, {name} was made {'with' if self.costume else 'without'} -costume, make it again to link it {'without' if self.costume else 'with'} a palette costume.")
+            raise ModelError(f"{name} was made {'with' if self.costume else 'without'} a palette costume.")
+        if palette_costume != "" and not costume_regex.match(str(palette_costume).upper()):
+            error_message(f"Error, palette_costume doesn't match DE000000 0EXXXXXX, exiting.")
+            raise ModelError("palette_costume doesn't match DE000000 0EXXXXXX.")
+        if int(original_character_offset, 16) != int(self.original_character_offset, 16) or (original_character_offset != "-1" and int(original_character_file_size) != self.original_character_file_size):
+            error_message(f"Error, {name} was made for original_character_offset {self.original_character_offset} (file size {self.original_character_file_size}), not {original_character_offset} (file size {original_character_file_size}).")
+            raise ModelError(f"{name} was made for a different original character.")
+
+        # Patching every pointer
+        data = bytearray(self.data)
+        shift = location // 4
+        costume_bytes = bytes.fromhex(palette_costume) if palette_costume != "" else b""
+        out_of_range = []
+        for relocation_location, kind in self.relocations:
+            if kind == COSTUME:
+                data[relocation_location:relocation_location + 8] = costume_bytes
+            elif kind != ORIGINAL:
+                value = half_struct.unpack_from(data, relocation_location)[0] + shift
+                if value > 65535:
+                    out_of_range.append(relocation_location)
+                else:
+                    half_struct.pack_into(data, relocation_location, value)
+        if out_of_range:
+            error_message(f"Error, {len(out_of_range)} pointers in {name} would be greater than 0xFFFF at {hex_location} (first at {hex(out_of_range[0])}).")
+            raise ModelError(f"{len(out_of_range)} pointers in {name} would be greater than 0xFFFF.")
+
+        if output_path is None:
+            output_path = self.file_path
+        linked_model = ModelBuffer(output_path, data)
+        linked_model.relocations = self.relocations
+        linked_model.costume_sites = [relocation_location for relocation_location, kind in self.relocations if kind == COSTUME]
+        return linked_model
+
+    # How many pointers converting the RAM part overwrites, every pointer in the chain
+    def pointer_count(self):
+        return sum(1 for _, kind in self.relocations if kind == CHAIN) + 1
+
+    # Writes the part to a .ssbrel file
+    def save(self, file_path=None):
+        """
+        Writes the part to disk.
+
+        Args:
+            file_path (string): File to write to, defaults to the part's path.
+
+        Returns:
+            None
+        """
+        if file_path is None:
+            file_path = self.file_path
+        with open(file_path, "wb") as f:
+            f.write(self.pack())
+
+    # Gives the part the way it's written to a .ssbrel file
+    def pack(self):
+        original_character_offset = no_value if self.original_character_offset == "-1" else int(self.original_character_offset, 16)
+        original_character_file_size = no_value if self.original_character_file_size == -1 else self.original_character_file_size
+        header = header_struct.pack(relocatable_magic, relocatable_version, costume_flag if self.costume else 0, 0, len(self.data), len(self.relocations),
+                                    self.part_index.first_pointer, self.part_index.last_pointer_location, self.part_index.opcode_index,
+                                    original_character_offset, original_character_file_size)
+        relocations = b"".join(relocation_struct.pack((location << 4) | kind) for location, kind in self.relocations)
+        return header + self.data + relocations
+
+# Reads a .ssbrel file
+def load_relocatable(file_path):
+    """
+    Loads a relocatable part.
+
+    Args:
+        file_path (string): .ssbrel file.
+
+    Returns:
+        RelocatablePart: Loaded part.
+    """
+    with open(file_path, "rb") as f:
+        contents = f.read()
+    count("file opens")
+    count("bytes read", len(contents))
+    return read_relocatable(contents, file_path)
+
+# Reads a relocatable part from what's in a .ssbrel file
+def read_relocatable(contents, file_path):
+    """
+    Reads a relocatable part from the contents of a .ssbrel file.
+
+    Args:
+        contents (bytes): Contents of the file.
+        file_path (string): File the part is named after.
+
+    Returns:
+        RelocatablePart: Part.
+    """
+    name = os.path.basename(file_path)
+    if len(contents) < header_struct.size:
+        error_message(f"Error, {name} is too small to be a relocatable part.")
+        raise ModelError(f"{name} is too small to be a relocatable part.")
+    magic, version, flags, _, size, num_relocations, first_pointer, last_pointer, opcode_index, original_character_offset, original_character_file_size = header_struct.unpack_from(contents, 0)
+    if magic != relocatable_magic or version != relocatable_version:
+        error_message(f"Error, {name} isn't a version {relocatable_version} relocatable part.")
+        raise ModelError(f"{name} isn't a version {relocatable_version} relocatable part.")
+    if len(contents) != header_struct.size + size + num_relocations * relocation_struct.size:
+        error_message(f"Error, {name} is {len(contents)} bytes but its header says {header_struct.size + size + num_relocations * relocation_struct.size}.")
+        raise ModelError(f"{name} doesn't match its header.")
+    data = contents[header_struct.size:header_struct.size + size]
+    relocations = [(value >> 4, value & 0xF) for (value,) in relocation_struct.iter_unpack(contents[header_struct.size + size:])]
+    return RelocatablePart(file_path, data, relocations, RelocatableIndex(first_pointer, last_pointer, opcode_index), (flags & costume_flag) != 0,
+                           "-1" if original_character_offset == no_value else hex(original_character_offset),
+                           -1 if original_character_file_size == no_value else original_character_file_size)
+
+# Loads a part for the adder, relocatable or not
+def load_part(file_path):
+    """
+    Loads a part to add, as a RelocatablePart if it's a .ssbrel file.
+
+    Args:
+        file_path (string): Part to load.
+
+    Returns:
+        ModelBuffer: Loaded part.
+    """
+    if file_path.lower().endswith(".ssbrel"):
+        return load_relocatable(file_path)
+    return ModelBuffer(file_path)
+
+# Converts a RAM part into a relocatable part
+def make_relocatable(model, output_path=None, costume=False, original_character_offset="-1", original_character_file_size=-1):
+    """
+    Converts a RAM part at offset 0, keeping the (location, kind) of every pointer half and palette command the
+    converter wrote that moves along with where the part goes, so it can be linked anywhere by patching only those.
+
+    Args:
+        model (ModelBuffer): RAM part (left unchanged).
+        output_path (string): File path of the relocatable part, defaults to the model's path with .ssbrel.
+        costume (boolean): Replaces palette commands so any palette costume can be given when linking.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+
+    Returns:
+        RelocatablePart: Relocatable part.
+    """
+    name = os.path.basename(model.file_path)
+    if output_path is None:
+        output_path = os.path.splitext(model.file_path)[0] + ".ssbrel"
+    original_character_file_size = int(original_character_file_size)
+    palette_costume = placeholder_costume if costume else ""
+
+    # Converting at offset 0, the converter prints every pointer so that's only shown if something goes wrong
+    conversion_output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(conversion_output):
+            converted_model = convert_model(model,"0x0",palette_costume=palette_costume,original_character_offset=original_character_offset,original_character_file_size=original_character_file_size)
+    except ModelError:
+        print(conversion_output.getvalue())
+        raise
+    except Exception as e:
+        print(conversion_output.getvalue())
+        error_message(f"Error, couldn't convert {name}: {e}")
+        raise ModelError(f"Couldn't convert {name}.")
+    data = bytes(converted_model.data)
+    if len(data) != len(model) or converted_model.relocations is None:
+        error_message(f"Error, {name} has pointers that aren't two 16 bit halves when converted, it can't be made relocatable.")
+        raise ModelError(f"{name} can't be made relocatable.")
+    relocations = sorted(converted_model.relocations)
+
+    # Patches can't overlap, otherwise the order they're written in would matter
+    for (location, kind), (next_location, _) in zip(relocations, relocations[1:]):
+        if location + (8 if kind == COSTUME else 2) > next_location:
+            error_message(f"Error, pointers at {hex(location)} and {hex(next_location)} in {name} overlap, it can't be made relocatable.")
+            raise ModelError(f"{name} can't be made relocatable.")
+
+    index = model.get_index()
+    return RelocatablePart(output_path, data, relocations, RelocatableIndex(index.first_pointer, index.last_pointer(), index.first_command(RDP_SYNC)),
+                           costume, original_character_offset, original_character_file_size if original_character_offset != "-1" else -1)
+
+# Gets the relocatable part of a RAM part from the cache, making it if it isn't there
+def cached_relocatable(model, cache, costume=False, original_character_offset="-1", original_character_file_size=-1):
+    """
+    Gets the relocatable part of a RAM part from cache, keyed by the part's data, its first pointer and the
+    arguments it's converted with, so it's only converted once wherever it goes and whatever it's added to.
+    Parts that can't be made relocatable are remembered too, so they're not tried again.
+
+    Args:
+        model (ModelBuffer): RAM part.
+        cache (ModelCache): Cache.
+        costume (boolean): Makes the part for palette costumes.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+
+    Returns:
+        RelocatablePart: Relocatable part; returns None if the part can't be made relocatable.
+    """
+    original_character_file_size = int(original_character_file_size)
+    arguments = {"costume": costume, "original_character_offset": int(original_character_offset, 16), "original_character_file_size": original_character_file_size if original_character_offset != "-1" else -1}
+    key = cache.key(model.data, model.get_index().first_pointer, arguments)
+    contents = cache.get(key)
+    if contents is not None:
+        part = None
+        if contents != b"":
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    part = read_relocatable(contents, model.file_path)
+            except ModelError:
+                contents = None
+        if contents is not None:
+            stats = cache.count(hits=1)
+            if cache.debug:
+                print(f"Cache hit for {os.path.basename(model.file_path)} ({stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions).")
+            return part
+
+    # Miss, making the part (anything printed is the conversion trying it, the caller converts it again if it can't be made)
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            part = make_relocatable(model, model.file_path, costume, original_character_offset, original_character_file_size)
+        contents = part.pack()
+    except ModelError:
+        part = None
+        contents = b""
+    try:
+        evicted = cache.put(key, contents)
+    except OSError as e:
+        error_message(f"Couldn't cache {os.path.basename(model.file_path)}: {e}")
+        evicted = 0
+    stats = cache.count(misses=1, evictions=evicted)
+    if cache.debug:
+        print(f"Cache miss for {os.path.basename(model.file_path)} ({stats['hits']} hits, {stats['misses']} misses, {stats['evictions']} evictions).")
+    return part
+
+# Converts a RAM part, linking its cached relocatable part instead when there's a cache
+def convert_cached(model, hex_location, output_path=None, palette_costume="", original_character_offset="-1", original_character_file_size=-1, debug=False, cache=None):
+    """
+    Gives the model convert_model() gives and prints the same summary, but links the part's relocatable
+    part from cache (see cached_relocatable()) instead of converting it. Parts are converted as usual
+    without a cache, when debugging or tracing (those print every pointer), when changes are recorded to
+    a log file, at locations that aren't a multiple of 4 and when linking fails.
+
+    Args:
+        model (ModelBuffer): RAM part (left unchanged).
+        hex_location (string): Where the part is being added in the base file.
+        output_path (string): File path the converted model is flushed to, defaults to the part's path.
+        palette_costume (string): DE command that replaces FD1 (palette) commands, "" to leave them alone.
+        original_character_offset (string): RAM offset the original character file started at, "-1" if not used.
+        original_character_file_size (int): File size of the original character file.
+        debug (boolean): Prints debugging messages.
+        cache (ModelCache): Cache of relocatable parts, None to always convert.
+
+    Returns:
+        ModelBuffer: Converted model.
+    """
+    if cache is not None and not debug and not tracing() and not recording() and int(hex_location, 16) % 4 == 0:
+        part = cached_relocatable(model, cache, palette_costume != "", original_character_offset, original_character_file_size)
+        if part is not None:
+            if output_path is None:
+                output_path = model.file_path
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    converted_model = part.link(hex_location, output_path, palette_costume, original_character_offset, original_character_file_size)
+            except ModelError:
+                converted_model = None
+            if converted_model is not None:
+                if not any(kind == COSTUME for _, kind in part.relocations):
+                    converted_model.command_index = model.get_index()
+                summary(f"Updating pointers in {os.path.basename(model.file_path)} into output {os.path.basename(output_path)}:")
+                summary(f"Done writing to {os.path.basename(output_path)}, total pointers overwritten = {part.pointer_count()}")
+                return converted_model
+    return convert_model(model,hex_location,output_path,palette_costume=palette_costume,original_character_offset=original_character_offset,original_character_file_size=original_character_file_size,debug=debug)
+
+# Parses the relocatable part maker's command line arguments
+def parse_args(argv=None):
+    """
+    Parses the relocatable part maker's command line arguments.
+
+    Args:
+        argv (list): Arguments to parse, defaults to sys.argv.
+
+    Returns:
+        Namespace: Parsed arguments.
+    """
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-file","--file",required=True,type=str,help="RAM part to make relocatable.")
+    parser.add_argument("-costume","--costume",action="store_true",help="Makes the part for palette costumes (any -costume can be given when adding it).")
+    parser.add_argument("-original_character_offset","--original_character_offset",default="-1",type=str,help="Hexadecimal location of where the original character file started when adding the parts to the RAM (as a string, ex: '0x802EDE10').")
+    parser.add_argument("-original_character_file_size","--original_character_file_size",default=-1,type=int,help="File size of original character file (has to match the file the part gets added to).")
+    parser.add_argument("-o","--o","-output","--output",default="",type=str,help="Output file, defaults to -file with .ssbrel.")
+    return parser.parse_args(argv)
+
+# Makes a relocatable part from the command line
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        if args.original_character_offset != "-1" and args.original_character_file_size == -1:
+            error_message("Error, -original_character_file_size has to be given with -original_character_offset.")
+            raise ModelError("-original_character_file_size has to be given with -original_character_offset.")
+        part = make_relocatable(ModelBuffer(args.file), args.o or None, args.costume, args.original_character_offset, args.original_character_file_size)
+        part.save()
+    except ModelError:
+        return 1
+    except OSError as e:
+        error_message(e)
+        return 1
+    summary(f"Made {os.path.basename(part.file_path)} with {len(part.relocations)} relocations.")
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
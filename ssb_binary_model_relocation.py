@@ -0,0 +1,226 @@
+# Moves the pointers of a model for any number of insertions and removals in one walk of the pointer chain.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import bisect
+import struct
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_profile import count
+
+# NumPy is optional, chains are moved with plain python when it isn't installed
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+pointer_struct = struct.Struct(">HH")   # next pointer location / 4, data location / 4
+end_pointer = 65535                     # FFFF, last pointer in the chain
+numpy_minimum_chain = 256               # Shorter chains are quicker to move in plain python
+
+class RelocationTable:
+    """
+    Table of edits made to a model, used to work out where a pointer ends up after all of them.
+    Every pointer at or past an edit is moved by that edit's delta, so a pointer is moved by the
+    sum of the deltas of every edit before it (found with a bisect over the summed deltas).
+
+    Args:
+        edits (list): (offset, delta) of every edit. offset is the byte location of the edit in the
+            model before anything is changed, delta is how many bytes are added there (negative for
+            removals, like -subtract).
+    """
+    def __init__(self, edits):
+        self.edits = sorted(edits)
+        self.sections = []      # first pointer (location / 4) every edit applies to
+        self.deltas = [0]       # deltas (in pointer units) summed up to every edit
+        for offset, delta in self.edits:
+            self.sections.append(-(-offset // 4)) # pointers are location / 4, rounding up keeps "pointer >= offset / 4"
+            self.deltas.append(self.deltas[-1] + int(delta / 4))
+
+    # Returns where a pointer ends up after every edit
+    def relocate(self, pointer):
+        """
+        Gets the new value of a pointer.
+
+        Args:
+            pointer (int): Pointer (location / 4).
+
+        Returns:
+            int: Pointer after every edit.
+        """
+        return pointer + self.deltas[bisect.bisect_right(self.sections, pointer)]
+
+# Changes worked out by NumPy, kept as arrays until something loops over them
+class PointerChanges:
+    """
+    Pointers that change in a chain, worked out by relocate_chain_numpy(). Acts like the list
+    relocate_chain() returns, but apply_relocation() can write it without going through every pointer.
+
+    Args:
+        locations (numpy.ndarray): Location of every pointer that changes.
+        halves (numpy.ndarray): [upper_offset, lower_offset] of every pointer that changes.
+        new_halves (numpy.ndarray): [new_upper_offset, new_lower_offset] of every pointer that changes.
+    """
+    def __init__(self, locations, halves, new_halves):
+        self.locations = locations
+        self.halves = halves
+        self.new_halves = new_halves
+
+    def __len__(self):
+        return len(self.locations)
+
+    def __iter__(self):
+        return zip(self.locations.tolist(), self.halves[:, 0].tolist(), self.halves[:, 1].tolist(), self.new_halves[:, 0].tolist(), self.new_halves[:, 1].tolist())
+
+# Follows a pointer chain to its end
+def find_chain(data, location, force_offset=0):
+    """
+    Follows a pointer chain from location until a pointer with 0xFFFF as the next pointer.
+
+    Args:
+        data (bytearray): Binary model data.
+        location (int): First pointer in the chain.
+        force_offset (int): Added to every next pointer location (used for ROM models that aren't at their final location).
+
+    Returns:
+        list: Location of every pointer in the chain.
+    """
+    chain = []
+    for _ in range(len(data) // 4 + 1):
+        if location < 0 or location + 4 > len(data):
+            error_message(f"Error, couldn't find pointer at {hex(location)}.")
+            raise ModelError(f"Couldn't find pointer at {hex(location)}.")
+        upper_offset, lower_offset = pointer_struct.unpack_from(data, location)
+
+        # Making sure there's another pointer
+        if upper_offset == 0:
+            error_message(f"Error, pointer at {hex(location)} ({upper_offset:04x}{lower_offset:04x}) not pointing to anything. First 4 bytes are 0000")
+            raise ModelError(f"Pointer at {hex(location)} not pointing to anything.")
+        chain.append(location)
+        if upper_offset == end_pointer:
+            count("pointer chain entries", len(chain))
+            return chain
+        location = (upper_offset * 4) + force_offset
+    error_message(f"Error, pointer chain loops back on itself at {hex(location)}.")
+    raise ModelError(f"Pointer chain loops back on itself at {hex(location)}.")
+
+# Works out every pointer that changes in a chain
+def plan_relocation(data, location, table, force_offset=0, use_numpy=None):
+    """
+    Works out the new value of both halves of every pointer in a chain. Every pointer is checked
+    before anything is written, so a chain that can't be moved is left alone.
+
+    Args:
+        data (bytearray): Binary model data.
+        location (int): First pointer in the chain.
+        table (RelocationTable): Edits being made to the model.
+        force_offset (int): Added to every next pointer location (used for ROM models that aren't at their final location).
+        use_numpy (bool): Moves the whole chain at once with NumPy, defaults to using it when installed and the chain is long.
+
+    Returns:
+        list: (location, upper_offset, lower_offset, new_upper_offset, new_lower_offset) of every pointer that changes
+            (a PointerChanges when NumPy is used).
+    """
+    chain = find_chain(data, location, force_offset)
+    if use_numpy is None:
+        use_numpy = numpy is not None and len(chain) >= numpy_minimum_chain
+    if use_numpy:
+        changes, out_of_range = relocate_chain_numpy(data, chain, table)
+    else:
+        changes, out_of_range = relocate_chain(data, chain, table)
+
+    # Making sure new pointers aren't bigger than possible (0xFFFF)
+    if out_of_range:
+        for location, new_upper_offset, new_lower_offset in out_of_range:
+            error_message(f"Error at {hex(location)} with lower_offset: {new_lower_offset} or upper_offset:{new_upper_offset} being greater than 0xFFFF (or less than 0).")
+        raise ModelError(f"{len(out_of_range)} pointers would be greater than 0xFFFF (or less than 0).")
+    return changes
+
+# Moves every pointer in a chain one at a time
+def relocate_chain(data, chain, table):
+    """
+    Works out the new value of every pointer in a chain with plain python.
+
+    Args:
+        data (bytearray): Binary model data.
+        chain (list): Pointer locations from find_chain().
+        table (RelocationTable): Edits being made to the model.
+
+    Returns:
+        tuple: (changes, out_of_range), pointers that change and (location, new_upper_offset, new_lower_offset) of pointers that can't be moved.
+    """
+    changes = []
+    out_of_range = []
+    for location in chain:
+        upper_offset, lower_offset = pointer_struct.unpack_from(data, location)
+        # If upper bytes are 0xFFFF that indicates end of file so don't move it
+        new_upper_offset = upper_offset if upper_offset == end_pointer else table.relocate(upper_offset)
+        new_lower_offset = table.relocate(lower_offset)
+        if not (0 <= new_upper_offset <= 65535 and 0 <= new_lower_offset <= 65535):
+            out_of_range.append((location, new_upper_offset, new_lower_offset))
+        elif new_upper_offset != upper_offset or new_lower_offset != lower_offset:
+            changes.append((location, upper_offset, lower_offset, new_upper_offset, new_lower_offset))
+    return changes, out_of_range
+
+# Moves every pointer in a chain at once
+def relocate_chain_numpy(data, chain, table):
+    """
+    Works out the new value of every pointer in a chain with NumPy. Both halves of every pointer are
+    read from data as big endian uint16, every half is moved by the summed delta of the edits before it
+    and the whole chain is checked for overflow at once.
+
+    Args:
+        data (bytearray): Binary model data.
+        chain (list): Pointer locations from find_chain().
+        table (RelocationTable): Edits being made to the model.
+
+    Returns:
+        tuple: (changes, out_of_range), same as relocate_chain() but changes is a PointerChanges.
+    """
+    locations = numpy.array(chain, dtype=numpy.int64)
+    pointer_bytes = numpy.frombuffer(data, dtype=numpy.uint8)[locations[:, None] + numpy.arange(4)]
+    halves = pointer_bytes.view(">u2").astype(numpy.int64)    # [upper_offset, lower_offset] of every pointer
+    sections = numpy.array(table.sections, dtype=numpy.int64)
+    deltas = numpy.array(table.deltas, dtype=numpy.int64)
+    new_halves = halves + deltas[numpy.searchsorted(sections, halves, side="right")]
+
+    # If upper bytes are 0xFFFF that indicates end of file so don't move it
+    new_halves[halves[:, 0] == end_pointer, 0] = end_pointer
+
+    bad = ((new_halves < 0) | (new_halves > 65535)).any(axis=1)
+    out_of_range = []
+    if bad.any():
+        out_of_range = list(zip(locations[bad].tolist(), new_halves[bad, 0].tolist(), new_halves[bad, 1].tolist()))
+    changed = (new_halves != halves).any(axis=1) & ~bad
+    return PointerChanges(locations[changed], halves[changed], new_halves[changed]), out_of_range
+
+# Writes the pointers that changed
+def apply_relocation(model, changes):
+    """
+    Writes pointers worked out by plan_relocation() to a model.
+
+    Args:
+        model (ModelBuffer): Model to write to.
+        changes (list): Changes from plan_relocation(), written all at once if they're a PointerChanges.
+
+    Returns:
+        None
+    """
+    data = model.data
+    if isinstance(changes, PointerChanges):
+        view = numpy.frombuffer(data, dtype=numpy.uint8)
+        view[changes.locations[:, None] + numpy.arange(4)] = changes.new_halves.astype(">u2").view(numpy.uint8)
+        del view # The buffer can't be resized while NumPy is still looking at it
+        if changes:
+            # Marking runs of pointers close enough to be merged anyway, so pointers far apart stay separate writes
+            locations = numpy.sort(changes.locations)
+            breaks = numpy.flatnonzero(locations[1:] - locations[:-1] - 4 > model.dirty.merge_gap) + 1
+            for start, end in zip(locations[numpy.r_[0, breaks]].tolist(), (locations[numpy.r_[breaks - 1, len(locations) - 1]] + 4).tolist()):
+                model.mark_dirty(start, end)
+    else:
+        for location, _, _, new_upper_offset, new_lower_offset in changes:
+            pointer_struct.pack_into(data, location, new_upper_offset, new_lower_offset)
+            model.mark_dirty(location, location + 4)
+    if changes:
+        model.index = None
+        model.command_index = None
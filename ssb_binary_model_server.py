@@ -0,0 +1,260 @@
+# Keeps models in memory between runs, taking adder and converter jobs over a Unix socket.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import argparse
+import collections
+import contextlib
+import io
+import json
+import os
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_errors import ModelError, error_message
+from ssb_binary_model_relocatable import RelocatablePart, load_part
+
+default_max_models = 256
+
+# Where the server listens when no socket is given
+def default_socket_path():
+    """
+    Gets the socket path the server and client use by default.
+
+    Returns:
+        string: $SSB_MODEL_SOCKET, or ssb_binary_model_<uid>.sock in the temp folder.
+    """
+    return os.environ.get("SSB_MODEL_SOCKET") or os.path.join(tempfile.gettempdir(), f"ssb_binary_model_{os.getuid()}.sock")
+
+class ModelStore:
+    """
+    Models (and their display list indexes) loaded by earlier jobs, by file path. A model is loaded again
+    when its file's modification time or size changes, and the least recently used models are dropped
+    once there are more than max_models.
+
+    Args:
+        max_models (int): Most models kept in memory.
+    """
+    def __init__(self, max_models=default_max_models):
+        self.max_models = max_models
+        self.models = collections.OrderedDict()    # path: ((mtime in ns, size), model)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    # Loads a file, reusing the model from last time if the file didn't change
+    def load(self, file_path):
+        """
+        Loads a model like load_part() does, from memory if the file hasn't changed since it was last loaded.
+        Every call gets its own copy of the data (sharing the index), so jobs can't change the kept model.
+
+        Args:
+            file_path (string): File to load.
+
+        Returns:
+            ModelBuffer: Loaded model.
+        """
+        file_path = os.path.abspath(file_path)
+        stat = os.stat(file_path)
+        file_state = (stat.st_mtime_ns, stat.st_size)
+        entry = self.models.get(file_path)
+        if entry is not None and entry[0] == file_state:
+            self.hits = self.hits + 1
+            self.models.move_to_end(file_path)
+            model = entry[1]
+        else:
+            if entry is not None:
+                self.evictions = self.evictions + 1
+            self.misses = self.misses + 1
+            model = load_part(file_path)
+            if not isinstance(model, RelocatablePart):
+                model.get_index()
+            self.models[file_path] = (file_state, model)
+            self.models.move_to_end(file_path)
+            while len(self.models) > self.max_models:
+                self.models.popitem(last=False)
+                self.evictions = self.evictions + 1
+
+        # Relocatable parts are never written to
+        if isinstance(model, RelocatablePart):
+            return model
+        model_copy = ModelBuffer(file_path, model.data)
+        model_copy.index = model.index
+        model_copy.clean_source = model.clean_source
+        return model_copy
+
+# Runs a job like the command line would
+def run_job(request, models, cache_models=True):
+    """
+    Runs the adder, folder adder or converter with command line arguments in the request's working folder.
+
+    Args:
+        request (dict): "command" ("adder", "folder" or "convert"), "argv" (list) and "cwd" (string).
+        models (ModelStore): Models kept in memory.
+        cache_models (boolean): Loads files through models, False to read them from disk.
+
+    Returns:
+        dict: "exit" (exit code) and "output" (everything printed).
+    """
+    # Local imports since the adder and converter import a lot
+    from ssb_binary_model_adder import main as adder_main
+    from ssb_binary_model_adder_folder import main as folder_main
+    from ssb_binary_model_converter import main as converter_main
+    commands = {"adder": adder_main, "folder": folder_main, "convert": converter_main}
+    output = io.StringIO()
+    previous_directory = os.getcwd()
+    with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+        try:
+            command = commands.get(request.get("command"))
+            if command is None:
+                error_message(f"Error, unknown command {request.get('command')}, has to be one of {', '.join(commands)}.")
+                raise ModelError("Unknown command.")
+            argv = [str(arg) for arg in request.get("argv", [])]
+            if "-watch" in argv or "--watch" in argv:
+                error_message("Error, -watch can't be run by the server.")
+                raise ModelError("-watch can't be run by the server.")
+            os.chdir(request.get("cwd") or previous_directory)
+            exit_code = command(argv, models if cache_models else None)
+        except ModelError:
+            exit_code = 1
+        except SystemExit as e:
+            # argparse exits on bad arguments
+            exit_code = e.code if isinstance(e.code, int) else 2
+        except Exception as e:
+            error_message(e)
+            exit_code = 1
+        finally:
+            os.chdir(previous_directory)
+    return {"exit": exit_code, "output": output.getvalue()}
+
+# Checks a request has the fields a job needs
+def request_problem(request):
+    """
+    Checks a request is a JSON object with "argv" a list and "cwd" a string, if they're there.
+
+    Args:
+        request: Request read from the socket.
+
+    Returns:
+        string: What's wrong with the request, None if nothing is.
+    """
+    if not isinstance(request, dict):
+        return "Couldn't read request, it has to be a JSON object."
+    if not isinstance(request.get("argv", []), list):
+        return "Couldn't read request, argv has to be a list."
+    if not isinstance(request.get("cwd", ""), (str, type(None))):
+        return "Couldn't read request, cwd has to be a string."
+    return None
+
+class JobHandler(socketserver.StreamRequestHandler):
+    """
+    Reads one JSON request line, runs it and writes one JSON reply line.
+    """
+    def handle(self):
+        line = self.rfile.readline()
+        try:
+            request = json.loads(line)
+        except ValueError:
+            self.wfile.write(json.dumps({"exit": 2, "output": "Couldn't read request.\n"}).encode() + b"\n")
+            return
+        server = self.server
+        problem = request_problem(request)
+        if problem is not None:
+            reply = {"exit": 2, "output": f"{problem}\n"}
+        elif request.get("command") == "stop":
+            reply = {"exit": 0, "output": "Stopping server.\n"}
+            server.stopping = True
+        elif request.get("command") == "stats":
+            models = server.models
+            reply = {"exit": 0, "output": f"{len(models.models)} models in memory, {models.hits} reused, {models.misses} loaded, {models.evictions} dropped, {server.jobs} jobs\n"}
+        else:
+            start = time.perf_counter()
+            reply = run_job(request, server.models)
+            server.jobs = server.jobs + 1
+            if server.verbose:
+                print(f"{request.get('command')} {' '.join(map(str, request.get('argv', [])))}: exit {reply['exit']} in {(time.perf_counter() - start) * 1000:.1f} ms")
+        self.wfile.write(json.dumps(reply).encode() + b"\n")
+
+class ModelServer(socketserver.UnixStreamServer):
+    """
+    Unix socket server running one job at a time (jobs change the working folder and stdout, so they can't overlap).
+
+    Args:
+        socket_path (string): Socket to listen on.
+        models (ModelStore): Models kept in memory.
+        verbose (boolean): Prints every job and how long it took.
+    """
+    def __init__(self, socket_path, models, verbose=False):
+        self.models = models
+        self.verbose = verbose
+        self.jobs = 0
+        self.stopping = False
+        super().__init__(socket_path, JobHandler)
+        os.chmod(socket_path, 0o600)
+
+    def service_actions(self):
+        if self.stopping:
+            # shutdown() waits on serve_forever(), so it's done from another thread
+            threading.Thread(target=self.shutdown, daemon=True).start()
+            self.stopping = False
+
+# Starts the server
+def serve(socket_path=None, max_models=default_max_models, verbose=False):
+    """
+    Takes jobs on socket_path until it's sent "stop" (or interrupted).
+
+    Args:
+        socket_path (string): Socket to listen on, defaults to default_socket_path().
+        max_models (int): Most models kept in memory.
+        verbose (boolean): Prints every job and how long it took.
+
+    Returns:
+        None
+    """
+    if socket_path is None:
+        socket_path = default_socket_path()
+
+    # Removing a socket left behind by a server that isn't running anymore
+    if os.path.exists(socket_path):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as test_socket:
+            try:
+                test_socket.connect(socket_path)
+                error_message(f"Error, a server is already running on {socket_path}.")
+                raise ModelError(f"A server is already running on {socket_path}.")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.remove(socket_path)
+
+    # Local import since the folder adder imports a lot, its worker processes are kept for every job and shut down with the server
+    from ssb_binary_model_adder_folder import worker_pools_kept
+    server = ModelServer(socket_path, ModelStore(max_models), verbose)
+    print(f"~Serving on {socket_path}~")
+    try:
+        with worker_pools_kept():
+            server.serve_forever(poll_interval=0.2)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if os.path.exists(socket_path):
+            os.remove(socket_path)
+    print(f"~Stopped after {server.jobs} jobs~")
+
+# Runs the server from the command line
+def main(argv=None):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("-socket","--socket",default="",type=str,help="Socket to listen on (defaults to $SSB_MODEL_SOCKET or ssb_binary_model_<uid>.sock in the temp folder).")
+    parser.add_argument("-max_models","--max_models",default=default_max_models,type=int,help="Most models kept in memory.")
+    parser.add_argument("-verbose","--verbose",action="store_true",help="Prints every job and how long it took.")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.socket or None, args.max_models, args.verbose)
+    except ModelError:
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    exit(main())
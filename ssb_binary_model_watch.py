@@ -0,0 +1,121 @@
+# Watches a folder of parts and the file they're added to, adding the folder again whenever something changes.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import os
+import time
+from ssb_binary_model_errors import ModelError, error_message
+
+default_interval = 0.25     # Seconds between checking for changes
+default_debounce = 0.5      # Seconds nothing can change for before adding the folder again
+
+# Size and modification time of every file being watched
+def snapshot(file_path, folder_path, ignored_paths=()):
+    """
+    Gets the size and modification time of file_path and of every file in folder_path.
+
+    Args:
+        file_path (string): File the folder is added to.
+        folder_path (string): Folder of files to add.
+        ignored_paths (tuple): Files that aren't watched (the output and its manifest if they're in the folder).
+
+    Returns:
+        dict: (mtime in ns, size) of every file by path, None for files that can't be read.
+    """
+    files = {}
+    try:
+        stat = os.stat(file_path)
+        files[file_path] = (stat.st_mtime_ns, stat.st_size)
+    except OSError:
+        files[file_path] = None
+    try:
+        entries = list(os.scandir(folder_path))
+    except OSError:
+        entries = []
+    for entry in entries:
+        if entry.path in ignored_paths:
+            continue
+        try:
+            stat = entry.stat()
+            files[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            files[entry.path] = None
+    return files
+
+# Files that changed between two snapshots
+def changed_files(before, after):
+    return sorted(os.path.basename(path) for path in set(before) | set(after) if before.get(path, False) != after.get(path, False))
+
+# Adds a folder again every time something in it changes
+def watch_folder(file_path,folder_to_add_path,output_path="output.bin",interval=default_interval,debounce=default_debounce,max_builds=None,build=None,**kwargs):
+    """
+    Adds folder_to_add_path to file_path, then checks every interval seconds for files that were added,
+    removed or changed in the folder (or file_path changing). Once nothing has changed for debounce seconds
+    the folder is added again in the same process, which only relinks from the first file that changed
+    (see relink_folder). Runs until interrupted.
+
+    Args:
+        file_path (string): File we're expanding (pointers here need to be connected).
+        folder_to_add_path (string): Folder of files to add.
+        output_path (string): Output file.
+        interval (float): Seconds between checking for changes.
+        debounce (float): Seconds nothing can change for before adding the folder again.
+        max_builds (int): Stops after this many builds, None to run until interrupted.
+        build (function): Adds the folder, defaults to append_folder.
+        **kwargs: Passed on to build.
+
+    Returns:
+        int: How many builds were done.
+    """
+    # Local import since the folder adder imports this module for -watch
+    from ssb_binary_model_adder_folder import worker_pools_kept
+    if build is None:
+        from ssb_binary_model_adder_folder import append_folder as build
+    if kwargs.get("overwrite"):
+        error_message("Error, -watch can't be used with -overwrite (every build would change -file and start another one).")
+        raise ModelError("-watch can't be used with -overwrite.")
+    output_path_full = os.path.abspath(output_path)
+    ignored_paths = (output_path_full, output_path_full + ".manifest", output_path_full + "temp")
+    folder_path_full = os.path.abspath(folder_to_add_path)
+    file_path_full = os.path.abspath(file_path)
+
+    builds = 0
+    changed = []
+    files = snapshot(file_path_full, folder_path_full, ignored_paths)
+    # Worker processes are kept between builds, they're shut down once watching stops
+    with worker_pools_kept():
+        try:
+            while True:
+                # Adding the folder
+                start = time.perf_counter()
+                try:
+                    build(file_path,folder_to_add_path,output_path,**kwargs)
+                    result = "Added"
+                except ModelError:
+                    result = "Couldn't add"
+                elapsed = (time.perf_counter() - start) * 1000
+                builds = builds + 1
+                print(f"~{result} {os.path.basename(folder_path_full)} to {os.path.basename(output_path)} in {elapsed:.1f} ms{' (' + ', '.join(changed) + ' changed)' if changed else ''}~")
+                if max_builds is not None and builds >= max_builds:
+                    return builds
+                print(f"~Watching {os.path.basename(folder_path_full)} and {os.path.basename(file_path_full)} for changes (Ctrl+C to stop)~")
+
+                # Waiting for something to change, then for it to stop changing
+                while True:
+                    time.sleep(interval)
+                    new_files = snapshot(file_path_full, folder_path_full, ignored_paths)
+                    if new_files != files:
+                        break
+                last_change = time.perf_counter()
+                while time.perf_counter() - last_change < debounce:
+                    time.sleep(interval)
+                    newer_files = snapshot(file_path_full, folder_path_full, ignored_paths)
+                    if newer_files != new_files:
+                        new_files = newer_files
+                        last_change = time.perf_counter()
+                changed = changed_files(files, new_files)
+                files = new_files
+        except KeyboardInterrupt:
+            print(f"~Stopped watching after {builds} builds~")
+            return builds
@@ -0,0 +1,9 @@
+# Lets the tests import the ssb_binary_model modules from the folder above.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,56 @@
+# Tests batch manifests run jobs after the jobs they depend on and skip the ones depending on a failed job.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import json
+import os
+from ssb_binary_model_adder import main as adder_main
+from ssb_binary_model_batch import job_files, read_batch, run_batch
+from ssb_binary_model_benchmark import model_of_size, ram_model
+
+
+# Writes a manifest and reads it back
+def read_jobs(tmp_path, jobs):
+    (tmp_path / "jobs.json").write_text(json.dumps(jobs))
+    return read_batch(str(tmp_path / "jobs.json"))
+
+# Every costume's output and manifest is written, plans instead of outputs with -plan
+def test_costume_outputs_and_plans(tmp_path):
+    costumes = "DE0000000E000000,DE0000000E000040"
+    reads, writes, output = job_files("folder", ["-file", "base.bin", "-folder_to_add", "parts", "-costume", costumes, "-o", "out.bin"], str(tmp_path))
+    assert reads == {str(tmp_path / "base.bin"), str(tmp_path / "parts")}
+    assert writes == {str(tmp_path / name) for name in ("out_000000.bin", "out_000040.bin", "out_000000.bin.manifest", "out_000040.bin.manifest")}
+    assert output == str(tmp_path / "out_000000.bin")
+    _, writes, _ = job_files("adder", ["-file", "base.bin", "-file_to_add", "part.bin", "-costume", costumes, "-plan", "plan.ssbp"], str(tmp_path))
+    assert writes == {str(tmp_path / "plan_000000.ssbp"), str(tmp_path / "plan_000040.ssbp")}
+
+# Reading jobs doesn't print that -python is ignored, and jobs are named after the output's full path
+def test_reading_is_quiet(tmp_path):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        jobs = read_jobs(tmp_path, [{"args": {"file": "base.bin", "file_to_add": "part.bin", "python": "3", "o": "sub/out.bin"}},
+                                    {"args": {"file": "base.bin", "file_to_add": "part.bin", "o": "out.bin"}}])
+    assert printed.getvalue() == ""
+    assert [job.name for job in jobs] == [str(tmp_path / "sub" / "out.bin"), str(tmp_path / "out.bin")]
+
+# Jobs run after the jobs writing what they read, and jobs waiting on a failed job are skipped
+def test_order_and_skipping(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    (tmp_path / "part0.bin").write_bytes(ram_model(0))
+    (tmp_path / "part1.bin").write_bytes(ram_model(1))
+    jobs = [{"name": "first", "args": {"file": "base.bin", "file_to_add": "part0.bin", "o": "first.bin"}},
+            {"name": "second", "args": {"file": "first.bin", "file_to_add": "part1.bin", "o": "second.bin"}},
+            {"name": "broken", "args": {"file": "missing.bin", "file_to_add": "part0.bin", "o": "broken.bin"}},
+            {"name": "after_broken", "args": {"file": "broken.bin", "file_to_add": "part1.bin", "o": "after_broken.bin"}}]
+    assert [job.depends for job in read_jobs(tmp_path, jobs)] == [set(), {0}, set(), {2}]
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = run_batch(str(tmp_path / "jobs.json"), processes=2)
+        assert adder_main(["-file", "base.bin", "-file_to_add", "part0.bin", "-o", "expected_first.bin"]) == 0
+        assert adder_main(["-file", "expected_first.bin", "-file_to_add", "part1.bin", "-o", "expected_second.bin"]) == 0
+    assert {name: result["exit"] for name, result in results.items()} == {"first": 0, "second": 0, "broken": 1, "after_broken": None}
+    assert (tmp_path / "second.bin").read_bytes() == (tmp_path / "expected_second.bin").read_bytes()
+    assert not os.path.exists(tmp_path / "after_broken.bin")
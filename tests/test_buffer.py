@@ -0,0 +1,86 @@
+# Tests mapped buffers and flushing only the dirty ranges against buffers in memory and full rewrites.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import random
+import pytest
+from ssb_binary_model_buffer import ModelBuffer, splice_minimum
+
+
+# Makes a random edit to a buffer's size
+def random_edit(rng, size):
+    offset = hex(rng.randrange(0, size + 64))
+    if rng.random() < 0.5:
+        return ("write_hex", offset, rng.randbytes(rng.choice([2, 4, 6, 8])).hex())
+    return ("append_hex", offset, rng.randbytes(rng.randrange(0, 0x2000, 8)))
+
+# The same writes, inserts and flushes on a buffer in memory and a mapped buffer give the same file
+@pytest.mark.parametrize("seed", range(40))
+def test_mapped_matches_memory(tmp_path, seed):
+    rng = random.Random(seed)
+    source_path = tmp_path / "source.bin"
+    source_path.write_bytes(rng.randbytes(rng.choice([0, 8, rng.randrange(8, 0x40000, 8)])))
+    models = []
+    for mapped in (False, True):
+        source = ModelBuffer(str(source_path), mapped=mapped)
+        models.append((source, source.copy(str(tmp_path / f"output_{mapped}.bin"))))
+    try:
+        if len(models[1][0]) != 0:
+            assert models[1][0].mapped
+        for _ in range(rng.randrange(1, 12)):
+            edit = random_edit(rng, len(models[0][1]))
+            for _, output in models:
+                getattr(output, edit[0])(edit[1], edit[2])
+        for _, output in models:
+            output.flush(source_path=str(source_path))
+        expected = (tmp_path / "output_False.bin").read_bytes()
+        assert expected == bytes(models[0][1].data)
+        assert (tmp_path / "output_True.bin").read_bytes() == expected
+        assert bytes(models[1][1].data) == expected
+    finally:
+        for source, output in models:
+            if source.mapped:
+                source.data.close()
+            if output.mapped:
+                output.data.close()
+
+# Flushing only the dirty ranges over a copy of the source gives the same file as writing the whole buffer
+@pytest.mark.parametrize("seed", range(40))
+def test_flush_dirty_matches_full_rewrite(tmp_path, seed):
+    rng = random.Random(seed)
+    source_path = str(tmp_path / "source.bin")
+    with open(source_path, "wb") as f:
+        f.write(rng.randbytes(rng.randrange(splice_minimum, 0x40000, 8)))
+    output = ModelBuffer(source_path).copy(str(tmp_path / "dirty.bin"))
+    for _ in range(rng.choice([1, 10, 100, 1000])):
+        size = len(output)
+        if rng.random() < 0.01:
+            output.append_hex(hex(size), rng.randbytes(rng.randrange(8, 0x400, 8)))
+        else:
+            output.write_hex(hex(rng.randrange(0, size // 2) * 2), rng.randbytes(rng.choice([2, 4, 8])).hex())
+    full = ModelBuffer(str(tmp_path / "full.bin"), bytes(output.data))
+    full.flush()
+    if not output.flush_dirty(output.file_path, source_path):
+        output.flush(source_path=source_path)
+    assert (tmp_path / "dirty.bin").read_bytes() == (tmp_path / "full.bin").read_bytes() == bytes(output.data)
+
+# A few pointer writes to a large file are flushed as dirty ranges
+def test_few_writes_only_write_dirty_ranges(tmp_path):
+    rng = random.Random(0)
+    source_path = str(tmp_path / "source.bin")
+    with open(source_path, "wb") as f:
+        f.write(rng.randbytes(0x40000))
+    output = ModelBuffer(source_path).copy(str(tmp_path / "output.bin"))
+    for location in (0x10, 0x2000, 0x30000):
+        output.write_hex(hex(location), "12345678")
+    assert output.flush_dirty(output.file_path, source_path)
+    assert (tmp_path / "output.bin").read_bytes() == bytes(output.data)
+
+# A buffer that was never written has nothing dirty
+def test_clean_copy_has_no_dirty_ranges(tmp_path):
+    source_path = str(tmp_path / "source.bin")
+    with open(source_path, "wb") as f:
+        f.write(bytes(range(256)) * 64)
+    output = ModelBuffer(source_path).copy(str(tmp_path / "output.bin"))
+    assert len(output.dirty) == 0
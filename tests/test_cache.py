@@ -0,0 +1,90 @@
+# Tests parts linked from the cache give the same output and summary as converting them.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import multiprocessing
+import os
+import pytest
+from ssb_binary_model_adder import append_model
+from ssb_binary_model_adder_arguments import parse_args
+from ssb_binary_model_benchmark import model_of_size, ram_model
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_cache import ModelCache, cache_from_args
+from ssb_binary_model_converter import convert_model
+from ssb_binary_model_relocatable import convert_cached
+
+
+# Runs something and gives what it printed along with what it returned
+def printed_by(run):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        result = run()
+    return printed.getvalue(), result
+
+# A part linked from the cache is the same as the part converted, and prints the same summary, cached or not
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("palette_costume", ["", "DE0000000E000040"])
+def test_cached_matches_converted(tmp_path, seed, palette_costume):
+    cache = ModelCache(str(tmp_path / "cache"))
+    model = ModelBuffer(str(tmp_path / "part.bin"), ram_model(seed))
+    for hex_location in ("0x8", "0x100", "0x2000", "0x8", "0x102"):
+        expected_printed, expected = printed_by(lambda: convert_model(model, hex_location, "out.bin", palette_costume=palette_costume))
+        printed, converted = printed_by(lambda: convert_cached(model, hex_location, "out.bin", palette_costume, cache=cache))
+        assert bytes(converted.data) == bytes(expected.data)
+        assert printed == expected_printed
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (1, 3, 1)
+
+# The same part added to different bases at different offsets is only converted once
+def test_hit_across_bases(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "part.bin").write_bytes(ram_model(2))
+    cache = ModelCache(str(tmp_path / "cache"))
+    for seed, hex_location in ((0, "-1"), (1, "0x800"), (2, "0x100")):
+        (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, seed))
+        expected_printed, _ = printed_by(lambda: append_model("base.bin", "part.bin", "converted.bin", hex_location=hex_location))
+        printed, _ = printed_by(lambda: append_model("base.bin", "part.bin", "cached.bin", hex_location=hex_location, cache=cache))
+        assert (tmp_path / "cached.bin").read_bytes() == (tmp_path / "converted.bin").read_bytes()
+        assert printed == expected_printed.replace("converted.bin", "cached.bin")
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"]) == (1, 2)
+
+# Broken entries are converted again
+def test_broken_entry(tmp_path):
+    cache = ModelCache(str(tmp_path / "cache"))
+    model = ModelBuffer(str(tmp_path / "part.bin"), ram_model(0))
+    _, expected = printed_by(lambda: convert_model(model, "0x100"))
+    printed_by(lambda: convert_cached(model, "0x100", cache=cache))
+    for entry in os.scandir(cache.cache_dir):
+        if entry.name.endswith(".entry"):
+            with open(entry.path, "r+b") as f:
+                f.truncate(12)
+    _, converted = printed_by(lambda: convert_cached(model, "0x100", cache=cache))
+    assert bytes(converted.data) == bytes(expected.data)
+    assert cache.stats()["misses"] == 2
+
+# Adds hits from a process
+def count_hits(cache_dir, times):
+    cache = ModelCache(cache_dir)
+    for _ in range(times):
+        cache.count(hits=1)
+
+# Processes counting at the same time don't lose each other's counts
+def test_concurrent_counts(tmp_path):
+    cache_dir = str(tmp_path / "cache")
+    processes = [multiprocessing.Process(target=count_hits, args=(cache_dir, 50)) for _ in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert ModelCache(cache_dir).stats()["hits"] == 200
+
+# The cache is only used with -cache
+def test_cache_is_opt_in(tmp_path):
+    assert cache_from_args(parse_args(["-file", "base.bin"])) is None
+    assert cache_from_args(parse_args(["-file", "base.bin", "-cache", "-no_cache"])) is None
+    cache = cache_from_args(parse_args(["-file", "base.bin", "-cache", "-cache_dir", str(tmp_path)]))
+    assert cache.cache_dir == str(tmp_path)
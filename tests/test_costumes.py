@@ -0,0 +1,101 @@
+# Tests reading costume lists and ranges, and building every costume from one build.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import pytest
+import random
+from ssb_binary_model_adder import main as adder_main
+from ssb_binary_model_benchmark import model_of_size, ram_offset, words
+from ssb_binary_model_costumes import costume_output_path, parse_costumes
+from ssb_binary_model_errors import ModelError
+
+
+# Reads costumes with anything printed thrown away
+def parse_quietly(palette_costume):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return parse_costumes(palette_costume)
+
+# One costume, a list and a range
+def test_list_and_range():
+    assert parse_quietly("DE0000000E000000") == ["DE0000000E000000"]
+    assert parse_quietly("DE0000000E000000,de0000000e000040") == ["DE0000000E000000", "DE0000000E000040"]
+    assert parse_quietly("DE0000000E000000-DE0000000E000060/20") == ["DE0000000E000000", "DE0000000E000020", "DE0000000E000040", "DE0000000E000060"]
+
+# Palette offsets are hexadecimal, a range goes past 0x80 into offsets with letters in them
+def test_range_past_0xA0():
+    costumes = parse_quietly("DE0000000E000000-DE0000000E0000E0")
+    assert costumes == [f"DE0000000E{offset:06X}" for offset in range(0, 0xE1, 0x20)]
+    assert "DE0000000E0000A0" in costumes
+    assert parse_quietly("DE0000000E0000A0,DE0000000E0001C0") == ["DE0000000E0000A0", "DE0000000E0001C0"]
+
+# Ranges going down, repeated costumes and commands that aren't DE costumes are errors
+@pytest.mark.parametrize("palette_costume", ["DE0000000E000080-DE0000000E000000", "DE0000000E000000,DE0000000E000000", "DE0000000E000000,FD1000000E000020",
+                                             "DE0000000E00000G,DE0000000E000020", "DE0000000E000000-DE0000000E0000ZZ"])
+def test_bad_costumes_are_errors(palette_costume):
+    with pytest.raises(ModelError):
+        parse_quietly(palette_costume)
+
+# Makes a RAM part with two palette commands after its first pointer, so both get the costume
+def palette_part(seed):
+    rng = random.Random(seed)
+    palettes = rng.randbytes(0x40)
+    texture = rng.randbytes(0x80)
+    vertices = rng.randbytes(8 * 16 * 2)
+    texture_offset = len(palettes)
+    vertex_offset = texture_offset + len(texture)
+    display_list = words(0xE7000000, 0)
+    display_list += words(0xFD500000, ram_offset + texture_offset)
+    display_list += words(0xFD100000, ram_offset)
+    display_list += words(0x01008010, ram_offset + vertex_offset)
+    display_list += words(0x06000204, 0x00060810)
+    display_list += words(0xFD100000, ram_offset + 0x20)
+    display_list += words(0x01008010, ram_offset + vertex_offset + 8 * 16)
+    display_list += words(0x05000204, 0)
+    display_list += words(0xDF000000, 0)
+    data = palettes + texture + vertices + display_list
+    return data + bytes(-len(data) % 8)
+
+# Runs the adder with anything printed kept
+def run_adder(argv):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        assert adder_main(argv) == 0
+    return printed.getvalue()
+
+# Every costume patched from the first build is the same as building that costume on its own
+@pytest.mark.parametrize("folder", [False, True])
+def test_costumes_match_building_each(tmp_path, monkeypatch, folder):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    if folder:
+        (tmp_path / "parts").mkdir()
+        (tmp_path / "parts" / "a.bin").write_bytes(palette_part(0))
+        (tmp_path / "parts" / "b.bin").write_bytes(palette_part(1))
+        adding = ["-folder_to_add", "parts"]
+    else:
+        (tmp_path / "part.bin").write_bytes(palette_part(0))
+        adding = ["-file_to_add", "part.bin"]
+    adding = adding + ["-cache", "-cache_dir", "cache"]
+    costumes = parse_quietly("DE0000000E000000-DE0000000E0000A0")
+    printed = run_adder(["-file", "base.bin"] + adding + ["-costume", ",".join(costumes), "-o", "out.bin"])
+    assert f"by changing {4 if folder else 2} palette commands to DE0000000E0000A0" in printed
+    for costume in costumes:
+        run_adder(["-file", "base.bin"] + adding + ["-costume", costume, "-o", "direct.bin"])
+        assert (tmp_path / costume_output_path("out.bin", costume)).read_bytes() == (tmp_path / "direct.bin").read_bytes()
+        assert bytes.fromhex(costume) in (tmp_path / "direct.bin").read_bytes()
+
+# Costumes are still right when the first build reuses the last one and its palette commands aren't known
+def test_costumes_after_relink(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    (tmp_path / "parts").mkdir()
+    (tmp_path / "parts" / "a.bin").write_bytes(palette_part(0))
+    argv = ["-file", "base.bin", "-folder_to_add", "parts", "-costume", "DE0000000E000000,DE0000000E000040", "-o", "out.bin"]
+    run_adder(argv)
+    expected = (tmp_path / "out_000040.bin").read_bytes()
+    (tmp_path / "out_000040.bin").unlink()
+    assert "building every costume" in run_adder(argv)
+    assert (tmp_path / "out_000040.bin").read_bytes() == expected
@@ -0,0 +1,55 @@
+# Tests adding a folder of parts in worker processes gives the same output as adding them one at a time.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import ssb_binary_model_adder_folder as adder_folder
+from ssb_binary_model_adder_folder import append_folder, convert_parts, worker_pools_kept
+from ssb_binary_model_benchmark import model_of_size
+from ssb_binary_model_buffer import ModelBuffer
+
+
+# Adds a folder with anything printed kept
+def append_printed(*args, **kwargs):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        append_folder(*args, **kwargs)
+    return printed.getvalue()
+
+# Makes a base and a folder of parts big enough to be converted in worker processes
+def make_folder(tmp_path, part_size=40 << 10):
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    (tmp_path / "parts").mkdir()
+    for seed in range(2):
+        (tmp_path / "parts" / f"part{seed}.bin").write_bytes(model_of_size("ram", part_size, seed))
+
+# Worker processes give the same output as converting one at a time, and are shut down after
+def test_worker_processes_match_and_shut_down(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_folder(tmp_path)
+    append_printed("base.bin", "parts", "one_at_a_time.bin", processes=1)
+    append_printed("base.bin", "parts", "workers.bin", processes=2)
+    assert (tmp_path / "workers.bin").read_bytes() == (tmp_path / "one_at_a_time.bin").read_bytes()
+    assert adder_folder.worker_pools == {}
+
+# Worker processes are kept for every build inside worker_pools_kept()
+def test_worker_processes_kept(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_folder(tmp_path)
+    with worker_pools_kept():
+        append_printed("base.bin", "parts", "first.bin", processes=2)
+        pool = adder_folder.worker_pools[2]
+        append_printed("base.bin", "parts", "second.bin", processes=2)
+        assert adder_folder.worker_pools[2] is pool
+    assert adder_folder.worker_pools == {}
+    assert (tmp_path / "first.bin").read_bytes() == (tmp_path / "second.bin").read_bytes()
+
+# Parts too small for worker processes are converted one at a time, saying so with -debug
+def test_small_parts_say_why(tmp_path):
+    part_models = [ModelBuffer(str(tmp_path / f"part{seed}.bin"), model_of_size("ram", 1 << 10, seed)) for seed in range(2)]
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        assert convert_parts(part_models, [0x1000, 0x1400], debug=True, processes=2) is None
+    assert "one at a time" in printed.getvalue()
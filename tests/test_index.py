@@ -0,0 +1,69 @@
+# Tests the lookups the display list index records while indexing against the searches they replaced.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import random
+import pytest
+from ssb_binary_model_benchmark import model_of_size, ram_model, rom_model, words
+from ssb_binary_model_index import DisplayListIndex
+from ssb_binary_model_opcodes import VERTICE, command_kind, is_end_command
+
+
+# Last pointer searched for backwards from the end of the file, like the adder used to
+def searched_last_pointer(data):
+    reading_loc_dec = len(data)
+    end_found = False
+    while 1:
+        if not end_found:
+            end_found = is_end_command(data, reading_loc_dec)
+        if end_found and command_kind(data, reading_loc_dec) == VERTICE:
+            return reading_loc_dec + 4
+        if reading_loc_dec <= 0:
+            return -1
+        reading_loc_dec = reading_loc_dec - 8
+
+# First pointer of an original character file searched for from the start, like the adder used to
+def searched_original_character_first_pointer(data):
+    reading_loc_dec = 0
+    num_bytes = 2
+    while 1:
+        if data[reading_loc_dec:reading_loc_dec + num_bytes] != b"\x00\x00":
+            return reading_loc_dec
+        if reading_loc_dec >= len(data):
+            return -1
+        reading_loc_dec = reading_loc_dec + 8
+        num_bytes = 8
+
+# Random words that are mostly 01, DF and zero, so ends and vertices turn up on every step
+def random_commands(rng, num_words):
+    return words(*(rng.choice([0x01020040, 0x01000000, 0xDF000000, 0, 0, 0xE7000000, 0x80001234]) for _ in range(num_words)))
+
+# Every size up to 8 past a multiple of 8, so every step the search can be on is checked
+@pytest.mark.parametrize("extra", range(8))
+def test_last_pointer_matches_search(extra):
+    rng = random.Random(extra)
+    for _ in range(1000):
+        padding = bytes(rng.randrange(0, 2) for _ in range(extra))
+        commands = random_commands(rng, rng.randrange(0, 24))
+        # Padding in front puts the commands on the steps the search is on
+        data = padding + commands if rng.random() < 0.5 else commands + padding
+        data = data + words(*[rng.choice([0xDF000000, 0])] * 2)[:rng.randrange(0, 9)]
+        assert DisplayListIndex(data).last_pointer() == searched_last_pointer(data), data.hex()
+
+# Made up models with every size they can be cut to near their end
+@pytest.mark.parametrize("data", [ram_model(1), rom_model(1), model_of_size("ram", 4 << 10, 2), model_of_size("rom", 4 << 10, 2)], ids=["ram", "rom", "ram_4k", "rom_4k"])
+def test_last_pointer_on_models(data):
+    for cut in range(0, 24):
+        cut_data = data[:len(data) - cut] if cut else data
+        assert DisplayListIndex(cut_data).last_pointer() == searched_last_pointer(cut_data), cut
+        padded_data = data + bytes(cut)
+        assert DisplayListIndex(padded_data).last_pointer() == searched_last_pointer(padded_data), cut
+
+# First pointer of an original character file for zero and non zero starts of every length
+def test_original_character_first_pointer_matches_search():
+    rng = random.Random(0)
+    cases = [b"", b"\x00", b"\x01", b"\x00\x00", bytes(10), bytes(16), bytes(24), bytes(8) + b"\x00\x00", bytes(8) + b"\x00\x01"]
+    cases += [bytes(rng.randrange(0, 3)) + bytes(rng.choice([0, 1]) for _ in range(rng.randrange(0, 40))) for _ in range(500)]
+    for data in cases:
+        assert DisplayListIndex(data).original_character_first_pointer() == searched_original_character_first_pointer(data), data.hex()
@@ -0,0 +1,59 @@
+# Tests folder builds that reuse the last build give the same output as building everything again.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import os
+from ssb_binary_model_adder_folder import append_folder
+from ssb_binary_model_benchmark import model_of_size, ram_model
+from ssb_binary_model_manifest import manifest_path
+
+
+# Adds a folder with anything printed kept (debug says when the last build is reused)
+def append_printed(*args, **kwargs):
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        append_folder(*args, debug=True, **kwargs)
+    return printed.getvalue()
+
+# Makes a base and a folder of parts
+def make_folder(tmp_path, num_parts=4):
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    (tmp_path / "parts").mkdir()
+    for seed in range(num_parts):
+        (tmp_path / "parts" / f"part{seed}.bin").write_bytes(ram_model(seed, num_blocks=seed + 2))
+
+# Relinking after one part changes gives the same output as a full build, keeping the parts before it
+def test_relink_matches_full_build(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_folder(tmp_path)
+    append_printed("base.bin", "parts", "out.bin")
+    assert os.path.exists(manifest_path(str(tmp_path / "out.bin")))
+    part_names = os.listdir(tmp_path / "parts")
+    (tmp_path / "parts" / part_names[2]).write_bytes(ram_model(10, num_blocks=7))
+    printed = append_printed("base.bin", "parts", "out.bin")
+    assert "Keeping the first 2 of 4 parts" in printed
+    append_printed("base.bin", "parts", "full.bin", single_pass=False)
+    assert (tmp_path / "out.bin").read_bytes() == (tmp_path / "full.bin").read_bytes()
+
+# Nothing changing keeps the whole last build
+def test_nothing_changed(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_folder(tmp_path)
+    append_printed("base.bin", "parts", "out.bin")
+    expected = (tmp_path / "out.bin").read_bytes()
+    assert "Keeping the first 4 of 4 parts" in append_printed("base.bin", "parts", "out.bin")
+    assert (tmp_path / "out.bin").read_bytes() == expected
+
+# A different base or different arguments builds everything again
+def test_changed_base_builds_everything(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_folder(tmp_path)
+    append_printed("base.bin", "parts", "out.bin")
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 1))
+    assert "Keeping" not in append_printed("base.bin", "parts", "out.bin")
+    assert "Keeping" not in append_printed("base.bin", "parts", "out.bin", palette_costume="DE0000000E000040")
+    append_printed("base.bin", "parts", "full.bin", palette_costume="DE0000000E000040", single_pass=False)
+    assert (tmp_path / "out.bin").read_bytes() == (tmp_path / "full.bin").read_bytes()
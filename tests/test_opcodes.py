@@ -0,0 +1,113 @@
+# Tests the opcode decoder against the regex expressions it replaced.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import random
+import pytest
+from ssb_binary_model_benchmark import model_of_size, ram_model, rom_model
+from ssb_binary_model_index import DisplayListIndex
+from ssb_binary_model_opcodes import (END, JUMP, NO_COMMAND, PALETTE, PRIMITIVE, PRIMITIVE_SYNC, RDP_SYNC, TEXTURE, VERTICE, command_kind, end_regex,
+                                      is_end_command, jump_regex, next_pointer_commands, palette_regex, pointer_command_kind, primitive_regex,
+                                      primitive_sync_regex, rdp_sync_regex, texture_regex, vertice_regex, word_struct)
+
+word_bytes = [0x00, 0x01, 0x80, 0xFF]
+pointer_bytes = [0x00, 0x01, 0x7F, 0x80, 0x81, 0xFF]
+
+# Kind of a command word the way the regex scan found it
+def regex_command_kind(hex_data):
+    if texture_regex.match(hex_data[:8]):
+        return TEXTURE
+    if palette_regex.match(hex_data[:8]):
+        return PALETTE
+    if primitive_regex.match(hex_data[:8]):
+        return PRIMITIVE
+    if primitive_sync_regex.match(hex_data[:8]):
+        return PRIMITIVE_SYNC
+    if rdp_sync_regex.match(hex_data[:8]):
+        return RDP_SYNC
+    if end_regex.match(hex_data[:8]):
+        return END
+    if hex_data[:2] == "01":
+        return VERTICE
+    return NO_COMMAND
+
+# Kind of a pointer command the way the regex scan found it
+def regex_pointer_command_kind(hex_data):
+    if texture_regex.match(hex_data[:8]):
+        return TEXTURE
+    if palette_regex.match(hex_data[:8]):
+        return PALETTE
+    if vertice_regex.match(hex_data):
+        return VERTICE
+    if jump_regex.match(hex_data):
+        return JUMP
+    return NO_COMMAND
+
+# Next pointer command table worked out one word at a time
+def expected_next_pointer_commands(data, start, length):
+    next_locations = [-1] * length
+    kinds = [NO_COMMAND] * (length - 1)
+    expected_next = -1
+    for location in range(start + 4 * (length - 2), start - 1, -4):
+        kind = pointer_command_kind(data, location)
+        if kind != NO_COMMAND:
+            expected_next = location
+        next_locations[(location - start) // 4] = expected_next
+        kinds[(location - start) // 4] = kind
+    return next_locations, kinds
+
+# Every opcode and second byte, with cut off words too
+@pytest.mark.parametrize("opcode", range(256))
+def test_command_kind_matches_regex(opcode):
+    for second_byte in range(256):
+        for third_byte in word_bytes:
+            for fourth_byte in word_bytes:
+                data = bytes([opcode, second_byte, third_byte, fourth_byte])
+                for length in (1, 2, 3, 4):
+                    kind = command_kind(data[:length], 0)
+                    # Jumps are only matched by regex with their pointer, so only compare the command word
+                    if kind == JUMP:
+                        continue
+                    assert kind == regex_command_kind(data[:length].hex().upper()), data[:length].hex()
+
+# Pointer commands with every kind of pointer, with cut off commands too
+@pytest.mark.parametrize("opcode", (0x01, 0xDE, 0xDF, 0xFD))
+def test_pointer_command_kind_matches_regex(opcode):
+    for second_byte in (0x00, 0x01, 0x02, 0x10, 0x50):
+        for pointer_byte in pointer_bytes:
+            for pointer_second_byte in pointer_bytes:
+                for last_bytes in (b"\x12\x34", b"\x00\x00"):
+                    data = bytes([opcode, second_byte, 0, 0, pointer_byte, pointer_second_byte]) + last_bytes
+                    for length in range(9):
+                        hex_data = data[:length].hex().upper()
+                        assert pointer_command_kind(data[:length], 0) == regex_pointer_command_kind(hex_data), hex_data
+                        assert is_end_command(data[:length], 0) == (hex_data == "DF00000000000000"), hex_data
+
+# Next pointer command table against pointer_command_kind() on every word
+def test_next_pointer_commands_random_words():
+    rng = random.Random(0)
+    command_words = [0xFD100000, 0xFD500000, 0x01020040, 0xDE000000, 0x80001234, 0x80900000, 0x00000000, 0xDF000000]
+    for _ in range(300):
+        data = b"".join(word_struct.pack(rng.choice(command_words)) for _ in range(rng.randrange(0, 40))) + bytes(rng.randrange(0, 8))
+        for start in range(4):
+            next_locations, kinds = next_pointer_commands(data, start)
+            assert (next_locations, kinds) == expected_next_pointer_commands(data, start, len(next_locations)), (data.hex(), start)
+        assert DisplayListIndex(data).next_pointer_commands() == next_pointer_commands(data, 0), data.hex()
+
+generated_models = {**{f"ram_{seed}": ram_model(seed) for seed in range(4)}, **{f"rom_{seed}": rom_model(seed) for seed in range(4)},
+                    "ram_16k": model_of_size("ram", 16 << 10, 7), "rom_16k": model_of_size("rom", 16 << 10, 7)}
+
+# Made up RAM and ROM models, every command against the regex scan of its hex string
+@pytest.mark.parametrize("name", generated_models)
+def test_generated_models_match_regex(name):
+    data = generated_models[name]
+    hex_data = data.hex().upper()
+    for location in range(0, len(data), 4):
+        command_hex = hex_data[location * 2:location * 2 + 16]
+        if command_kind(data, location) != JUMP:
+            assert command_kind(data, location) == regex_command_kind(command_hex), hex(location)
+        assert pointer_command_kind(data, location) == regex_pointer_command_kind(command_hex), hex(location)
+    next_locations, kinds = next_pointer_commands(data, 0)
+    assert (next_locations, kinds) == expected_next_pointer_commands(data, 0, len(next_locations))
+    assert DisplayListIndex(data).next_pointer_commands() == (next_locations, kinds)
@@ -0,0 +1,78 @@
+# Tests applying a patch plan or .ssbp patches gives the same output as adding straight to the base.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import os
+import pytest
+from ssb_binary_model_adder import main as adder_main
+from ssb_binary_model_benchmark import model_of_size, ram_model
+from ssb_binary_model_errors import ModelError
+from ssb_binary_model_plan import apply_patches, apply_plan, main as plan_main
+from test_costumes import palette_part
+
+
+# Runs the adder with anything printed thrown away
+def run_adder(argv):
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert adder_main(argv) == 0
+
+# Makes a base, a part and a folder of parts
+def make_files(tmp_path):
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    (tmp_path / "part.bin").write_bytes(ram_model(0))
+    (tmp_path / "parts").mkdir()
+    for seed in range(3):
+        (tmp_path / "parts" / f"part{seed}.bin").write_bytes(ram_model(seed, num_blocks=seed + 2))
+
+# A plan writes nothing but itself, and applying it gives the output adding would have written
+@pytest.mark.parametrize("adding", [["-file_to_add", "part.bin"], ["-file_to_add", "part.bin", "-offset", "0x800"], ["-folder_to_add", "parts"]])
+def test_plan_matches_direct_build(tmp_path, monkeypatch, adding):
+    monkeypatch.chdir(tmp_path)
+    make_files(tmp_path)
+    run_adder(["-file", "base.bin"] + adding + ["-plan", "plan.json", "-o", "planned.bin"])
+    assert not os.path.exists(tmp_path / "planned.bin")
+    run_adder(["-file", "base.bin"] + adding + ["-o", "direct.bin"])
+    with contextlib.redirect_stdout(io.StringIO()):
+        apply_plan("plan.json", "", "applied.bin")
+    assert (tmp_path / "applied.bin").read_bytes() == (tmp_path / "direct.bin").read_bytes()
+
+# A plan can only be applied to the base it was made from
+def test_plan_needs_its_base(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_files(tmp_path)
+    run_adder(["-file", "base.bin", "-file_to_add", "part.bin", "-plan", "plan.json"])
+    (tmp_path / "other.bin").write_bytes(model_of_size("rom", 8 << 10, 1))
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(ModelError):
+        apply_plan("plan.json", "other.bin", "applied.bin")
+    assert not os.path.exists(tmp_path / "applied.bin")
+
+# Patches for different parts and costumes applied in one pass each give the output adding would have written
+def test_patches_match_direct_builds(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_files(tmp_path)
+    (tmp_path / "parts" / "palettes.bin").write_bytes(palette_part(0))
+    costumes = "DE0000000E000000,DE0000000E000040"
+    run_adder(["-file", "base.bin", "-file_to_add", "part.bin", "-plan", "part.ssbp"])
+    run_adder(["-file", "base.bin", "-folder_to_add", "parts", "-costume", costumes, "-plan", "parts.ssbp"])
+    run_adder(["-file", "base.bin", "-file_to_add", "part.bin", "-o", "part.bin_direct"])
+    run_adder(["-file", "base.bin", "-folder_to_add", "parts", "-costume", costumes, "-o", "parts_direct.bin"])
+    patches = ["part.ssbp", "parts_000000.ssbp", "parts_000040.ssbp"]
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert plan_main(["apply", "-plan"] + patches + ["-file", "base.bin", "-output_folder", "outputs"]) == 0
+    assert (tmp_path / "outputs" / "part.bin").read_bytes() == (tmp_path / "part.bin_direct").read_bytes()
+    for costume in ("000000", "000040"):
+        assert (tmp_path / "outputs" / f"parts_{costume}.bin").read_bytes() == (tmp_path / f"parts_direct_{costume}.bin").read_bytes()
+    assert (tmp_path / "outputs" / "parts_000000.bin").read_bytes() != (tmp_path / "outputs" / "parts_000040.bin").read_bytes()
+
+# Patches can only be applied to the base they were made from
+def test_patches_need_their_base(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    make_files(tmp_path)
+    run_adder(["-file", "base.bin", "-file_to_add", "part.bin", "-plan", "part.ssbp"])
+    (tmp_path / "other.bin").write_bytes(model_of_size("rom", 8 << 10, 1))
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(ModelError):
+        apply_patches(["part.ssbp"], "other.bin", "applied.bin")
+    assert not os.path.exists(tmp_path / "applied.bin")
@@ -0,0 +1,64 @@
+# Tests adding relocatable parts gives the same output as converting the part where it goes.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+import pytest
+from ssb_binary_model_adder import append_model
+from ssb_binary_model_benchmark import model_of_size, ram_model
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_converter import convert_model
+from ssb_binary_model_errors import ModelError
+from ssb_binary_model_opcodes import CHAIN
+from ssb_binary_model_relocatable import load_relocatable, make_relocatable
+
+
+# Adds a part to a base with anything printed thrown away
+def append_quietly(*args, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return append_model(*args, **kwargs)
+
+# A relocatable part added anywhere gives the same output as the RAM part it was made from
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("hex_location", ["-1", "0x100", "0x800"])
+def test_relocatable_matches_ram_part(tmp_path, monkeypatch, seed, hex_location):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, seed))
+    (tmp_path / "part.bin").write_bytes(ram_model(seed))
+    with contextlib.redirect_stdout(io.StringIO()):
+        make_relocatable(ModelBuffer("part.bin")).save()
+    append_quietly("base.bin", "part.bin", "converted.bin", hex_location=hex_location)
+    append_quietly("base.bin", "part.ssbrel", "relocated.bin", hex_location=hex_location)
+    assert (tmp_path / "relocated.bin").read_bytes() == (tmp_path / "converted.bin").read_bytes()
+
+# The converter records every pointer half that moves, only those are different somewhere else
+def test_converter_records_relocations(tmp_path):
+    model = ModelBuffer(str(tmp_path / "part.bin"), ram_model(2, num_blocks=4))
+    with contextlib.redirect_stdout(io.StringIO()):
+        at_zero = convert_model(model, "0x0")
+        at_0x100 = convert_model(model, "0x100")
+    moved = {location for location, _ in at_zero.relocations}
+    assert sum(1 for _, kind in at_zero.relocations if kind == CHAIN) == 6
+    for location in range(0, len(model), 2):
+        different = at_zero.data[location:location + 2] != at_0x100.data[location:location + 2]
+        assert different == (location in moved)
+
+# Saving and loading a relocatable part keeps its data and relocations
+def test_save_and_load(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "part.bin").write_bytes(ram_model(1, num_blocks=5))
+    with contextlib.redirect_stdout(io.StringIO()):
+        part = make_relocatable(ModelBuffer("part.bin"), costume=True)
+        part.save()
+    loaded = load_relocatable("part.ssbrel")
+    assert bytes(loaded.data) == bytes(part.data)
+    assert loaded.relocations == part.relocations
+    assert loaded.costume
+
+# Files that aren't relocatable parts are errors
+def test_bad_file_is_an_error(tmp_path):
+    (tmp_path / "bad.ssbrel").write_bytes(b"SSBR\x09")
+    with contextlib.redirect_stdout(io.StringIO()), pytest.raises(ModelError):
+        load_relocatable(str(tmp_path / "bad.ssbrel"))
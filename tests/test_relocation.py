@@ -0,0 +1,86 @@
+# Tests moving pointer chains, with plain python and with NumPy.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import pytest
+from ssb_binary_model_benchmark import model_of_size, synthetic_chain
+from ssb_binary_model_buffer import ModelBuffer
+from ssb_binary_model_errors import ModelError
+from ssb_binary_model_relocation import RelocationTable, apply_relocation, find_chain, numpy, plan_relocation, pointer_struct
+
+
+# Moves a chain and gives the model
+def relocated(data, table, use_numpy):
+    model = ModelBuffer("", bytearray(data))
+    apply_relocation(model, plan_relocation(model.data, 0, table, use_numpy=use_numpy))
+    return bytes(model.data)
+
+# Pointers are moved by the deltas of every edit before them
+def test_relocation_table():
+    table = RelocationTable([(0x100, 0x20), (0x40, 8), (0x200, -0x10)])
+    assert table.relocate(0x0F) == 0x0F
+    assert table.relocate(0x10) == 0x12
+    assert table.relocate(0x40) == 0x4A
+    assert table.relocate(0x80) == 0x86
+
+# Every pointer past the insert is moved, the ones before aren't
+def test_insert_moves_pointers_after_it():
+    data = synthetic_chain(100)
+    output = relocated(data, RelocationTable([(0x190, 0x10)]), False)
+    for location in range(0, len(data), 8):
+        upper_offset, lower_offset = pointer_struct.unpack_from(data, location)
+        new_upper_offset, new_lower_offset = pointer_struct.unpack_from(output, location)
+        assert new_upper_offset == (upper_offset if upper_offset == 0xFFFF or upper_offset < 0x64 else upper_offset + 4)
+        assert new_lower_offset == (lower_offset if lower_offset < 0x64 else lower_offset + 4)
+
+# NumPy gives the same model as plain python
+@pytest.mark.skipif(numpy is None, reason="NumPy isn't installed")
+@pytest.mark.parametrize("num_pointers", [1, 255, 256, 30000])
+def test_numpy_matches_python(num_pointers):
+    data = synthetic_chain(num_pointers)
+    table = RelocationTable([(len(data) // 2, 0x10), (len(data) // 4, -8)])
+    assert relocated(data, table, True) == relocated(data, table, False)
+
+# Made up ROM models move the same with and without NumPy
+@pytest.mark.skipif(numpy is None, reason="NumPy isn't installed")
+@pytest.mark.parametrize("seed", range(5))
+def test_numpy_matches_python_on_models(seed):
+    data = model_of_size("rom", 64 << 10, seed)
+    table = RelocationTable([(len(data) // 3 // 8 * 8, 0x100)])
+    assert relocated(data, table, True) == relocated(data, table, False)
+
+# NumPy marks the same ranges as written as plain python, pointers far apart aren't one big range
+@pytest.mark.skipif(numpy is None, reason="NumPy isn't installed")
+def test_numpy_marks_the_same_dirty_ranges():
+    data = model_of_size("rom", 64 << 10, 0)
+    table = RelocationTable([(len(data) // 3 // 8 * 8, 0x100)])
+    ranges = []
+    for use_numpy in (True, False):
+        model = ModelBuffer("", bytearray(data))
+        model.dirty.merge_gap = 64
+        apply_relocation(model, plan_relocation(model.data, 0, table, use_numpy=use_numpy))
+        ranges.append(list(model.dirty))
+    assert ranges[0] == ranges[1]
+    assert len(ranges[0]) > 1
+
+# Pointers that would go past 0xFFFF are errors and nothing is written
+def test_out_of_range_is_an_error():
+    data = synthetic_chain(10)
+    model = ModelBuffer("", bytearray(data))
+    with pytest.raises(ModelError):
+        plan_relocation(model.data, 0, RelocationTable([(0, 0x40000)]))
+    assert bytes(model.data) == bytes(data)
+
+# Chains that point at nothing or loop are errors
+def test_broken_chains_are_errors():
+    data = bytearray(24)
+    pointer_struct.pack_into(data, 0, 2, 1)
+    with pytest.raises(ModelError):
+        find_chain(data, 0)
+    pointer_struct.pack_into(data, 8, 4, 3)
+    pointer_struct.pack_into(data, 16, 2, 5)
+    with pytest.raises(ModelError):
+        find_chain(data, 0)
+    pointer_struct.pack_into(data, 16, 0xFFFF, 5)
+    assert find_chain(data, 0) == [0, 8, 16]
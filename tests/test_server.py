@@ -0,0 +1,75 @@
+# Tests the server rejecting bad requests and the client handling replies that are cut off.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import json
+import os
+import socket
+import threading
+import pytest
+from ssb_binary_model_client import send_request
+from ssb_binary_model_server import ModelServer, ModelStore
+
+
+# Starts a server on a socket in tmp_path
+@pytest.fixture
+def server_socket(tmp_path):
+    socket_path = str(tmp_path / "server.sock")
+    server = ModelServer(socket_path, ModelStore())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+# Sends one raw line and reads the reply
+def send_line(socket_path, line):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client_socket:
+        client_socket.connect(socket_path)
+        client_socket.sendall(line + b"\n")
+        return json.loads(client_socket.makefile("rb").readline())
+
+# Requests that aren't a JSON object or have the wrong field types get exit 2
+@pytest.mark.parametrize("line", [b"[]", b"1", b'"x"', b"null", b'{"command": "adder", "argv": "x"}', b'{"command": "adder", "argv": 5}', b'{"command": "adder", "cwd": 5}'])
+def test_bad_requests_get_exit_2(server_socket, line):
+    reply = send_line(server_socket, line)
+    assert reply["exit"] == 2
+    assert reply["output"].startswith("Couldn't read request")
+
+# A bad request doesn't stop the server
+def test_server_still_runs_after_bad_request(server_socket):
+    send_line(server_socket, b"[]")
+    reply = send_request({"command": "stats"}, server_socket)
+    assert reply["exit"] == 0
+
+# Unknown commands are errors
+def test_unknown_command(server_socket):
+    reply = send_request({"command": "nothing", "argv": []}, server_socket)
+    assert reply["exit"] == 1
+    assert "unknown command" in reply["output"]
+
+# Empty, cut off or bad replies give exit 1 instead of raising
+@pytest.mark.parametrize("reply", [b"", b'{"exit": 0, "out', b"[]\n", b"not json\n"])
+def test_client_handles_bad_replies(tmp_path, reply):
+    socket_path = str(tmp_path / "fake.sock")
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as fake_server:
+        fake_server.bind(socket_path)
+        fake_server.listen()
+        def answer():
+            connection, _ = fake_server.accept()
+            with connection:
+                connection.recv(1 << 16)
+                connection.sendall(reply)
+        thread = threading.Thread(target=answer, daemon=True)
+        thread.start()
+        result = send_request({"command": "stats"}, socket_path)
+        thread.join()
+    assert result["exit"] == 1
+    assert "without a whole reply" in result["output"]
+
+# No server gives None
+def test_no_server(tmp_path):
+    assert send_request({"command": "stats"}, str(tmp_path / "missing.sock")) is None
+    assert not os.path.exists(tmp_path / "missing.sock")
@@ -0,0 +1,41 @@
+# Tests watching a folder adds it again when a part changes, giving the same output as adding it from scratch.
+
+# Copyright (C) 2025 Thomas Rader
+
+
+import contextlib
+import io
+from ssb_binary_model_adder_folder import append_folder
+from ssb_binary_model_benchmark import model_of_size, ram_model
+from ssb_binary_model_watch import changed_files, watch_folder
+
+
+# Files that were added, removed or changed are named
+def test_changed_files():
+    before = {"/a/base.bin": (1, 10), "/a/parts/one.bin": (1, 10), "/a/parts/two.bin": (1, 10)}
+    after = {"/a/base.bin": (1, 10), "/a/parts/one.bin": (2, 10), "/a/parts/three.bin": (1, 10)}
+    assert changed_files(before, after) == ["one.bin", "three.bin", "two.bin"]
+
+# A part changing while watching adds the folder again, the same as adding it from scratch
+def test_rebuilds_when_a_part_changes(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "base.bin").write_bytes(model_of_size("rom", 8 << 10, 0))
+    (tmp_path / "parts").mkdir()
+    for seed in range(3):
+        (tmp_path / "parts" / f"part{seed}.bin").write_bytes(ram_model(seed))
+    builds = []
+
+    # Changes a part after the first build, like saving it from an editor
+    def build(*args, **kwargs):
+        append_folder(*args, **kwargs)
+        builds.append((tmp_path / "out.bin").read_bytes())
+        if len(builds) == 1:
+            (tmp_path / "parts" / "part1.bin").write_bytes(ram_model(7, num_blocks=5))
+
+    printed = io.StringIO()
+    with contextlib.redirect_stdout(printed):
+        assert watch_folder("base.bin", "parts", "out.bin", interval=0.01, debounce=0.05, max_builds=2, build=build) == 2
+        append_folder("base.bin", "parts", "full.bin", single_pass=False)
+    assert "(part1.bin changed)" in printed.getvalue()
+    assert builds[0] != builds[1]
+    assert builds[1] == (tmp_path / "full.bin").read_bytes()